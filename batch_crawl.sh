@@ -93,6 +93,8 @@ for (( batch=1; batch<=NUM_BATCHES; batch++ )); do
         -a list_ids=$LIST_ID \
         -a start_page=$start \
         -a end_page=$end \
+        ${EYEUC_RUN_ID:+-a run_id=$EYEUC_RUN_ID} \
+        ${EYEUC_METRICS_DIR:+-s METRICS_FILE=$EYEUC_METRICS_DIR/list${LIST_ID}_p${start}-${end}.prom} \
         -s LOG_LEVEL=WARNING 2>&1 | tee "/tmp/batch_${LIST_ID}_${start}-${end}.log"; then
         
         echo -e "${GREEN}✅ 批次 $batch/$NUM_BATCHES 完成（第 $start-$end 页）${NC}"
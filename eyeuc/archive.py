@@ -0,0 +1,260 @@
+"""
+EyeUC 原始响应归档与离线回放
+
+归档（ARCHIVE_DIR）：ResponseArchiveMiddleware 把每个下载到的响应（URL、状态码、headers、
+body、回调名和 meta 中的 id）追加写入归档目录下的段文件：
+
+    archive/
+      segment-20251017-120000-4242-0001.gz    每条记录是一个独立的 gzip member
+      segment-20251017-120000-4242-0001.idx   每条记录一行 JSON（key、offset、length、url、status）
+
+段文件只追加，不修改；超过 ARCHIVE_SEGMENT_MB 时换新段，每个进程写自己的段文件。
+整个 .gz 仍是合法的 gzip 文件（多个 member 连接），可以直接 zcat 查看。
+进程被强制杀死时 .idx 可能少于 .gz 中的记录，读取时会从 .gz 补扫缺失的部分。
+
+回放（ARCHIVE_REPLAY_DIR）：ArchiveReplayMiddleware 按 "方法 URL" 从归档中取出响应直接返回，
+不访问网络；归档中没有的请求被忽略（archive/replay_miss）。
+spider 的解析流程（parse_list → parse_detail → parse_versions → parse_download_ajax）不变，
+修复解析 bug 后用 scripts/reparse_archive.py 多进程回放即可重新生成 per_list_output。
+"""
+
+import gzip
+import json
+import logging
+import os
+import time
+import zlib
+from pathlib import Path
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+
+logger = logging.getLogger(__name__)
+
+# 不写入归档的 Scrapy 内部 meta
+_INTERNAL_META = frozenset((
+    'download_slot', 'download_latency', 'download_timeout', 'depth', 'retry_times',
+    'redirect_times', 'redirect_ttl', 'redirect_urls', 'redirect_reasons', 'dont_filter',
+    'handle_httpstatus_list', 'handle_httpstatus_all', 'cached_response',
+))
+
+
+def record_key(method, url):
+    return f'{method} {url}'
+
+
+def _meta_ids(meta):
+    """meta 中可 JSON 序列化的标量（list_id / page / mid / version_vid ...）"""
+    return {
+        key: value for key, value in meta.items()
+        if not key.startswith('_') and key not in _INTERNAL_META
+        and (value is None or isinstance(value, (str, int, float, bool)))
+    }
+
+
+class ArchiveWriter:
+    """追加写入归档段文件"""
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, level=6):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self.prefix = f"segment-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self._seq = 0
+        self._segment = None
+        self._index = None
+        self.records = 0
+        self.bytes_written = 0
+
+    def _open_segment(self):
+        self._seq += 1
+        name = f'{self.prefix}-{self._seq:04d}'
+        self._segment = open(self.directory / f'{name}.gz', 'ab')
+        self._index = open(self.directory / f'{name}.idx', 'a', encoding='utf-8')
+
+    def append(self, header, body):
+        """写入一条记录（header 为 JSON 可序列化的 dict，必须包含 key）"""
+        if self._segment is None:
+            self._open_segment()
+        header = dict(header, body_length=len(body))
+        data = json.dumps(header, ensure_ascii=False).encode('utf-8') + b'\n' + body
+        member = gzip.compress(data, compresslevel=self.level)
+        offset = self._segment.tell()
+        self._segment.write(member)
+        self._index.write(json.dumps({
+            'key': header['key'], 'offset': offset, 'length': len(member),
+            'url': header.get('url'), 'status': header.get('status'),
+        }, ensure_ascii=False) + '\n')
+        self.records += 1
+        self.bytes_written += len(member)
+        if offset + len(member) >= self.segment_bytes:
+            self.close()
+
+    def close(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._index.close()
+            self._segment = None
+            self._index = None
+
+
+def _scan_members(data, offset):
+    """从 offset 开始逐个解压 gzip member，返回 [(offset, length, header), ...]（截断的尾部忽略）"""
+    entries = []
+    while offset < len(data):
+        decompressor = zlib.decompressobj(wbits=31)
+        try:
+            raw = decompressor.decompress(data[offset:])
+        except zlib.error:
+            break
+        if not decompressor.eof:
+            break
+        length = len(data) - offset - len(decompressor.unused_data)
+        header = json.loads(raw[:raw.index(b'\n')])
+        entries.append((offset, length, header))
+        offset += length
+    return entries
+
+
+class ArchiveReader:
+    """归档索引（key → 段文件位置），同一 key 有多条记录时以最新的段为准"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.index = {}  # key -> (段文件, offset, length)
+        self.entries = []  # [{'key', 'url', 'status'}, ...]（按写入顺序）
+        self.rescanned = 0  # 从 .gz 补扫的记录数
+        for path in sorted(self.directory.glob('segment-*.gz')):
+            self._load_segment(path)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _load_segment(self, path):
+        size = path.stat().st_size
+        end = 0
+        idx_path = path.with_suffix('.idx')
+        if idx_path.exists():
+            with open(idx_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # 写了一半的行
+                    if entry['offset'] + entry['length'] > size:
+                        break
+                    self._add(path, entry)
+                    end = entry['offset'] + entry['length']
+        if end < size:
+            # .idx 缺失或落后于 .gz：补扫剩余的 member
+            for offset, length, header in _scan_members(path.read_bytes(), end):
+                self._add(path, {'key': header['key'], 'offset': offset, 'length': length,
+                                 'url': header.get('url'), 'status': header.get('status')})
+                self.rescanned += 1
+
+    def _add(self, path, entry):
+        self.index[entry['key']] = (path, entry['offset'], entry['length'])
+        self.entries.append(entry)
+
+    def get(self, key):
+        """(header, body)，没有时返回 None"""
+        location = self.index.get(key)
+        if location is None:
+            return None
+        path, offset, length = location
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = gzip.decompress(f.read(length))
+        newline = data.index(b'\n')
+        return json.loads(data[:newline]), data[newline + 1:]
+
+
+class ResponseArchiveMiddleware:
+    """把下载到的每个响应写入归档（ARCHIVE_DIR 为空时不启用）
+
+    放在 RedirectMiddleware（600）和 HttpCacheMiddleware（900）之间：
+    归档原始的 302 响应，HTTP 缓存命中的响应也会归档。
+    """
+
+    def __init__(self, writer, stats):
+        self.writer = writer
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        directory = crawler.settings.get('ARCHIVE_DIR')
+        if not directory:
+            raise NotConfigured
+        writer = ArchiveWriter(
+            directory,
+            segment_bytes=int(crawler.settings.getfloat('ARCHIVE_SEGMENT_MB', 64) * 1024 * 1024),
+            level=crawler.settings.getint('ARCHIVE_COMPRESS_LEVEL', 6),
+        )
+        middleware = cls(writer, crawler.stats)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        logger.info(f"响应归档: {directory}")
+        return middleware
+
+    def process_response(self, request, response, spider):
+        if 'archived' in response.flags:
+            return response
+        callback = request.callback
+        self.writer.append({
+            'key': record_key(request.method, request.url),
+            'url': response.url,
+            'status': response.status,
+            'headers': {
+                k.decode('latin-1'): [v.decode('latin-1') for v in values]
+                for k, values in response.headers.items()
+            },
+            'callback': getattr(callback, '__name__', None),
+            'meta': _meta_ids(request.meta),
+            'archived_at': time.time(),
+        }, response.body)
+        self.stats.inc_value('archive/records')
+        self.stats.set_value('archive/bytes', self.writer.bytes_written)
+        return response
+
+    def spider_closed(self, spider):
+        self.writer.close()
+        logger.info(f"响应归档: 写入 {self.writer.records} 条，{self.writer.bytes_written / 1024 / 1024:.1f} MB")
+
+
+class ArchiveReplayMiddleware:
+    """从归档返回响应，不访问网络（ARCHIVE_REPLAY_DIR 为空时不启用）"""
+
+    def __init__(self, directory, stats):
+        self.directory = directory
+        self.stats = stats
+        self.reader = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        directory = crawler.settings.get('ARCHIVE_REPLAY_DIR')
+        if not directory:
+            raise NotConfigured
+        middleware = cls(directory, crawler.stats)
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        return middleware
+
+    def spider_opened(self, spider):
+        self.reader = ArchiveReader(self.directory)
+        logger.info(
+            f"归档回放: {self.directory}（{len(self.reader)} 条记录"
+            + (f"，从段文件补扫 {self.reader.rescanned} 条" if self.reader.rescanned else '') + '）'
+        )
+
+    def process_request(self, request, spider):
+        record = self.reader.get(record_key(request.method, request.url))
+        if record is None:
+            self.stats.inc_value('archive/replay_miss')
+            raise IgnoreRequest(f'归档中没有该请求: {request.url}')
+        header, body = record
+        headers = Headers(header['headers'])
+        respcls = responsetypes.from_args(headers=headers, url=header['url'], body=body)
+        self.stats.inc_value('archive/replay_hit')
+        return respcls(url=header['url'], status=header['status'], headers=headers, body=body,
+                       flags=['archived'], request=request)
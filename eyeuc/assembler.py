@@ -0,0 +1,130 @@
+"""
+EyeUC 多分支 item 组装器
+
+详情页数据（intro、images、metadata 等）按 mid 只保存一份，
+各分支的 todownload 结果回来后按序号归位，分支到齐时输出完整 item。
+请求的 meta 只需携带 mid / vid / 分支序号。
+"""
+
+import time
+from itertools import islice
+
+# 输出 item 中排在 versions 之后的字段（保持与原输出一致的字段顺序）
+_TAIL_KEYS = ('detail_url', 'list_url')
+
+
+class _PendingMod:
+    """单个 mid 的组装状态"""
+
+    __slots__ = ('payload', 'context', 'versions', 'expected', 'branches', 'started_at')
+
+    def __init__(self, payload, context, started_at):
+        self.payload = payload
+        self.context = context  # 不进入 item 的内部数据（formhash、卡片指纹等）
+        self.versions = []  # toversion 解析出的分支列表（name/is_default/intro/stats）
+        self.expected = None  # 期望分支数（toversion 解析后确定）
+        self.branches = {}  # {version_index: version_data}
+        self.started_at = started_at
+
+
+class ItemAssembler:
+    """按 mid 组装多分支 item
+
+    用法：
+        assembler.start(mid, payload)            # parse_detail
+        assembler.set_versions(mid, versions)    # parse_versions
+        item = assembler.add_branch(mid, idx, version_data)  # parse_download_ajax
+        if item: yield item
+    """
+
+    def __init__(self, clock=None):
+        self._clock = clock or time.monotonic
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, mid):
+        return mid in self._pending
+
+    def start(self, mid, payload, context=None):
+        """登记详情页数据（同一 mid 重复登记时覆盖）"""
+        self._pending[mid] = _PendingMod(payload, context or {}, self._clock())
+
+    def payload(self, mid):
+        """详情页数据，mid 未登记时返回 None"""
+        pending = self._pending.get(mid)
+        return pending.payload if pending else None
+
+    def context(self, mid):
+        """登记时附带的内部数据，mid 未登记时返回空 dict"""
+        pending = self._pending.get(mid)
+        return pending.context if pending else {}
+
+    def set_versions(self, mid, versions):
+        """登记分支列表，确定期望分支数"""
+        pending = self._pending[mid]
+        pending.versions = versions
+        pending.expected = len(versions)
+
+    def version(self, mid, index):
+        """第 index 个分支的信息（name/is_default/intro/stats）"""
+        pending = self._pending.get(mid)
+        if pending is None or index >= len(pending.versions):
+            return {}
+        return pending.versions[index]
+
+    def add_branch(self, mid, index, version_data):
+        """收集一个分支的结果
+
+        Returns:
+            dict: 所有分支到齐时返回完整 item（并从组装器中移除），否则返回 None
+        """
+        pending = self._pending.get(mid)
+        if pending is None:
+            return None
+        pending.branches[index] = version_data
+        if pending.expected is not None and len(pending.branches) >= pending.expected:
+            del self._pending[mid]
+            return self._build(pending)
+        return None
+
+    def collected(self, mid):
+        """(已收集分支数, 期望分支数)"""
+        pending = self._pending.get(mid)
+        if pending is None:
+            return 0, 0
+        return len(pending.branches), pending.expected or 0
+
+    def pop(self, mid):
+        """移除并返回未完成的 item（已收集的分支），mid 不存在时返回 None"""
+        pending = self._pending.pop(mid, None)
+        return self._build(pending) if pending else None
+
+    def mids(self):
+        return list(self._pending)
+
+    def expired(self, max_age):
+        """登记超过 max_age 秒的 mid"""
+        now = self._clock()
+        return [mid for mid, pending in self._pending.items() if now - pending.started_at > max_age]
+
+    def oldest(self, count):
+        """最早登记的 count 个 mid"""
+        return list(islice(self._pending, max(count, 0)))
+
+    def age(self, mid):
+        """mid 登记至今的秒数"""
+        pending = self._pending.get(mid)
+        return self._clock() - pending.started_at if pending else 0.0
+
+    def _build(self, pending):
+        versions_data = [pending.branches[i] for i in sorted(pending.branches)]
+        item = {k: v for k, v in pending.payload.items() if k not in _TAIL_KEYS}
+        item['versions'] = versions_data
+        for key in _TAIL_KEYS:
+            if key in pending.payload:
+                item[key] = pending.payload[key]
+        item['total_versions'] = pending.expected or 0
+        item['collected_versions'] = len(versions_data)
+        return item
@@ -0,0 +1,290 @@
+"""
+列式导出（Parquet）：把嵌套的 item 拆成与 schema.sql 对应的 5 张表
+
+    lists      list_id, game
+    mods       mid, list_id, game, category, title, intro_html, cover_image, author, ...,
+               views, downloads, likes, created_at, last_updated, detail_url, list_url,
+               total_versions, collected_versions
+    versions   mod_id, vid, version_name, is_default, intro, updated_at, views, downloads
+    downloads  mod_id, vid, type, fileid, filename, size, url, note, version_label
+    images     mod_id, url, idx
+
+与 MySQL 表的差异：
+- 没有自增 id；versions/downloads 用 (mod_id, vid) 关联（downloads.vid 代替 version_id）
+- mods 多一列 game（字典编码，几乎不占空间），按游戏聚合时不需要 join lists
+- 不保存 raw_json
+
+每张表写在 <输出目录>/<表名>/ 下，每次导出一个文件（文件名由调用方指定，
+多个分片写同一目录互不覆盖），可以用 pyarrow.dataset 把整个目录当作一张表读取。
+行先缓存在内存中，每 row_group_size 行编码为一个 row group；
+game / category / author / type 等重复字符串列使用字典编码。
+
+pyarrow 是可选依赖，只在创建 ColumnarWriter 时导入。
+"""
+
+import re
+from datetime import datetime
+from pathlib import Path
+
+TABLES = ('lists', 'mods', 'versions', 'downloads', 'images')
+
+# 重复度高的字符串列（字典编码）
+DICTIONARY_COLUMNS = {
+    'lists': ['game'],
+    'mods': ['game', 'category', 'author', 'author_url', 'publisher', 'publisher_url', 'list_url'],
+    'versions': ['version_name'],
+    'downloads': ['type', 'size', 'note', 'version_label'],
+    'images': [],
+}
+
+_MID_RE = re.compile(r'/down/view/(\d+)')
+_DT_FORMATS = ('%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S.%f')
+
+
+def schemas():
+    """各表的 Arrow schema（列顺序与 schema.sql 一致）"""
+    import pyarrow as pa
+
+    ts = pa.timestamp('s')
+    return {
+        'lists': pa.schema([
+            ('list_id', pa.int32()),
+            ('game', pa.string()),
+        ]),
+        'mods': pa.schema([
+            ('mid', pa.int32()),
+            ('list_id', pa.int32()),
+            ('game', pa.string()),
+            ('category', pa.string()),
+            ('title', pa.string()),
+            ('intro_html', pa.string()),
+            ('cover_image', pa.string()),
+            ('author', pa.string()),
+            ('author_url', pa.string()),
+            ('publisher', pa.string()),
+            ('publisher_url', pa.string()),
+            ('views', pa.int64()),
+            ('downloads', pa.int64()),
+            ('likes', pa.int64()),
+            ('created_at', ts),
+            ('last_updated', ts),
+            ('detail_url', pa.string()),
+            ('list_url', pa.string()),
+            ('total_versions', pa.int32()),
+            ('collected_versions', pa.int32()),
+        ]),
+        'versions': pa.schema([
+            ('mod_id', pa.int32()),
+            ('vid', pa.int32()),
+            ('version_name', pa.string()),
+            ('is_default', pa.bool_()),
+            ('intro', pa.string()),
+            ('updated_at', ts),
+            ('views', pa.int64()),
+            ('downloads', pa.int64()),
+        ]),
+        'downloads': pa.schema([
+            ('mod_id', pa.int32()),
+            ('vid', pa.int32()),
+            ('type', pa.string()),
+            ('fileid', pa.int64()),
+            ('filename', pa.string()),
+            ('size', pa.string()),
+            ('url', pa.string()),
+            ('note', pa.string()),
+            ('version_label', pa.string()),
+        ]),
+        'images': pa.schema([
+            ('mod_id', pa.int32()),
+            ('url', pa.string()),
+            ('idx', pa.int32()),
+        ]),
+    }
+
+
+def parse_int(value):
+    """'1,234' / ' 56 ' / 78 -> int，无法解析时返回 None"""
+    if value is None or value == '':
+        return None
+    try:
+        return int(str(value).replace(',', '').strip())
+    except ValueError:
+        return None
+
+
+def parse_dt(value):
+    if not value:
+        return None
+    for fmt in _DT_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            pass
+    return None
+
+
+def item_mid(item):
+    """item 的 mid；没有 mid 字段的兜底 item 从 detail_url 中提取"""
+    mid = parse_int(item.get('mid'))
+    if mid is None:
+        match = _MID_RE.search(item.get('detail_url') or '')
+        mid = int(match.group(1)) if match else None
+    return mid
+
+
+def normalize(item):
+    """把一个 item 拆成各表的行：{表名: [行, ...]}，缺少 mid 或 list_id 时返回 None"""
+    mid = item_mid(item)
+    list_id = parse_int(item.get('list_id'))
+    if mid is None or list_id is None:
+        return None
+    md = item.get('metadata') or {}
+    game = item.get('game') or f'list_{list_id}'
+
+    rows = {
+        'lists': [{'list_id': list_id, 'game': game}],
+        'mods': [{
+            'mid': mid,
+            'list_id': list_id,
+            'game': game,
+            'category': item.get('category'),
+            'title': item.get('title'),
+            'intro_html': item.get('intro'),
+            'cover_image': item.get('cover_image'),
+            'author': md.get('author'),
+            'author_url': md.get('author_url'),
+            'publisher': md.get('publisher'),
+            'publisher_url': md.get('publisher_url'),
+            'views': parse_int(md.get('views')),
+            'downloads': parse_int(md.get('downloads')),
+            'likes': parse_int(md.get('likes')),
+            'created_at': parse_dt(md.get('created_at')),
+            'last_updated': parse_dt(md.get('last_updated') or md.get('current_version_updated')),
+            'detail_url': item.get('detail_url'),
+            'list_url': item.get('list_url'),
+            'total_versions': parse_int(item.get('total_versions')),
+            'collected_versions': parse_int(item.get('collected_versions')),
+        }],
+        'versions': [],
+        'downloads': [],
+        'images': [
+            {'mod_id': mid, 'url': url, 'idx': idx}
+            for idx, url in enumerate(item.get('images') or []) if url
+        ],
+    }
+
+    # 多分支 item 的下载在 versions[].downloads 中；兜底解析的 item 只有顶层 downloads
+    versions = item.get('versions')
+    if versions is None:
+        versions = [{'vid': None, 'downloads': item.get('downloads') or [], '_implicit': True}]
+    for ver in versions:
+        vid = parse_int(ver.get('vid'))
+        if not ver.get('_implicit'):
+            stats = ver.get('stats') or {}
+            rows['versions'].append({
+                'mod_id': mid,
+                'vid': vid,
+                'version_name': ver.get('version_name'),
+                'is_default': bool(ver.get('is_default')),
+                'intro': ver.get('intro'),
+                'updated_at': parse_dt(stats.get('updated_at')),
+                'views': parse_int(stats.get('views')),
+                'downloads': parse_int(stats.get('downloads')),
+            })
+        for dl in ver.get('downloads') or []:
+            rows['downloads'].append({
+                'mod_id': mid,
+                'vid': vid,
+                'type': dl.get('type') or ('internal' if dl.get('fileid') else 'external'),
+                'fileid': parse_int(dl.get('fileid')),
+                'filename': dl.get('filename'),
+                'size': dl.get('size'),
+                'url': dl.get('url'),
+                'note': dl.get('note') or dl.get('name'),
+                'version_label': dl.get('version'),
+            })
+    return rows
+
+
+class ColumnarWriter:
+    """把 item 拆表后按 row group 写入 Parquet 文件
+
+    同一 mid 只写一次（先到先得），lists 表每个 list_id 只写一行。
+    add() 只做拆表和缓存；flush_ready() / close() 做编码和写盘，
+    调用方可以把它们放到线程中执行（同一时间只能有一个线程调用）。
+    """
+
+    def __init__(self, directory, name, row_group_size=10000, compression='zstd'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._pq = pq
+        self.directory = Path(directory)
+        self.name = name
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.schemas = schemas()
+        self.rows = {table: [] for table in TABLES}
+        self.counts = {table: 0 for table in TABLES}
+        self.skipped = 0
+        self._writers = {}
+        self._mids = set()
+        self._list_ids = set()
+
+    def add(self, item):
+        """登记一个 item；返回是否写入（重复 mid 或缺少 id 时跳过）"""
+        rows = normalize(item)
+        if rows is None or rows['mods'][0]['mid'] in self._mids:
+            self.skipped += 1
+            return False
+        self._mids.add(rows['mods'][0]['mid'])
+        if rows['lists'][0]['list_id'] in self._list_ids:
+            rows['lists'] = []
+        else:
+            self._list_ids.add(rows['lists'][0]['list_id'])
+        for table, table_rows in rows.items():
+            self.rows[table].extend(table_rows)
+        return True
+
+    def ready(self):
+        """缓存的行数达到一个 row group 的表"""
+        return [table for table in TABLES if len(self.rows[table]) >= self.row_group_size]
+
+    def take(self, tables):
+        """取出指定表的缓存行（调用方随后交给 write()）"""
+        taken = {table: self.rows[table] for table in tables}
+        for table in tables:
+            self.rows[table] = []
+        return taken
+
+    def write(self, taken):
+        """把取出的行编码为 row group 写入文件"""
+        for table, rows in taken.items():
+            for start in range(0, len(rows), self.row_group_size):
+                self._write_rows(table, rows[start:start + self.row_group_size])
+
+    def flush_ready(self):
+        self.write(self.take(self.ready()))
+
+    def close(self):
+        """写入剩余的行并关闭文件；返回 {表名: 文件路径}"""
+        self.write(self.take(TABLES))
+        for writer in self._writers.values():
+            writer.close()
+        return {table: self.directory / table / f'{self.name}.parquet' for table in self._writers}
+
+    def _write_rows(self, table, rows):
+        if not rows:
+            return
+        batch = self._pa.Table.from_pylist(rows, schema=self.schemas[table])
+        writer = self._writers.get(table)
+        if writer is None:
+            path = self.directory / table / f'{self.name}.parquet'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            writer = self._writers[table] = self._pq.ParquetWriter(
+                path, self.schemas[table],
+                compression=self.compression,
+                use_dictionary=DICTIONARY_COLUMNS[table] or False,
+            )
+        writer.write_table(batch, row_group_size=self.row_group_size)
+        self.counts[table] += len(rows)
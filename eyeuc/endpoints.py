@@ -0,0 +1,36 @@
+"""
+EyeUC 接口分类
+
+爬虫访问的四类接口负载差异很大：
+- list:       /down/list/{list_id}/{page}              完整 HTML 列表页
+- detail:     /down/view/{mid}                          完整 HTML 详情页
+- toversion:  down.php?mod=view&mid=..&show=toversion   XHR 片段（分支列表）
+- todownload: down.php?mod=view&mid=..&show=todownload  XHR 片段（文件列表）
+"""
+
+LIST = 'list'
+DETAIL = 'detail'
+TOVERSION = 'toversion'
+TODOWNLOAD = 'todownload'
+OTHER = 'other'
+
+ENDPOINT_CLASSES = (LIST, DETAIL, TOVERSION, TODOWNLOAD)
+
+
+def endpoint_class(url):
+    """根据 URL 判断接口类别（纯字符串匹配，不解析 URL）"""
+    if 'show=todownload' in url:
+        return TODOWNLOAD
+    if 'show=toversion' in url:
+        return TOVERSION
+    if '/down/list/' in url:
+        return LIST
+    if '/down/view/' in url:
+        return DETAIL
+    return OTHER
+
+
+def is_login_url(url):
+    """Discuz 登录页/登录跳转地址（member.php?mod=logging&action=login 等）"""
+    url = url.lower()
+    return 'action=login' in url or 'mod=logging' in url or '/login' in url
@@ -0,0 +1,162 @@
+"""
+解析失败样本的后台写入（按签名去重、gzip 压缩）
+
+网站改版时同一个解析错误会在成千上万个页面上重复出现。以前每次异常都在 reactor 线程里
+同步写一个完整的 .html 文件，既堆积大量相同的样本，也会因为磁盘 I/O 拖慢抓取。
+
+现在按签名（异常类型、回调名、URL 模式）分桶：
+- 每个签名只保存前 max_per_signature 个样本，写成 <签名>/<时间>_<序号>.html.gz
+- 样本由后台线程压缩写入，reactor 线程只把 body 放入有界队列；队列满时丢弃该样本
+- index.json 记录每个签名的出现次数、已保存样本数、示例 URL 和异常信息，
+  每隔 index_interval 秒和关闭时由后台线程重写；重启后从 index.json 继续计数，
+  已经存满的签名不会再保存新样本
+
+    parse_errors/
+      index.json
+      3f2a9c01d4e5/20251017_120000_1.html.gz
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def url_pattern(url):
+    """URL 模式：路径和查询参数名中的数字替换为 N，丢弃参数值
+
+    /down/view/31001                                  -> /down/view/N
+    down.php?mod=view&mid=31001&vid=1&show=todownload -> /down.php?mid&mod&show&vid
+    """
+    parsed = urlparse(url)
+    path = _DIGITS_RE.sub('N', parsed.path) or '/'
+    if parsed.query:
+        keys = sorted({part.split('=', 1)[0] for part in parsed.query.split('&') if part})
+        path += '?' + '&'.join(keys)
+    return path
+
+
+def signature(exception_name, callback, url):
+    """(签名 id, 签名字段)"""
+    fields = {'exception': exception_name, 'callback': callback, 'pattern': url_pattern(url)}
+    key = '\x1f'.join(fields.values()).encode('utf-8')
+    return hashlib.sha1(key).hexdigest()[:12], fields
+
+
+class ErrorSampleWriter:
+    """按签名去重的失败样本写入器（后台线程写盘）"""
+
+    _STOP = object()
+
+    def __init__(self, directory, max_per_signature=5, queue_size=100, level=6, index_interval=30.0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.directory / 'index.json'
+        self.max_per_signature = max_per_signature
+        self.level = level
+        self.index_interval = index_interval
+        self.signatures = self._load_index()
+        self.dropped = 0
+        self.saved = 0
+        self._last_index = 0.0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='ErrorSampleWriter', daemon=True)
+        self._thread.start()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, url, exception, callback, body, encoding='utf-8'):
+        """登记一次解析错误（在 reactor 线程中调用），返回 (签名 id, 本签名第几次出现, 是否保存样本)"""
+        exception_name = type(exception).__name__
+        sig_id, fields = signature(exception_name, callback, url)
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        entry = self.signatures.get(sig_id)
+        if entry is None:
+            entry = self.signatures[sig_id] = dict(
+                fields, count=0, saved=0, first_seen=now, example_url=url,
+                message=str(exception)[:500],
+            )
+        entry['count'] += 1
+        entry['last_seen'] = now
+
+        keep = entry['saved'] < self.max_per_signature
+        if keep:
+            header = (
+                f"<!-- URL: {url} -->\n"
+                f"<!-- Exception: {exception_name}: {exception} -->\n"
+                f"<!-- Callback: {callback} -->\n"
+                f"<!-- Signature: {sig_id} {fields['pattern']} -->\n"
+                f"<!-- Timestamp: {now} -->\n"
+                f"<!-- Encoding: {encoding} -->\n\n"
+            ).encode('utf-8')
+            try:
+                self._queue.put_nowait((sig_id, entry['saved'] + 1, header, body))
+                entry['saved'] += 1
+                self.saved += 1
+            except queue.Full:
+                keep = False
+                self.dropped += 1
+
+        if time.monotonic() - self._last_index >= self.index_interval:
+            self._enqueue_index()
+        return sig_id, entry['count'], keep
+
+    def _enqueue_index(self):
+        self._last_index = time.monotonic()
+        snapshot = json.dumps(self.signatures, ensure_ascii=False, indent=2)
+        try:
+            self._queue.put_nowait(('index', snapshot))
+        except queue.Full:
+            self._last_index = 0.0  # 下次再写
+
+    def close(self):
+        """写入最终的 index.json 并等待后台线程写完（阻塞，可在线程中调用）"""
+        snapshot = json.dumps(self.signatures, ensure_ascii=False, indent=2)
+        self._queue.put(('index', snapshot))
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    # ---- 后台线程 ----
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is self._STOP:
+                return
+            try:
+                if task[0] == 'index':
+                    self._write_index(task[1])
+                else:
+                    self._write_sample(*task)
+            except Exception as e:
+                logger.error(f"写入失败样本出错: {e}")
+
+    def _write_sample(self, sig_id, seq, header, body):
+        sample_dir = self.directory / sig_id
+        sample_dir.mkdir(exist_ok=True)
+        path = sample_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{seq}.html.gz"
+        with gzip.open(path, 'wb', compresslevel=self.level) as f:
+            f.write(header)
+            f.write(body)
+
+    def _write_index(self, snapshot):
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        tmp_path.write_text(snapshot + '\n', encoding='utf-8')
+        os.replace(tmp_path, self.index_path)
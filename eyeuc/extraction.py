@@ -0,0 +1,331 @@
+"""
+EyeUC 声明式字段提取
+
+每种页面的字段规则在这里声明一次（LIST_RULES / DETAIL_RULES），spider 启动时
+编译为 lxml XPath（CSS 选择器使用 parsel 的转换规则，语义与 response.css() 相同），
+由 ExtractionEngine 在解析后端提供的文档树（page.root，列表卡片为 card.root）上执行：
+
+- 每个字段有一组候选选择器，按顺序尝试，第一个得到有效值的候选胜出
+- 引擎记录每个候选的命中率，命中率持续低于 min_hit_rate 的候选定期调到后面
+  （页面改版后主选择器持续失效时，不再每页都先试一遍主选择器）；
+  被调后的候选每 reorder_interval 次仍按声明顺序试一次，页面恢复后会回到前面
+- 每个字段的 hit / fallback / miss 计数写入 crawler stats（extract/<页面>/<字段>/...）
+
+页面改版时修改这里的规则即可，不需要改 spider 代码（spider 只做清洗和归一化）。
+注意：lxml 后端只解析 RegionSlicer 切出的区域（<head>、<h1>、LIST_SLICE / DETAIL_SLICE
+中的 div 和 var _data 脚本），新规则指向其他区域时需同时加入对应的切片配置。
+"""
+
+import re
+
+from lxml import etree
+from parsel.csstranslator import css2xpath
+
+
+class FieldRule:
+    """一个字段的提取规则
+
+    Args:
+        selectors: 候选选择器（CSS 或 XPath，以 / 或 ( 开头视为 XPath），按优先级排列；
+            候选也可以是带独立选项的 FieldRule
+        many: 返回全部有效值的列表（至少有一个有效值才算命中）
+        scan: 逐个尝试全部结果，取第一个有效值（如面包屑中的多个文本节点）
+        join: 把全部结果拼接为一个值（如 h1 下的多个文本节点）
+        merge: selectors 不是兜底关系，而是按顺序合并结果的同一个候选（如正文图片的多个来源）
+        fields: {子字段: 选择器}，selectors 选中的每个节点输出一条记录
+            （子选择器相对该节点执行，取第一个结果的原始文本，未找到为 None）
+        pattern: 正则，取第一个匹配值的 group(1)
+        exclude: 正则结果在此列表中时视为未命中
+        sub: [(正则, 替换), ...]，strip 之前依次替换（忽略大小写，. 匹配换行）
+        strip: 去掉首尾空白；空值总是视为未命中
+        reorder: 是否按命中率调整候选顺序。前面的候选缺失是正常情况、
+            且后面的候选总能命中时（如 .view-message 包含 .markdown-body）需关闭，
+            否则调整顺序后提取结果会变化
+    """
+
+    def __init__(self, selectors, many=False, scan=False, join=False, merge=False, fields=None,
+                 pattern=None, exclude=(), sub=(), strip=True, reorder=True):
+        self.selectors = [selectors] if isinstance(selectors, str) else list(selectors)
+        self.many = many
+        self.scan = scan or join
+        self.join = join
+        self.merge = merge
+        self.fields = fields
+        self.pattern = re.compile(pattern, re.IGNORECASE) if pattern else None
+        self.exclude = set(exclude)
+        self.sub = [(re.compile(regex, re.DOTALL | re.IGNORECASE), repl) for regex, repl in sub]
+        self.strip = strip
+        self.reorder = reorder
+
+
+# ---- 列表页 ----
+
+GAME_PATTERN = r'(NBA\s*2K\s*\d{2,4})'
+
+LIST_RULES = {
+    # 游戏名：H1 > title > 面包屑，取第一个 NBA 2K 系列名
+    'game_name': FieldRule([
+        FieldRule('h1::text', pattern=GAME_PATTERN),
+        FieldRule('title::text', pattern=GAME_PATTERN),
+        FieldRule('.crumb *::text, .breadcrumb *::text', scan=True, pattern=GAME_PATTERN),
+    ]),
+    # 资源卡片（.modlist ul li，在 card.root 上提取）：详情链接和封面图（原始值，补全和清洗在 spider 中）
+    'card_href': FieldRule('a[href*="/down/view/"]::attr(href)', strip=False),
+    'card_cover': FieldRule('.modpic img::attr(data-original)', strip=False),
+}
+
+# ---- 详情页 ----
+
+DATA_SCRIPT = 'script:contains("var _data")::text'
+SCRIPT_TAG = (r'<script[^>]*>.*?</script>', '')
+
+DETAIL_RULES = {
+    # 标题：H1（作者 / 标题 / 版本）> title 去掉站点后缀
+    'title': FieldRule([
+        FieldRule('h1#title ::text', join=True),
+        FieldRule('title::text', pattern=r'^(.*?)(?: - EYE资源中心)?$'),
+    ]),
+    # 分类：meta keywords（NBA2K25资源下载,NBA2K25照片,...）> title（xxxx_NBA2K25照片 - EYE资源中心）
+    'category': FieldRule([
+        FieldRule('meta[name="keywords"]::attr(content)', pattern=r'NBA\s*2K\s*\d{2,4}\s*([^,，\s]+)',
+                  exclude=('资源下载', '资源', '下载', 'mods')),
+        FieldRule('title::text', pattern=r'_NBA\s*2K\s*\d{2,4}\s*([^_\-\s]+)'),
+    ]),
+    # 直链提取用的 id：var _data = {"mid": "31047", "vid": "46111", "formhash": "98e0550f", ...}
+    'mid': FieldRule(DATA_SCRIPT, pattern=r'"mid":\s*"(\d+)"'),
+    'vid': FieldRule(DATA_SCRIPT, pattern=r'"vid":\s*"(\d+)"'),
+    'formhash': FieldRule(DATA_SCRIPT, pattern=r'"formhash":\s*"([a-f0-9]+)"'),
+    # 正文图片：#imglist 的 data-original/src，.view-message 的 src/data-original 按顺序合并
+    # （过滤小图标、去缩略图后缀和去重在 spider 中）
+    'images': FieldRule([
+        '#imglist img::attr(data-original)',
+        '#imglist img::attr(src)',
+        '.view-message img::attr(src)',
+        '.view-message img::attr(data-original)',
+    ], merge=True, many=True, strip=False),
+    # 简介：Markdown 格式返回 .markdown-body 的 HTML，纯文本格式返回整个 .view-message 的 HTML
+    # （保留 <br>、<a> 等标签，去掉 script 和标签间的空白）
+    'intro': FieldRule([
+        FieldRule('.view-message .markdown-body', sub=[SCRIPT_TAG]),
+        FieldRule('.view-message', sub=[SCRIPT_TAG, (r'>\s+', '>'), (r'\s+<', '<')]),
+    ], reorder=False),
+    # 统计数据：.top-right-info 中的每个 span（查看 / 下载 / 喜欢）
+    'stats': FieldRule('.top-right-info span', many=True, fields={
+        'label': 'a::text',
+        'count': 'em::text',
+    }),
+    # 详细信息：.uploadinfo 中的每个 li（更新/创建时间、作者、发布者）
+    'upload_info': FieldRule('.uploadinfo ul li', many=True, fields={
+        'label': 'p.custom-tt::text',
+        'span_title': 'span::attr(title)',
+        'span_text': 'span::text',
+        'p_text': 'p:not(.custom-tt)::text',
+        'a_text': 'a::text',
+        'a_href': 'a::attr(href)',
+    }),
+    # 正文链接（旧的下载链接提取方法兜底使用）
+    'content_links': FieldRule('.view-message a::attr(href)', many=True, strip=False),
+}
+
+RULES = {
+    'list': LIST_RULES,
+    'detail': DETAIL_RULES,
+}
+
+
+def _compile(selector):
+    try:
+        return etree.XPath(selector if selector.startswith(('/', '(')) else css2xpath(selector))
+    except Exception as e:
+        raise ValueError(f'无法编译选择器 {selector!r}: {e}') from e
+
+
+class _Candidate:
+    """编译后的候选选择器及其命中统计"""
+
+    __slots__ = ('index', 'selector', 'rule', 'xpaths', 'fields', 'hits', 'attempts')
+
+    def __init__(self, index, selectors, rule):
+        self.index = index  # 声明顺序（0 为主选择器）
+        self.selector = ' + '.join(selectors)
+        self.rule = rule
+        self.xpaths = [_compile(selector) for selector in selectors]
+        self.fields = {name: _compile(selector) for name, selector in rule.fields.items()} if rule.fields else None
+        self.hits = 0
+        self.attempts = 0
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.attempts if self.attempts else 0.0
+
+    def evaluate(self, root):
+        rule = self.rule
+        results = []
+        for xpath in self.xpaths:
+            found = xpath(root)
+            if not isinstance(found, list):  # string()/count() 等返回标量
+                found = [found]
+            results.extend(found)
+        if not (rule.many or rule.scan):
+            results = results[:1]
+
+        if self.fields is not None:
+            records = [
+                {name: _first(query(node)) for name, query in self.fields.items()}
+                for node in results
+            ]
+            return (records if rule.many else records[0]) if records else None
+
+        values = [r if isinstance(r, str) else _tostring(r) for r in results]
+        if rule.join:
+            values = [''.join(values)] if values else []
+
+        valid = []
+        for value in values:
+            value = self._clean(str(value))
+            if value is None:
+                continue
+            if not rule.many:
+                return value
+            valid.append(value)
+        return valid or None
+
+    def _clean(self, value):
+        """替换、去空白、正则提取；无效值返回 None"""
+        rule = self.rule
+        for regex, repl in rule.sub:
+            value = regex.sub(repl, value)
+        if rule.strip:
+            value = value.strip()
+        if rule.pattern is not None:
+            match = rule.pattern.search(value)
+            if not match:
+                return None
+            value = match.group(1)
+            if rule.strip:
+                value = value.strip()
+            if value in rule.exclude:
+                return None
+        return value or None
+
+
+def _first(results):
+    return str(results[0]) if results else None
+
+
+def _tostring(element):
+    if isinstance(element, etree._Element):
+        return etree.tostring(element, method='html', encoding='unicode', with_tail=False)
+    return str(element)
+
+
+class _CompiledField:
+
+    def __init__(self, name, rule):
+        self.name = name
+        self.reorder = rule.reorder
+        self.candidates = []
+        # 候选可以是选择器字符串，也可以是带独立选项的 FieldRule；merge 规则的全部选择器是同一个候选
+        for selector in ([rule] if rule.merge else rule.selectors):
+            sub_rule = selector if isinstance(selector, FieldRule) else rule
+            if not isinstance(selector, FieldRule):
+                groups = [[selector]]
+            elif selector.merge:
+                groups = [selector.selectors]
+            else:
+                groups = [[sub_selector] for sub_selector in selector.selectors]
+            for group in groups:
+                self.candidates.append(_Candidate(len(self.candidates), group, sub_rule))
+        self.order = list(self.candidates)
+        self.calls = 0
+
+
+class ExtractionEngine:
+    """执行编译后的字段规则，并按命中率自动调整候选顺序
+
+    Args:
+        rules: {页面类型: {字段: FieldRule}}
+        reorder_interval: 每个字段每提取多少次重新评估一次候选顺序
+        window: 命中统计的窗口（尝试次数超过后减半，旧数据逐渐失效）
+        min_hit_rate: 命中率低于此值（且至少尝试 min_attempts 次）的候选排到后面
+    """
+
+    def __init__(self, rules=None, reorder_interval=100, window=1000, min_hit_rate=0.5, min_attempts=20,
+                 logger=None):
+        self.fields = {
+            page_type: {name: _CompiledField(name, rule) for name, rule in page_rules.items()}
+            for page_type, page_rules in (rules or RULES).items()
+        }
+        self.reorder_interval = reorder_interval
+        self.window = window
+        self.min_hit_rate = min_hit_rate
+        self.min_attempts = min_attempts
+        self.logger = logger
+        self.stats = None  # crawler stats（spider_opened 后设置）
+        self.fallbacks = 0
+
+    def extract(self, page_type, name, root, default=None):
+        """在文档树 root 上提取字段，所有候选都未命中时返回 default"""
+        field = self.fields[page_type][name]
+        value = None
+        winner = None
+        field.calls += 1
+        # 定期按声明顺序试一次，让被调后的候选有机会恢复
+        probe = field.calls % self.reorder_interval == 0
+        for candidate in (field.candidates if probe else field.order):
+            candidate.attempts += 1
+            try:
+                value = candidate.evaluate(root)
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"选择器执行失败 ({page_type}.{name}: {candidate.selector}): {e}")
+                value = None
+            if candidate.attempts >= self.window:
+                candidate.hits //= 2
+                candidate.attempts //= 2
+            if value is not None:
+                candidate.hits += 1
+                if probe and candidate.hit_rate < self.min_hit_rate:
+                    # 被调后的候选在试探中命中：页面已恢复，重新计数
+                    candidate.hits = candidate.attempts = 1
+                winner = candidate
+                break
+
+        if winner is None:
+            outcome = 'miss'
+        elif winner.index == 0:
+            outcome = 'hit'
+        else:
+            outcome = 'fallback'
+            self.fallbacks += 1
+            if self.logger:
+                self.logger.debug(f"选择器兜底 ({page_type}.{name}): 使用第 {winner.index} 个兜底选择器")
+        if self.stats is not None:
+            self.stats.inc_value(f'extract/{page_type}/{name}/{outcome}')
+
+        if probe and field.reorder:
+            self._reorder(page_type, field)
+        return value if winner is not None else default
+
+    def _reorder(self, page_type, field):
+        # 只调后持续失效的候选：兜底候选只在前面的候选失败时才会被尝试，
+        # 它的命中率是条件命中率，不能直接和主选择器比较
+        failing = [c for c in field.candidates
+                   if c.attempts >= self.min_attempts and c.hit_rate < self.min_hit_rate]
+        order = [c for c in field.candidates if c not in failing]
+        order += sorted(failing, key=lambda c: (-c.hit_rate, c.index))
+        if order != field.order:
+            field.order = order
+            if self.logger:
+                self.logger.info(
+                    f"字段 {page_type}.{field.name} 调整选择器顺序: "
+                    + ' > '.join(f"{c.selector} ({c.hit_rate:.0%})" for c in order)
+                )
+
+    def report(self):
+        """{页面类型.字段: [(选择器, 命中, 尝试), ...]}（按当前顺序）"""
+        return {
+            f'{page_type}.{name}': [(c.selector, c.hits, c.attempts) for c in field.order]
+            for page_type, fields in self.fields.items()
+            for name, field in fields.items()
+        }
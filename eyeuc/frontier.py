@@ -0,0 +1,134 @@
+"""
+EyeUC 可恢复抓取的持久化 frontier
+
+按 job 保存抓取进度（SQLite 单文件，只存 id，不存 meta 大字段）：
+- list_state:  每个 list_id 的游戏名、是否已到末页
+- list_pages:  已解析完成的列表页
+- pending:     已发出详情请求但尚未输出 item 的 mid（含所在页和封面图）
+- completed:   已输出 item 的 mid
+
+同一 job 重启时：跳过已完成的列表页和 mid，重新发出 pending 中的详情请求，
+从已解析的最大页之后继续翻页。
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+
+
+class CrawlFrontier:
+    """持久化 frontier（批量提交，写入开销与请求数线性相关但很小）"""
+
+    def __init__(self, path, commit_interval=1.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.commit_interval = commit_interval
+        self._last_commit = time.monotonic()
+
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS list_state (
+                list_id INTEGER PRIMARY KEY,
+                game_name TEXT,
+                done INTEGER DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS list_pages (
+                list_id INTEGER,
+                page INTEGER,
+                PRIMARY KEY (list_id, page)
+            );
+            CREATE TABLE IF NOT EXISTS pending (
+                mid TEXT PRIMARY KEY,
+                list_id INTEGER,
+                page INTEGER,
+                cover_image TEXT
+            );
+            CREATE TABLE IF NOT EXISTS completed (
+                mid TEXT PRIMARY KEY
+            );
+            """
+        )
+        self.conn.commit()
+
+        self._completed = {row[0] for row in self.conn.execute('SELECT mid FROM completed')}
+        self.resuming = bool(self._completed) or bool(
+            self.conn.execute('SELECT 1 FROM list_pages LIMIT 1').fetchone()
+        )
+
+    # ---- 查询（启动/恢复时） ----
+
+    def is_completed(self, mid):
+        return mid in self._completed
+
+    @property
+    def completed_count(self):
+        return len(self._completed)
+
+    def list_state(self, list_id):
+        """返回 (game_name, done, 已解析页集合)"""
+        row = self.conn.execute(
+            'SELECT game_name, done FROM list_state WHERE list_id = ?', (list_id,)
+        ).fetchone()
+        pages = {r[0] for r in self.conn.execute(
+            'SELECT page FROM list_pages WHERE list_id = ?', (list_id,)
+        )}
+        if not row:
+            return None, False, pages
+        return row[0], bool(row[1]), pages
+
+    def pending_mids(self, list_id):
+        """该列表中已发出请求但未完成的 mid：[(mid, page, cover_image), ...]"""
+        return self.conn.execute(
+            'SELECT mid, page, cover_image FROM pending WHERE list_id = ? ORDER BY page, mid',
+            (list_id,),
+        ).fetchall()
+
+    # ---- 更新（抓取过程中） ----
+
+    def add_pending(self, mid, list_id, page, cover_image=''):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO pending (mid, list_id, page, cover_image) VALUES (?, ?, ?, ?)',
+            (mid, list_id, page, cover_image),
+        )
+        self._maybe_commit()
+
+    def page_done(self, list_id, page, game_name=None):
+        if game_name:
+            self.conn.execute(
+                'INSERT INTO list_state (list_id, game_name) VALUES (?, ?) '
+                'ON CONFLICT(list_id) DO UPDATE SET game_name = excluded.game_name',
+                (list_id, game_name),
+            )
+        self.conn.execute('INSERT OR IGNORE INTO list_pages (list_id, page) VALUES (?, ?)', (list_id, page))
+        self._maybe_commit()
+
+    def list_done(self, list_id):
+        self.conn.execute(
+            'INSERT INTO list_state (list_id, done) VALUES (?, 1) '
+            'ON CONFLICT(list_id) DO UPDATE SET done = 1',
+            (list_id,),
+        )
+        self.commit()
+
+    def complete(self, mid):
+        if mid in self._completed:
+            return
+        self._completed.add(mid)
+        self.conn.execute('INSERT OR IGNORE INTO completed (mid) VALUES (?)', (mid,))
+        self.conn.execute('DELETE FROM pending WHERE mid = ?', (mid,))
+        self._maybe_commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def _maybe_commit(self):
+        if time.monotonic() - self._last_commit >= self.commit_interval:
+            self.commit()
@@ -0,0 +1,74 @@
+"""
+固定内存的流式延迟直方图
+
+对数分桶（HDR 风格）：桶边界从 lowest 起按 g = 1 + 2 * relative_error 等比增长，
+取桶的几何中点作为估计值，分位数的相对误差不超过 relative_error。
+桶数组在构造时一次分配（默认 0.1ms ~ 10min、1% 误差约 800 个桶），
+之后不再增长，长时间运行内存保持不变；count / sum / min / max 精确记录。
+"""
+
+import math
+
+
+class LatencyHistogram:
+    """单个延迟分布（单位：秒）"""
+
+    def __init__(self, lowest=0.0001, highest=600.0, relative_error=0.01):
+        self.lowest = lowest
+        self.highest = highest
+        self._log_growth = math.log1p(2 * relative_error)
+        self._growth = 1 + 2 * relative_error
+        size = int(math.log(highest / lowest) / self._log_growth) + 2
+        self.buckets = [0] * size
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value <= self.lowest:
+            return 0
+        return min(len(self.buckets) - 1, int(math.log(value / self.lowest) / self._log_growth) + 1)
+
+    def _value(self, index):
+        """桶的代表值（几何中点），第 0 个桶为 lowest"""
+        if index == 0:
+            return self.lowest
+        return self.lowest * self._growth ** (index - 0.5)
+
+    def record(self, value):
+        self.buckets[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """q 分位数（0 < q <= 1），没有数据时返回 None"""
+        return self.quantiles((q,))[0]
+
+    def quantiles(self, qs):
+        """一次遍历计算多个分位数，返回与 qs 对应的列表"""
+        if not self.count:
+            return [None] * len(qs)
+        ranks = [max(1, math.ceil(q * self.count)) for q in qs]
+        order = sorted(range(len(qs)), key=lambda i: ranks[i])
+        results = [self.max] * len(qs)
+        seen = 0
+        pos = 0
+        for index, n in enumerate(self.buckets):
+            if not n:
+                continue
+            seen += n
+            while pos < len(order) and seen >= ranks[order[pos]]:
+                results[order[pos]] = min(max(self._value(index), self.min), self.max)
+                pos += 1
+            if pos == len(order):
+                break
+        return results
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
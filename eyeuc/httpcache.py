@@ -0,0 +1,248 @@
+"""
+EyeUC HTTP 缓存（开发重跑 / 局部重抓时命中缓存，不再访问网站）
+
+- SqliteCacheStorage：所有响应存放在一个 SQLite 文件中（body 使用 zlib 压缩），
+  总大小超过 HTTPCACHE_MAX_MB 时按最近访问时间淘汰（LRU）。
+  toversion / todownload 片段按 (mid, vid) 作为缓存键，其他页面按请求指纹。
+- EndpointCachePolicy：按接口类别的缓存策略（HTTPCACHE_ENDPOINT_POLICY）：
+  缓存时间 ttl 内直接使用缓存，过期后带 If-None-Match / If-Modified-Since 重新验证，
+  304 时继续使用缓存，否则用新响应替换。
+- EndpointHttpCacheMiddleware：在 Scrapy 的 HttpCacheMiddleware 基础上按接口类别统计
+  命中 / 未命中 / 重新验证，并统计节省的字节数（httpcache/bytes_saved）。
+
+缓存不区分登录状态（cookies），切换账号后需删除缓存文件。未登录的页面和片段
+（登录跳转、含 SESSION_LOGIN_MARKERS 标记）不缓存：缓存中间件（900）比 SessionHealthMiddleware
+（620）先看到响应，而命中缓存的响应不再做会话检查，缓存后会一直返回未登录的内容。
+"""
+
+import logging
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.extensions.httpcache import RFC2616Policy
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.httpobj import urlparse_cached
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+from eyeuc.endpoints import TODOWNLOAD, TOVERSION, endpoint_class
+from eyeuc.session import login_reason
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(request, fingerprinter):
+    """(接口类别, 缓存键)：XHR 片段按 mid / vid，其他按请求指纹"""
+    endpoint = endpoint_class(request.url)
+    if endpoint in (TOVERSION, TODOWNLOAD):
+        query = parse_qs(urlparse_cached(request).query)
+        mid = query.get('mid', [''])[0]
+        if mid:
+            return endpoint, f"{endpoint}:{mid}:{query.get('vid', [''])[0]}"
+    return endpoint, f"{endpoint}:{fingerprinter.fingerprint(request).hex()}"
+
+
+class SqliteCacheStorage:
+    """单文件 SQLite 缓存存储（HTTPCACHE_STORAGE）
+
+    表结构：
+    - responses(key, endpoint, url, status, headers, body, size, stored_at, accessed_at)
+      body 为 zlib 压缩后的内容，size 为 headers + 压缩 body 的字节数
+
+    访问时间的更新和写入按批提交（commit_every 条一次），close_spider() 时提交剩余部分。
+    """
+
+    def __init__(self, settings, commit_every=200):
+        self.path = Path(settings.get('HTTPCACHE_SQLITE_PATH', 'httpcache/eyeuc_cache.db'))
+        self.max_bytes = int(settings.getfloat('HTTPCACHE_MAX_MB', 512) * 1024 * 1024)
+        self.level = settings.getint('HTTPCACHE_COMPRESS_LEVEL', 6)
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self.conn = None
+        self.stats = None
+        self.fingerprinter = None
+        self.total_bytes = 0
+        self.evicted = 0
+
+    def open_spider(self, spider):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT,
+                url TEXT,
+                status INTEGER,
+                headers BLOB,
+                body BLOB,
+                size INTEGER,
+                stored_at REAL,
+                accessed_at REAL
+            )
+            """
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)')
+        self.conn.commit()
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        self.stats = spider.crawler.stats
+        self.fingerprinter = spider.crawler.request_fingerprinter
+        count = self.conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        logger.info(f"HTTP 缓存: {self.path}（{count} 条，{self.total_bytes / 1024 / 1024:.1f} MB）")
+
+    def close_spider(self, spider):
+        if self.conn is None:
+            return
+        self._publish()
+        self.conn.commit()
+        self.conn.close()
+        self.conn = None
+        logger.info(f"HTTP 缓存: 关闭（{self.total_bytes / 1024 / 1024:.1f} MB，本次淘汰 {self.evicted} 条）")
+
+    def retrieve_response(self, spider, request):
+        _, key = cache_key(request, self.fingerprinter)
+        row = self.conn.execute(
+            'SELECT url, status, headers, body FROM responses WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        url, status, raw_headers, body = row
+        self.conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (time.time(), key))
+        self._maybe_commit()
+
+        body = zlib.decompress(body)
+        headers = Headers(headers_raw_to_dict(raw_headers))
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        endpoint, key = cache_key(request, self.fingerprinter)
+        raw_headers = headers_dict_to_raw(response.headers)
+        body = zlib.compress(response.body, self.level)
+        size = len(raw_headers) + len(body)
+
+        old = self.conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+        if old is not None:
+            self.total_bytes -= old[0]
+        now = time.time()
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO responses
+                (key, endpoint, url, status, headers, body, size, stored_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (key, endpoint, response.url, response.status, raw_headers, body, size, now, now),
+        )
+        self.total_bytes += size
+        if self.total_bytes > self.max_bytes:
+            self._evict()
+        self._maybe_commit()
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到总大小降到上限的 90%"""
+        target = self.total_bytes - int(self.max_bytes * 0.9)
+        freed = 0
+        keys = []
+        for key, size in self.conn.execute('SELECT key, size FROM responses ORDER BY accessed_at'):
+            keys.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self.conn.executemany('DELETE FROM responses WHERE key = ?', keys)
+        self.conn.commit()
+        self._uncommitted = 0
+        self.total_bytes -= freed
+        self.evicted += len(keys)
+        self.stats.inc_value('httpcache/evicted', len(keys))
+        logger.info(f"HTTP 缓存: 超过 {self.max_bytes / 1024 / 1024:.0f} MB，淘汰 {len(keys)} 条")
+
+    def _maybe_commit(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.conn.commit()
+            self._uncommitted = 0
+            self._publish()
+
+    def _publish(self):
+        self.stats.set_value('httpcache/db_bytes', self.total_bytes)
+
+
+class EndpointCachePolicy(RFC2616Policy):
+    """按接口类别的缓存策略（HTTPCACHE_POLICY）
+
+    HTTPCACHE_ENDPOINT_POLICY = {接口类别: {"ttl": 秒, "revalidate": bool}}：
+    - ttl 内直接使用缓存（0 为每次都重新验证）
+    - 过期后 revalidate 为 True 时带上缓存响应的 ETag / Last-Modified 发起条件请求，
+      否则直接重新下载
+    - 不在配置中的接口类别不缓存
+
+    网站通常不返回 Cache-Control，所以不按 RFC2616 判断是否可缓存：
+    除 Cache-Control: no-store 和未登录的响应外，所有 200 响应都会缓存。
+    未登录的判断与 SessionHealthMiddleware 相同（login_reason），但所有接口类别都检查标记
+    （todownload 片段未登录时下载项都是 showWindow('login'）。
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.endpoints = {
+            name: (float(conf.get('ttl', 0)), bool(conf.get('revalidate', True)))
+            for name, conf in settings.getdict('HTTPCACHE_ENDPOINT_POLICY').items()
+        }
+        self.login_markers = [m.encode('utf-8') for m in settings.getlist('SESSION_LOGIN_MARKERS')]
+        self.login_check_bytes = settings.getint('SESSION_CHECK_BYTES', 32768)
+
+    def should_cache_request(self, request):
+        return endpoint_class(request.url) in self.endpoints and super().should_cache_request(request)
+
+    def should_cache_response(self, response, request):
+        if response.status != 200 or b'no-store' in self._parse_cachecontrol(response):
+            return False
+        return login_reason(response, self.login_markers, self.login_check_bytes) is None
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        ttl, revalidate = self.endpoints[endpoint_class(request.url)]
+        if b'no-cache' not in self._parse_cachecontrol(request):
+            if self._compute_current_age(cachedresponse, request, time.time()) < ttl:
+                return True
+        if revalidate:
+            self._set_conditional_validators(request, cachedresponse)
+        return False
+
+
+class EndpointHttpCacheMiddleware(HttpCacheMiddleware):
+    """HttpCacheMiddleware + 按接口类别的统计
+
+    stats：
+    - httpcache/<接口类别>/hit|miss|stale|revalidated
+    - httpcache/bytes_saved：直接命中和 304 重新验证时复用的响应体字节数
+    """
+
+    def process_request(self, request, spider):
+        response = super().process_request(request, spider)
+        if request.meta.get('dont_cache', False) or '_dont_cache' in request.meta:
+            return response
+        endpoint = endpoint_class(request.url)
+        if response is not None:
+            self._count(endpoint, 'hit', response, spider)
+        elif 'cached_response' in request.meta:
+            self.stats.inc_value(f'httpcache/{endpoint}/stale', spider=spider)
+        else:
+            self.stats.inc_value(f'httpcache/{endpoint}/miss', spider=spider)
+        return response
+
+    def process_response(self, request, response, spider):
+        result = super().process_response(request, response, spider)
+        if result is not response and 'cached' in result.flags:
+            # 304 / 服务器错误时使用了缓存响应
+            self._count(endpoint_class(request.url), 'revalidated', result, spider)
+        return result
+
+    def _count(self, endpoint, outcome, response, spider):
+        self.stats.inc_value(f'httpcache/{endpoint}/{outcome}', spider=spider)
+        self.stats.inc_value('httpcache/bytes_saved', len(response.body), spider=spider)
@@ -0,0 +1,327 @@
+"""
+PerListJsonPipeline 的后台批量写入（group commit）
+
+以前每个 item 都在 reactor 线程里 json.dump + flush，JSON 数组模式还带 indent=2，
+磁盘慢或 item 多时直接拖慢抓取。现在：
+- reactor 线程只做序列化（有 orjson 时使用 orjson，否则使用标准库 json），
+  把字节串放入有界队列
+- 写入线程攒够 batch_items 个 item 或距第一个未提交 item 超过 batch_ms 毫秒时，
+  把每个文件的数据拼成一次 write + flush 提交（group commit）
+- fsync 策略：none（只 flush）、batch（每次提交后 fsync）、close（关闭时 fsync，默认）
+- 队列满时不阻塞 reactor：item 进入等待列表，process_item 返回的 Deferred
+  在写入线程腾出空间后才触发，由 Scrapy 的 item 并发上限形成背压
+- close() 写完队列中剩余的数据、文件结尾（JSON 数组的 ]）后再返回，不丢失、不截断 item
+
+分段输出（eyeuc/segments.py）：compression 为 gzip / zstd 或 segment_bytes > 0 时，
+每个文件写成压缩段，段文件（压缩后）超过 segment_bytes 时滚动到下一段，
+每段结尾写一行清单（item 数、mid 范围）。打开的文件句柄放在 LRU 池中，
+超过 max_open 时关闭最久未写入的文件，下次写入时追加打开。
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from pathlib import Path
+
+from twisted.internet.defer import Deferred
+
+from eyeuc import segments
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ('none', 'batch', 'close')
+
+
+def dumps(item):
+    """序列化一个 item 为 UTF-8 字节串（不转义非 ASCII 字符）"""
+    if orjson is not None:
+        return orjson.dumps(item, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(item, ensure_ascii=False).encode('utf-8')
+
+
+class _OutputFile:
+    """一个 key（list_id）的输出，分段时对应多个段文件"""
+
+    def __init__(self, key, path, header, separator, footer):
+        self.key = key
+        self.path = Path(path)
+        self.header = header
+        self.separator = separator
+        self.footer = footer
+        self.count = 0
+        self.pending = []
+        self.pending_items = 0
+        self.pending_mids = []
+        self.segment = 0  # 当前段号（从 1 开始，0 表示还没有创建段）
+        self.segment_items = 0
+        self.mid_min = None
+        self.mid_max = None
+        self.paths = []
+        self.stream = None
+        self.raw = None
+
+    def note_mids(self, mids):
+        for mid in mids:
+            if mid is None:
+                continue
+            if self.mid_min is None or mid < self.mid_min:
+                self.mid_min = mid
+            if self.mid_max is None or mid > self.mid_max:
+                self.mid_max = mid
+
+
+class BufferedItemWriter:
+    """按文件分组、后台线程批量提交的写入器
+
+    open() / write() 只能在 reactor 线程调用；文件句柄只由写入线程使用。
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_items=500, batch_ms=200, queue_size=10000, fsync='close',
+                 compression=None, segment_bytes=0, max_open=64, level=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync 策略必须是 {FSYNC_POLICIES} 之一: {fsync!r}")
+        if not segments.available(compression):
+            raise ValueError(f"不支持的压缩算法（zstd 需要安装 zstandard）: {compression!r}")
+        self.compression = compression
+        self.segment_bytes = segment_bytes
+        self.segmented = bool(compression or segment_bytes)
+        self.max_open = max(1, max_open)
+        self.level = level
+        self.batch_items = max(1, batch_items)
+        self.batch_seconds = batch_ms / 1000.0
+        self.fsync = fsync
+        self.files = {}  # {key: _OutputFile}，仅写入线程访问（close() 返回后可以读取）
+        self._open = OrderedDict()  # 打开的文件句柄（LRU）：{key: _OutputFile}
+        self.reopens = 0
+        self.written = 0
+        self.commits = 0
+        self.errors = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._blocked = deque()  # 队列满时等待放入的 (task, Deferred)
+        self._thread = threading.Thread(target=self._run, name='BufferedItemWriter', daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() + len(self._blocked)
+
+    def open(self, key, path, header=b'', separator=b'', footer=b''):
+        """登记一个输出文件；header 写在文件开头，footer 在关闭时写入，separator 写在相邻 item 之间
+
+        分段输出时 path 是 .jsonl 文件名，实际段文件名由 segment_path() 生成。
+        """
+        return self._put(('open', key, path, header, separator, footer))
+
+    def write(self, key, data, mid=None):
+        """放入一条已序列化的记录（mid 用于段清单）；队列未满时返回 None，否则返回放入后触发的 Deferred"""
+        return self._put(('write', key, data, mid))
+
+    def segment_path(self, path, segment):
+        """第 segment 段的文件名：<名称>[_partNNNN].jsonl[.gz|.zst]"""
+        if not self.segmented:
+            return path
+        path = Path(path)
+        part = f'_part{segment:04d}' if self.segment_bytes else ''
+        return path.with_name(f'{path.stem}{part}{path.suffix}{segments.EXTENSIONS[self.compression]}')
+
+    def output_paths(self, key):
+        """key 的所有段文件（close() 之后调用）"""
+        output = self.files.get(key)
+        return list(output.paths) if output is not None else []
+
+    def _put(self, task):
+        with self._lock:
+            if not self._blocked:
+                try:
+                    self._queue.put_nowait(task)
+                    return None
+                except queue.Full:
+                    pass
+            d = Deferred()
+            self._blocked.append((task, d))
+            return d
+
+    def _release(self):
+        """（reactor 线程）把等待列表中的任务放入队列，触发对应的 Deferred"""
+        ready = []
+        with self._lock:
+            while self._blocked:
+                task, d = self._blocked[0]
+                try:
+                    self._queue.put_nowait(task)
+                except queue.Full:
+                    break
+                self._blocked.popleft()
+                ready.append(d)
+        for d in ready:
+            d.callback(None)
+
+    def close(self):
+        """写完剩余数据、写入文件结尾并关闭文件（阻塞，在线程中调用）
+
+        调用前 reactor 线程不再有新的 write()；等待列表中的任务按顺序放入队列。
+        """
+        while True:
+            with self._lock:
+                if not self._blocked:
+                    break
+                task, d = self._blocked.popleft()
+            self._queue.put(task)
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    # ---- 写入线程 ----
+
+    def _run(self):
+        pending = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                task = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                task = None
+
+            if task is self._STOP:
+                self._commit()
+                self._close_files()
+                return
+            if task is not None:
+                if task[0] == 'write':
+                    output = self.files.get(task[1])
+                    if output is None:
+                        self.errors += 1
+                        continue
+                    if output.separator and (output.count or output.pending_items):
+                        output.pending.append(output.separator)
+                    output.pending.append(task[2])
+                    output.pending_items += 1
+                    output.pending_mids.append(task[3])
+                    pending += 1
+                    if deadline is None:
+                        deadline = time.monotonic() + self.batch_seconds
+                else:
+                    key, path, header, separator, footer = task[1:]
+                    self.files[key] = _OutputFile(key, path, header, separator, footer)
+
+            if pending and (pending >= self.batch_items or time.monotonic() >= deadline):
+                self._commit()
+                pending = 0
+                deadline = None
+
+    def _acquire(self, output):
+        """取得 output 当前段的句柄（LRU 池），需要时创建新段或追加打开，池满时关闭最久未用的文件"""
+        if output.stream is not None:
+            self._open.move_to_end(output.key)
+            return
+        if output.segment == 0:
+            output.segment = 1
+        path = self.segment_path(output.path, output.segment)
+        new_segment = not output.paths or output.paths[-1] != path
+        if new_segment:
+            output.paths.append(path)
+        else:
+            self.reopens += 1
+        while len(self._open) >= self.max_open:
+            _, oldest = self._open.popitem(last=False)
+            self._release_handle(oldest)
+        if new_segment:
+            open(path, 'wb').close()  # 新段：清空同名文件
+        output.stream, output.raw = segments.open_append(path, self.compression, self.level)
+        self._open[output.key] = output
+        if new_segment and output.header:
+            output.stream.write(output.header)
+
+    def _release_handle(self, output, sync=False):
+        """结束压缩流并关闭句柄（段没有结束，之后可以追加打开）"""
+        if output.stream is None:
+            return
+        stream, raw = output.stream, output.raw
+        output.stream = output.raw = None
+        self._open.pop(output.key, None)
+        segments.flush(stream, raw)
+        if sync:
+            os.fsync(raw.fileno())
+        segments.close(stream, raw)
+
+    def _finish_segment(self, output):
+        """写入文件结尾和段清单并关闭当前段"""
+        if output.segment == 0:
+            return
+        if output.stream is None:
+            self._acquire(output)
+        if output.footer:
+            output.stream.write(output.footer)
+        if self.segmented:
+            output.stream.write(segments.manifest_line({
+                'list_id': output.key,
+                'segment': output.segment,
+                'items': output.segment_items,
+                'mid_min': output.mid_min,
+                'mid_max': output.mid_max,
+                'compression': self.compression,
+                'closed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            }))
+        self._release_handle(output, sync=self.fsync != 'none')
+        output.segment += 1
+        output.segment_items = 0
+        output.mid_min = output.mid_max = None
+
+    def _commit(self):
+        for output in self.files.values():
+            if not output.pending:
+                continue
+            items = output.pending_items
+            try:
+                self._acquire(output)
+                output.stream.write(b''.join(output.pending))
+                segments.flush(output.stream, output.raw)
+                if self.fsync == 'batch':
+                    os.fsync(output.raw.fileno())
+                output.count += items
+                output.segment_items += items
+                output.note_mids(output.pending_mids)
+                self.written += items
+                if self.segment_bytes and output.raw.tell() >= self.segment_bytes:
+                    self._finish_segment(output)
+            except OSError as e:
+                self.errors += items
+                logger.error(f"写入输出文件失败 {output.path}（{items} items）: {e}")
+            output.pending = []
+            output.pending_items = 0
+            output.pending_mids = []
+        self.commits += 1
+        self._notify()
+
+    def _notify(self):
+        with self._lock:
+            blocked = bool(self._blocked)
+        if blocked:
+            from twisted.internet import reactor
+            reactor.callFromThread(self._release)
+
+    def _close_files(self):
+        for output in self.files.values():
+            try:
+                if output.segment and not output.segment_items and output.paths \
+                        and output.paths[-1] != self.segment_path(output.path, output.segment):
+                    continue  # 刚滚动到新段，还没有数据，不创建空段
+                if output.segment == 0:
+                    output.segment = 1
+                self._finish_segment(output)
+            except OSError as e:
+                self.errors += 1
+                logger.error(f"关闭输出文件失败 {output.path}: {e}")
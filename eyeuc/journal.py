@@ -0,0 +1,91 @@
+"""
+EyeUC 未完成 item 落盘日志
+
+多分支 item 超时或超出数量上限时，先追加写入日志（fsync），再作为
+partial item 交给管道输出；item 通过管道后追加一条 emit 记录。
+进程崩溃后，下次启动会重新输出"已落盘但未 emit"的 item。
+
+日志格式（JSONL，每行一条）：
+    {"op": "spill", "mid": "31047", "item": {...}}
+    {"op": "emit", "mid": "31047"}
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+
+class PendingJournal:
+    """未完成 item 的追加写日志
+
+    name 区分不同的抓取任务（并行分片各自使用不同的 name），
+    recover() 只接管同名任务遗留的日志。
+    """
+
+    def __init__(self, directory, name='eyeuc_mods'):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.path = self.directory / f'{name}_{timestamp}_{os.getpid()}.jsonl'
+        self._file = None
+        self._unemitted = set()
+
+    def recover(self):
+        """读取以往运行遗留的日志，返回已落盘但未 emit 的 item 列表
+
+        遗留日志的内容会转写到本次日志中，原文件随后删除。
+        """
+        recovered = {}
+        leftovers = [p for p in sorted(self.directory.glob(f'{self.name}_*.jsonl')) if p != self.path]
+        for path in leftovers:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 崩溃时写了一半的行
+                    if record.get('op') == 'spill':
+                        recovered[record['mid']] = record['item']
+                    elif record.get('op') == 'emit':
+                        recovered.pop(record['mid'], None)
+
+        # 先转写到本次日志，再删除旧文件
+        for mid, item in recovered.items():
+            self.spill(mid, item)
+        for path in leftovers:
+            path.unlink()
+        return list(recovered.values())
+
+    def spill(self, mid, item):
+        """落盘一个未完成 item（fsync 后返回）"""
+        self._write({'op': 'spill', 'mid': mid, 'item': item}, sync=True)
+        self._unemitted.add(mid)
+
+    def mark_emitted(self, mid):
+        """item 已通过管道"""
+        if mid in self._unemitted:
+            self._write({'op': 'emit', 'mid': mid}, sync=False)
+            self._unemitted.discard(mid)
+
+    @property
+    def unemitted(self):
+        return len(self._unemitted)
+
+    def close(self):
+        """关闭日志；所有 item 都已 emit 时删除日志文件"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if not self._unemitted:
+            self.path.unlink(missing_ok=True)
+
+    def _write(self, record, sync):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
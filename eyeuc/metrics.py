@@ -0,0 +1,263 @@
+"""
+运行中爬虫的实时指标（Prometheus 文本格式）
+
+MetricsExporter 扩展每 METRICS_INTERVAL 秒采集一次当前状态：
+- 各接口类别 slot 的在途请求数 / 排队数、并发上限
+- 调度器队列深度、items 总数与 items/s、请求数、响应状态码
+- 等待分支的多分支资源数（spider.assembler）
+- EnhancedRetryMiddleware 按原因分类的错误计数（retry/reason/<原因>）
+- 会话池中各账号的健康状态、请求数和会话刷新次数
+- 各接口的响应延迟分位数（StatsCollectorMiddleware 写入的 latency/...）
+- pipeline 写入耗时分位数（带 write_latency 直方图的 pipeline）和写入队列深度
+
+输出方式（至少配置一个，否则不启用）：
+- METRICS_FILE: 每次采集后原子地重写该文件（适合多进程分片，各自写一个文件）
+- METRICS_PORT: 在 METRICS_HOST 上开放 HTTP 端点（任意路径都返回指标），
+  可以是单个端口或 "起始,结束" 范围（多个进程时依次尝试）
+
+所有指标带 list_ids / pages / worker 标签，区分同一列表的不同分片。
+"""
+
+import logging
+import os
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.reactor import listen_tcp
+from twisted.internet.task import LoopingCall
+from twisted.web.resource import Resource
+from twisted.web.server import Site
+
+from eyeuc.endpoints import ENDPOINT_CLASSES
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = b'text/plain; version=0.0.4; charset=utf-8'
+QUANTILES = (('0.5', 'p50'), ('0.9', 'p90'), ('0.99', 'p99'))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsWriter:
+    """按 Prometheus 文本格式累积指标（同名指标的 HELP/TYPE 只写一次）"""
+
+    def __init__(self, labels=None):
+        self.labels = labels or {}
+        self.lines = []
+        self._declared = set()
+
+    def add(self, name, kind, help_text, value, **labels):
+        if value is None:
+            return
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f'# HELP {name} {help_text}')
+            self.lines.append(f'# TYPE {name} {kind}')
+        self.sample(name, value, **labels)
+
+    def sample(self, name, value, **labels):
+        """追加一行样本（用于 summary 的 _sum / _count 等后缀）"""
+        merged = dict(self.labels, **labels)
+        label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in merged.items())
+        self.lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+class _MetricsResource(Resource):
+    isLeaf = True
+
+    def __init__(self, exporter):
+        super().__init__()
+        self.exporter = exporter
+
+    def render_GET(self, request):
+        request.setHeader(b'Content-Type', CONTENT_TYPE)
+        return self.exporter.render().encode('utf-8')
+
+
+class MetricsExporter:
+    """定期采集指标，写入 METRICS_FILE 和/或通过 METRICS_PORT 提供"""
+
+    def __init__(self, crawler, path=None, portrange=None, host='127.0.0.1', interval=5.0):
+        if not path and not portrange:
+            raise NotConfigured
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.path = path
+        self.portrange = portrange
+        self.host = host
+        self.interval = interval
+        self.spider = None
+        self.labels = {}
+        self.started = time.time()
+        self.items_per_sec = 0.0
+        self._last = None  # (时间, items 数)，计算 items/s
+        self._task = None
+        self._port = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        portrange = [int(x) for x in settings.getlist('METRICS_PORT') if str(x).strip()]
+        exporter = cls(
+            crawler,
+            path=settings.get('METRICS_FILE'),
+            portrange=portrange,
+            host=settings.get('METRICS_HOST', '127.0.0.1'),
+            interval=settings.getfloat('METRICS_INTERVAL', 5.0),
+        )
+        crawler.signals.connect(exporter.spider_opened, signal=signals.spider_opened)
+        # 最后一次写入放在 engine_stopped：其他组件在 spider_closed 中写入的最终统计已经就绪
+        crawler.signals.connect(exporter.engine_stopped, signal=signals.engine_stopped)
+        return exporter
+
+    def spider_opened(self, spider):
+        self.spider = spider
+        end_page = getattr(spider, 'end_page', None)
+        self.labels = {
+            'list_ids': ','.join(str(x) for x in getattr(spider, 'target_list_ids', []) or []),
+            'pages': f"{getattr(spider, 'start_page', 1)}-{end_page or ''}",
+            'worker': getattr(spider, 'worker_id', None) or f'pid{os.getpid()}',
+        }
+        if self.portrange:
+            self._port = listen_tcp(self.portrange, self.host, Site(_MetricsResource(self)))
+            address = self._port.getHost()
+            logger.info(f"实时指标: http://{address.host}:{address.port}/metrics")
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            logger.info(f"实时指标文件: {self.path}（每 {self.interval:g} 秒更新）")
+        self._task = LoopingCall(self._tick)
+        self._task.start(self.interval, now=True)
+
+    def engine_stopped(self):
+        if self._task is not None and self._task.running:
+            self._task.stop()
+        self._tick(final=True)
+        if self._port is not None:
+            return self._port.stopListening()
+
+    def _tick(self, final=False):
+        now = time.time()
+        items = self.stats.get_value('item_scraped_count', 0)
+        if final:
+            self.items_per_sec = 0.0  # 已结束的分片不再计入汇总速率
+        elif self._last is not None and now > self._last[0]:
+            self.items_per_sec = (items - self._last[1]) / (now - self._last[0])
+        self._last = (now, items)
+        if self.path:
+            self._write_file(self.render(final=final))
+
+    def _write_file(self, text):
+        tmp_path = f'{self.path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"写入指标文件失败 {self.path}: {e}")
+
+    def render(self, final=False):
+        stats = self.stats.get_stats()
+        out = MetricsWriter(self.labels)
+        out.add('eyeuc_up', 'gauge', '爬虫是否在运行（结束后为 0）', 0 if final else 1)
+        out.add('eyeuc_start_time_seconds', 'gauge', '启动时间（unix 时间戳）', round(self.started, 3))
+
+        self._collect_downloader(out, stats)
+        self._collect_items(out, stats)
+        self._collect_retries(out, stats)
+        self._collect_sessions(out)
+        self._collect_latency(out, stats)
+        self._collect_pipelines(out)
+        return out.render()
+
+    def _collect_downloader(self, out, stats):
+        engine = self.crawler.engine
+        slots = engine.downloader.slots if engine is not None else {}
+        for name in ENDPOINT_CLASSES:
+            slot = slots.get(f'endpoint:{name}')
+            out.add('eyeuc_requests_in_flight', 'gauge', '下载中的请求数（按接口类别）',
+                    len(slot.active) if slot is not None else 0, endpoint=name)
+        for name in ENDPOINT_CLASSES:
+            slot = slots.get(f'endpoint:{name}')
+            out.add('eyeuc_downloader_queue', 'gauge', '下载 slot 中排队的请求数（按接口类别）',
+                    len(slot.queue) if slot is not None else 0, endpoint=name)
+        for name in ENDPOINT_CLASSES:
+            out.add('eyeuc_endpoint_concurrency', 'gauge', '接口类别 slot 的当前并发上限（AIMD）',
+                    stats.get(f'endpoint/{name}/concurrency'), endpoint=name)
+
+        scheduler = getattr(engine.slot, 'scheduler', None) if engine is not None and engine.slot else None
+        out.add('eyeuc_scheduler_queue_depth', 'gauge', '调度器中等待下载的请求数',
+                len(scheduler) if scheduler is not None else 0)
+        out.add('eyeuc_requests_total', 'counter', '已发出的请求数', stats.get('downloader/request_count', 0))
+        prefix = 'downloader/response_status_count/'
+        for key, value in sorted(stats.items()):
+            if key.startswith(prefix):
+                out.add('eyeuc_responses_total', 'counter', '收到的响应数（按状态码）',
+                        value, status=key[len(prefix):])
+
+    def _collect_items(self, out, stats):
+        out.add('eyeuc_items_scraped_total', 'counter', '已输出的资源数', stats.get('item_scraped_count', 0))
+        out.add('eyeuc_items_per_second', 'gauge', '最近一个采集周期的 items/s', round(self.items_per_sec, 3))
+        assembler = getattr(self.spider, 'assembler', None)
+        out.add('eyeuc_pending_items', 'gauge', '等待分支下载结果的多分支资源数',
+                len(assembler) if assembler is not None else 0)
+        out.add('eyeuc_spider_exceptions_total', 'counter', '解析回调抛出的异常数',
+                sum(v for k, v in stats.items() if k.startswith('spider_exceptions/')))
+        out.add('eyeuc_log_errors_total', 'counter', 'ERROR 级别日志数', stats.get('log_count/ERROR', 0))
+
+    def _collect_sessions(self, out):
+        pool = getattr(self.spider, 'session_pool', None)
+        for session in pool or ():
+            out.add('eyeuc_session_healthy', 'gauge', '账号会话是否可用（会话池）',
+                    int(session.healthy and not session.disabled), session=session.name)
+        for session in pool or ():
+            out.add('eyeuc_session_requests_total', 'counter', '账号发出的请求数（会话池）',
+                    session.requests, session=session.name)
+
+    def _collect_retries(self, out, stats):
+        out.add('eyeuc_retries_total', 'counter', '重试次数', stats.get('retry/count', 0))
+        out.add('eyeuc_session_refreshes_total', 'counter', '会话失效后刷新 cookies 的次数',
+                stats.get('session/refreshes', 0))
+        prefix = 'retry/reason/'
+        for key, value in sorted(stats.items()):
+            if key.startswith(prefix):
+                out.add('eyeuc_errors_by_reason_total', 'counter',
+                        '按原因分类的下载错误数（EnhancedRetryMiddleware）', value, reason=key[len(prefix):])
+
+    def _collect_latency(self, out, stats):
+        name = 'eyeuc_response_latency_seconds'
+        for endpoint in ENDPOINT_CLASSES:
+            prefix = f'latency/{endpoint}'
+            count = stats.get(f'{prefix}/count')
+            if count is None:
+                continue
+            for quantile, key in QUANTILES:
+                value = stats.get(f'{prefix}/{key}_ms')
+                if value is not None:
+                    out.add(name, 'summary', '响应延迟分位数（按接口类别，StatsCollectorMiddleware）',
+                            round(value / 1000, 6), endpoint=endpoint, quantile=quantile)
+            out.sample(f'{name}_count', count, endpoint=endpoint)
+
+    def _collect_pipelines(self, out):
+        engine = self.crawler.engine
+        itemproc = getattr(getattr(engine, 'scraper', None), 'itemproc', None)
+        name = 'eyeuc_pipeline_write_seconds'
+        for pipeline in getattr(itemproc, 'middlewares', ()):
+            depth = getattr(pipeline, 'queue_depth', None)
+            out.add('eyeuc_pipeline_queue', 'gauge', '等待 pipeline 写入线程处理的记录数',
+                    depth, pipeline=type(pipeline).__name__)
+            histogram = getattr(pipeline, 'write_latency', None)
+            if histogram is None or not histogram.count:
+                continue
+            pipeline_name = type(pipeline).__name__
+            values = histogram.quantiles([float(q) for q, _ in QUANTILES])
+            for (quantile, _), value in zip(QUANTILES, values):
+                out.add(name, 'summary', 'pipeline 单个 item 的写入耗时',
+                        round(value, 6), pipeline=pipeline_name, quantile=quantile)
+            out.sample(f'{name}_sum', round(histogram.total, 6), pipeline=pipeline_name)
+            out.sample(f'{name}_count', histogram.count, pipeline=pipeline_name)
@@ -6,11 +6,17 @@
 from scrapy import signals
 from scrapy.downloadermiddlewares.retry import RetryMiddleware
 from scrapy.utils.response import response_status_message
-from scrapy.exceptions import IgnoreRequest
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from twisted.internet import threads
+from twisted.internet.task import LoopingCall, deferLater
 import random
 import time
 import logging
 
+from eyeuc.endpoints import endpoint_class, is_login_url
+from eyeuc.errorsamples import ErrorSampleWriter
+from eyeuc.histogram import LatencyHistogram
+
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
@@ -110,10 +116,17 @@ class EyeucDownloaderMiddleware:
 
 
 class RandomDelayMiddleware:
-    """随机延迟中间件，避免请求节律化"""
+    """随机延迟中间件，避免请求节律化
+
+    延迟通过 reactor 定时器异步完成（返回 Deferred），不会阻塞事件循环：
+    等待中的请求不占用 CPU，其他请求的下载和解析照常进行。
+    延迟发生在请求进入下载 slot 之前，因此 slot 自身的延迟
+    （DOWNLOAD_DELAY / AutoThrottle）仍然生效，随机抖动叠加在其上。
+    """
     
-    def __init__(self, delay_range):
+    def __init__(self, delay_range, stats=None):
         self.delay_range = delay_range
+        self.stats = stats
         self.logger = logging.getLogger(self.__class__.__name__)
     
     @classmethod
@@ -121,26 +134,204 @@ class RandomDelayMiddleware:
         # 从配置读取延迟范围，默认 0.1-0.5 秒
         delay_min = crawler.settings.getfloat('RANDOM_DELAY_MIN', 0.1)
         delay_max = crawler.settings.getfloat('RANDOM_DELAY_MAX', 0.5)
-        return cls((delay_min, delay_max))
+        return cls((delay_min, delay_max), crawler.stats)
     
     def process_request(self, request, spider):
-        # 随机延迟
+        # 随机延迟（异步，不阻塞 reactor）
         delay = random.uniform(*self.delay_range)
-        time.sleep(delay)
+        if delay <= 0:
+            return None
+        
+        if self.stats is not None:
+            # 本中间件（100）在 EndpointConcurrencyMiddleware（650）之前执行，
+            # 此时 download_slot 还没有设置，直接按接口类别统计
+            self.stats.inc_value('random_delay/count')
+            self.stats.inc_value('random_delay/total_seconds', delay)
+            self.stats.inc_value(f'random_delay/endpoint/{endpoint_class(request.url)}/count')
+        
+        from twisted.internet import reactor
+        return deferLater(reactor, delay, lambda: None)
+
+
+class _EndpointSlotState:
+    """单个接口类别的 AIMD 状态"""
+    
+    def __init__(self, name, start, min_conc, max_conc, target_latency):
+        self.name = name
+        self.slot_key = f'endpoint:{name}'
+        self.concurrency = start
+        self.min_concurrency = min_conc
+        self.max_concurrency = max_conc
+        self.target_latency = target_latency
+        self.latency_ewma = None
+        self.successes = 0  # 本轮（距上次调整）成功响应数
+        self.last_decrease = 0.0
+        self.responses = 0
+        self.throttled = 0  # 429/503
+        self.login_redirects = 0
+
+
+class EndpointConcurrencyMiddleware:
+    """按接口类别分配下载 slot，并用 AIMD 自适应调整每个 slot 的并发
+    
+    - list / detail / toversion / todownload 各自使用独立 slot（endpoint:<name>），
+      AutoThrottle 的延迟也随之按 slot 独立计算
+    - 加性增：一轮（concurrency 个）响应全部成功且平均延迟低于目标时并发 +1
+    - 乘性减：遇到 429/503、登录跳转或延迟超过目标时并发减半，
+      一个延迟周期内最多减一次
+    - 每个 slot 的并发和延迟写入 crawler stats（endpoint/<name>/...）
+    
+    需放在 RedirectMiddleware（600）之后，才能看到原始的 302 登录跳转。
+    """
+    
+    THROTTLE_STATUSES = (429, 503)
+    REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+    
+    def __init__(self, crawler, endpoint_settings, decrease_factor=0.5, ewma_alpha=0.3):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.decrease_factor = decrease_factor
+        self.ewma_alpha = ewma_alpha
+        self.logger = logging.getLogger(self.__class__.__name__)
+        
+        self.endpoints = {}
+        for name, conf in endpoint_settings.items():
+            self.endpoints[name] = _EndpointSlotState(
+                name,
+                start=int(conf.get('start', 2)),
+                min_conc=int(conf.get('min', 1)),
+                max_conc=int(conf.get('max', 4)),
+                target_latency=float(conf.get('target_latency', 3.0)),
+            )
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('ENDPOINT_CONCURRENCY_ENABLED', True):
+            raise NotConfigured
+        middleware = cls(
+            crawler,
+            crawler.settings.getdict('ENDPOINT_CONCURRENCY'),
+            decrease_factor=crawler.settings.getfloat('ENDPOINT_CONCURRENCY_DECREASE', 0.5),
+        )
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+    
+    def spider_opened(self, spider):
+        # 通过 DOWNLOAD_SLOTS 机制给 slot 设置初始并发（slot 被回收后重建也会生效）
+        per_slot_settings = self.crawler.engine.downloader.per_slot_settings
+        for state in self.endpoints.values():
+            per_slot_settings.setdefault(state.slot_key, {})['concurrency'] = state.concurrency
+            self._publish(state)
+    
+    def process_request(self, request, spider):
+        state = self.endpoints.get(endpoint_class(request.url))
+        if state is None:
+            return None
+        # meta 可能从上一级响应整体复制而来（带着上一级的 endpoint slot），需要覆盖；
+        # 其他来源显式指定的 slot 保持不变
+        current = request.meta.get('download_slot')
+        if current is None or current.startswith('endpoint:'):
+            request.meta['download_slot'] = state.slot_key
         return None
+    
+    def process_response(self, request, response, spider):
+        state = self.endpoints.get(endpoint_class(request.url))
+        if state is None or request.meta.get('download_slot') != state.slot_key:
+            return response
+        if 'cached' in response.flags:
+            # 来自 HTTP 缓存的响应（命中或 304 重新验证）不参与并发调整
+            return response
+        
+        state.responses += 1
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            if state.latency_ewma is None:
+                state.latency_ewma = latency
+            else:
+                state.latency_ewma += self.ewma_alpha * (latency - state.latency_ewma)
+        
+        if response.status in self.THROTTLE_STATUSES:
+            state.throttled += 1
+            self._decrease(state, f'HTTP {response.status}')
+        elif self._is_login_redirect(response):
+            state.login_redirects += 1
+            self._decrease(state, '登录跳转')
+        elif state.latency_ewma is not None and state.latency_ewma > state.target_latency:
+            self._decrease(state, f'延迟 {state.latency_ewma:.2f}s > {state.target_latency}s')
+        else:
+            state.successes += 1
+            if state.successes >= state.concurrency:
+                state.successes = 0
+                if state.concurrency < state.max_concurrency:
+                    self._apply(state, state.concurrency + 1)
+        
+        self._publish(state)
+        return response
+    
+    def _is_login_redirect(self, response):
+        if response.status in self.REDIRECT_STATUSES:
+            location = response.headers.get('Location', b'').decode('latin-1')
+            return is_login_url(location)
+        return is_login_url(response.url)
+    
+    def _decrease(self, state, reason):
+        state.successes = 0
+        now = time.monotonic()
+        # 一个延迟周期内只减一次，避免同一批在途请求连续触发
+        if now - state.last_decrease < max(state.latency_ewma or 0, 1.0):
+            return
+        state.last_decrease = now
+        
+        new_concurrency = max(state.min_concurrency, int(state.concurrency * self.decrease_factor))
+        if new_concurrency < state.concurrency:
+            self.logger.info(f"[{state.name}] 并发 {state.concurrency} → {new_concurrency}（{reason}）")
+            self.stats.inc_value(f'endpoint/{state.name}/backoffs')
+            self._apply(state, new_concurrency)
+    
+    def _apply(self, state, concurrency):
+        state.concurrency = concurrency
+        downloader = self.crawler.engine.downloader
+        downloader.per_slot_settings.setdefault(state.slot_key, {})['concurrency'] = concurrency
+        slot = downloader.slots.get(state.slot_key)
+        if slot is not None:
+            slot.concurrency = concurrency
+    
+    def _publish(self, state):
+        prefix = f'endpoint/{state.name}'
+        self.stats.set_value(f'{prefix}/concurrency', state.concurrency)
+        self.stats.max_value(f'{prefix}/concurrency_max', state.concurrency)
+        self.stats.set_value(f'{prefix}/responses', state.responses)
+        self.stats.set_value(f'{prefix}/throttled', state.throttled)
+        self.stats.set_value(f'{prefix}/login_redirects', state.login_redirects)
+        if state.latency_ewma is not None:
+            self.stats.set_value(f'{prefix}/latency_ms', round(state.latency_ewma * 1000, 1))
+    
+    def spider_closed(self, spider):
+        self.logger.info("=" * 80)
+        self.logger.info("接口并发统计")
+        self.logger.info("=" * 80)
+        for state in self.endpoints.values():
+            latency = f"{state.latency_ewma * 1000:.0f}ms" if state.latency_ewma is not None else '-'
+            self.logger.info(
+                f"  {state.name:<11} 并发 {state.concurrency}（{state.min_concurrency}-{state.max_concurrency}），"
+                f"延迟 {latency}，响应 {state.responses}，限流 {state.throttled}，登录跳转 {state.login_redirects}"
+            )
+        self.logger.info("=" * 80)
 
 
 class EnhancedRetryMiddleware(RetryMiddleware):
     """增强的重试中间件，带错误分类和统计"""
     
-    def __init__(self, settings):
+    def __init__(self, settings, stats=None):
         super().__init__(settings)
         self.logger = logging.getLogger(self.__class__.__name__)
         self.stats_by_reason = {}
+        self.stats = stats
     
     @classmethod
     def from_crawler(cls, crawler):
-        return cls(crawler.settings)
+        return cls(crawler.settings, crawler.stats)
     
     def process_response(self, request, response, spider):
         # 检测权限/登录问题
@@ -150,8 +341,8 @@ class EnhancedRetryMiddleware(RetryMiddleware):
             )
             self._update_stats('permission_error')
         
-        # 检测登录跳转
-        if '登录' in response.text or 'login' in response.url.lower():
+        # 检测登录跳转（只看 URL；页面中的登录标记由 SessionHealthMiddleware 按字节检测）
+        if is_login_url(response.url):
             spider.logger.warning(
                 f"可能需要登录: {request.url}"
             )
@@ -189,86 +380,128 @@ class EnhancedRetryMiddleware(RetryMiddleware):
     def _update_stats(self, reason):
         """更新错误统计"""
         self.stats_by_reason[reason] = self.stats_by_reason.get(reason, 0) + 1
+        if self.stats is not None:
+            # 写入 crawler stats，供实时指标（eyeuc.metrics）读取
+            self.stats.inc_value(f'retry/reason/{reason}')
 
 
 class ParseErrorMonitorMiddleware:
-    """解析错误监控中间件，保存失败样本"""
+    """解析错误监控中间件，按签名去重保存失败样本（eyeuc/errorsamples.py）
     
-    def __init__(self, output_dir, save_samples):
+    每个签名（异常类型、回调名、URL 模式）只保存前 PARSE_ERROR_SAMPLES_PER_SIGNATURE 个样本，
+    由后台线程 gzip 压缩写入；同一签名的后续错误只计数，日志降为 DEBUG。
+    """
+    
+    def __init__(self, output_dir, save_samples, stats=None, per_signature=5, queue_size=100):
         self.output_dir = output_dir
         self.save_samples = save_samples
+        self.stats = stats
+        self.per_signature = per_signature
+        self.queue_size = queue_size
         self.logger = logging.getLogger(self.__class__.__name__)
-        
-        if self.save_samples:
-            import os
-            os.makedirs(self.output_dir, exist_ok=True)
+        self.writer = None
     
     @classmethod
     def from_crawler(cls, crawler):
         output_dir = crawler.settings.get('PARSE_ERROR_OUTPUT_DIR', 'parse_errors')
         save_samples = crawler.settings.getbool('PARSE_ERROR_SAVE_SAMPLES', True)
-        return cls(output_dir, save_samples)
+        middleware = cls(
+            output_dir, save_samples, crawler.stats,
+            per_signature=crawler.settings.getint('PARSE_ERROR_SAMPLES_PER_SIGNATURE', 5),
+            queue_size=crawler.settings.getint('PARSE_ERROR_QUEUE_SIZE', 100),
+        )
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
     
     def process_spider_exception(self, response, exception, spider):
         """捕获解析异常"""
-        self.logger.error(
-            f"解析错误: {response.url}\n"
-            f"异常: {exception.__class__.__name__}: {str(exception)}"
-        )
+        if self.stats is not None:
+            self.stats.inc_value('parse_error/count')
+        if not self.save_samples:
+            self.logger.error(
+                f"解析错误: {response.url}\n"
+                f"异常: {exception.__class__.__name__}: {str(exception)}"
+            )
+            return None
         
-        # 保存失败样本
-        if self.save_samples:
-            self._save_error_sample(response, exception, spider)
+        if self.writer is None:
+            self.writer = ErrorSampleWriter(self.output_dir, self.per_signature, self.queue_size)
+        callback = getattr(response.request, 'callback', None) if response.request is not None else None
+        encoding = getattr(response, 'encoding', 'utf-8')
+        sig_id, count, saved = self.writer.record(
+            response.url, exception, getattr(callback, '__name__', 'parse'), response.body, encoding,
+        )
+        if self.stats is not None:
+            self.stats.set_value('parse_error/signatures', len(self.writer.signatures))
+            self.stats.set_value('parse_error/samples_saved', self.writer.saved)
+            self.stats.set_value('parse_error/samples_dropped', self.writer.dropped)
         
+        # 同一签名只有前几次按 ERROR 记录，之后降为 DEBUG，避免改版时日志刷屏
+        log = self.logger.error if count <= self.per_signature else self.logger.debug
+        log(
+            f"解析错误 [{sig_id} 第 {count} 次]: {response.url}\n"
+            f"异常: {exception.__class__.__name__}: {str(exception)}"
+            + ('（已保存样本）' if saved else '')
+        )
         return None
     
-    def _save_error_sample(self, response, exception, spider):
-        """保存失败的 HTML 样本"""
-        import os
-        from datetime import datetime
-        
-        # 文件名：timestamp_mid_exception.html
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        mid = response.url.split('/')[-1] if '/' in response.url else 'unknown'
-        exception_name = exception.__class__.__name__
-        filename = f"{timestamp}_{mid}_{exception_name}.html"
-        filepath = os.path.join(self.output_dir, filename)
-        
-        try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(f"<!-- URL: {response.url} -->\n")
-                f.write(f"<!-- Exception: {exception_name}: {str(exception)} -->\n")
-                f.write(f"<!-- Timestamp: {timestamp} -->\n\n")
-                f.write(response.text)
-            
-            self.logger.info(f"失败样本已保存: {filepath}")
-        except Exception as e:
-            self.logger.error(f"保存失败样本时出错: {e}")
+    def spider_closed(self, spider):
+        if self.writer is None:
+            return None
+        signatures = self.writer.signatures
+        self.logger.info(
+            f"解析错误: {sum(s['count'] for s in signatures.values())} 次，{len(signatures)} 个签名，"
+            f"本次保存样本 {self.writer.saved} 个（目录 {self.output_dir}，索引 index.json）"
+        )
+        # 在线程中等待剩余样本写完，不阻塞 reactor
+        return threads.deferToThread(self.writer.close)
 
 
 class StatsCollectorMiddleware:
-    """统计收集中间件"""
+    """统计收集中间件：按接口类别和状态码分类记录响应延迟
+    
+    每个 (接口类别, 状态码类别) 一个固定大小的流式直方图（eyeuc.histogram），
+    长时间运行内存不增长。每 LATENCY_STATS_INTERVAL 秒和结束时把分位数写入 stats：
+        latency/<接口>/count|p50_ms|p90_ms|p99_ms|max_ms           该接口全部响应
+        latency/<接口>/<状态>/count|p50_ms|p90_ms|p99_ms|max_ms    状态为 2xx/3xx/4xx/5xx/error
+    延迟取 download_latency（与 AutoThrottle 相同的口径），没有时（下载异常）
+    取从本中间件到响应/异常的耗时。HTTP 缓存和归档回放的响应不计入。
+    """
     
-    def __init__(self, stats):
+    QUANTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+    
+    def __init__(self, stats, interval=60.0):
         self.stats = stats
+        self.interval = interval
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.response_times = []
+        self.histograms = {}  # (接口类别, 状态) -> LatencyHistogram；状态为 None 表示该接口全部响应
+        self._task = None
     
     @classmethod
     def from_crawler(cls, crawler):
-        middleware = cls(crawler.stats)
+        middleware = cls(
+            crawler.stats,
+            interval=crawler.settings.getfloat('LATENCY_STATS_INTERVAL', 60.0),
+        )
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
         crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
         return middleware
     
+    def spider_opened(self, spider):
+        if self.interval > 0:
+            self._task = LoopingCall(self._publish)
+            self._task.start(self.interval, now=False)
+    
     def process_request(self, request, spider):
         request.meta['start_time'] = time.time()
         return None
     
     def process_response(self, request, response, spider):
-        # 计算响应时间
-        if 'start_time' in request.meta:
-            response_time = time.time() - request.meta['start_time']
-            self.response_times.append(response_time)
+        if 'cached' in response.flags or 'archived' in response.flags:
+            return response
+        response_time = self._elapsed(request)
+        if response_time is not None:
+            self._record(endpoint_class(request.url), f'{response.status // 100}xx', response_time)
             
             # 记录慢响应
             if response_time > 5.0:
@@ -278,19 +511,60 @@ class StatsCollectorMiddleware:
         
         return response
     
+    def process_exception(self, request, exception, spider):
+        if isinstance(exception, IgnoreRequest):
+            return None
+        response_time = self._elapsed(request)
+        if response_time is not None:
+            self._record(endpoint_class(request.url), 'error', response_time)
+        return None
+    
+    @staticmethod
+    def _elapsed(request):
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            return latency
+        if 'start_time' in request.meta:
+            return time.time() - request.meta['start_time']
+        return None
+    
+    def _record(self, endpoint, status, value):
+        for key in ((endpoint, None), (endpoint, status)):
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(value)
+    
+    def _publish(self):
+        """把各直方图的分位数写入 stats"""
+        for (endpoint, status), histogram in self.histograms.items():
+            prefix = f'latency/{endpoint}' + (f'/{status}' if status else '')
+            self.stats.set_value(f'{prefix}/count', histogram.count)
+            values = histogram.quantiles([q for _, q in self.QUANTILES])
+            for (name, _), value in zip(self.QUANTILES, values):
+                self.stats.set_value(f'{prefix}/{name}_ms', round(value * 1000, 1))
+            self.stats.set_value(f'{prefix}/max_ms', round(histogram.max * 1000, 1))
+    
     def spider_closed(self, spider):
         """Spider 关闭时输出统计"""
-        if self.response_times:
-            avg_time = sum(self.response_times) / len(self.response_times)
-            max_time = max(self.response_times)
-            min_time = min(self.response_times)
-            
-            self.logger.info("=" * 80)
-            self.logger.info("响应时间统计")
-            self.logger.info("=" * 80)
-            self.logger.info(f"  平均响应时间: {avg_time:.3f}s")
-            self.logger.info(f"  最快响应: {min_time:.3f}s")
-            self.logger.info(f"  最慢响应: {max_time:.3f}s")
-            self.logger.info(f"  总请求数: {len(self.response_times)}")
-            self.logger.info("=" * 80)
+        if self._task is not None and self._task.running:
+            self._task.stop()
+        if not self.histograms:
+            return
+        self._publish()
+        
+        self.logger.info("=" * 80)
+        self.logger.info("响应时间统计（ms）")
+        self.logger.info("=" * 80)
+        for (endpoint, status), histogram in sorted(
+            self.histograms.items(), key=lambda kv: (kv[0][0], kv[0][1] or '')
+        ):
+            p50, p90, p99 = histogram.quantiles([q for _, q in self.QUANTILES])
+            label = f"{endpoint}/{status}" if status else f"{endpoint}"
+            self.logger.info(
+                f"  {label:<17} 请求 {histogram.count:>6}  平均 {histogram.mean * 1000:>8.0f}  "
+                f"p50 {p50 * 1000:>8.0f}  p90 {p90 * 1000:>8.0f}  p99 {p99 * 1000:>8.0f}  "
+                f"最慢 {histogram.max * 1000:>8.0f}"
+            )
+        self.logger.info("=" * 80)
 
@@ -0,0 +1,450 @@
+"""
+EyeUC 页面解析后端
+
+页面字段由 eyeuc.extraction 的声明式规则在这里提供的文档树 root（列表卡片为 card.root）上提取，
+这里只负责建树、切分列表卡片和 toversion 片段等结构，清洗和归一化逻辑在 spider 中。
+两个后端输出完全一致：
+
+- parsel: 参考实现，直接使用 response.css()（与原有代码相同的选择器）
+- lxml:   选择器在启动时一次性编译为 lxml XPath（使用 parsel 的 CSS 转换规则，语义不变）；
+          先从原始 HTML 中切出 .modlist / .uploadinfo / .top-right-info / .view-message
+          等区域只解析这些片段（页头页脚、侧栏不建树），不再为每个节点创建 Selector 对象
+
+配置：PARSER_BACKEND = 'lxml' | 'parsel'
+"""
+
+import html
+import re
+from abc import ABC, abstractmethod
+
+from lxml import etree, html as lxml_html
+from parsel.csstranslator import css2xpath
+from parsel.selector import create_root_node
+from scrapy.selector import Selector
+
+from eyeuc.state import card_fingerprint, fingerprint_from_parts
+
+
+# ---- 选择器定义（两个后端共用） ----
+
+# 区域：列表卡片的查找范围
+REGIONS = {
+    'modlist': '.modlist',
+}
+
+# 区域切片（lxml 后端）：每类页面需要保留的 div 区域（class / id），需覆盖 eyeuc.extraction 的规则用到的区域
+LIST_SLICE = {'classes': ('modlist', 'crumb', 'breadcrumb')}
+DETAIL_SLICE = {
+    'classes': ('top-right-info', 'uploadinfo', 'view-message'),
+    'ids': ('imglist',),
+    'script_marker': 'var _data',
+}
+
+# toversion 片段：div.verlist 内的字段
+VERSION_FIELDS = {
+    'h4': 'h4',
+    'a': 'a',  # 相对 h4
+    'href': '::attr(href)',  # 相对 a
+    'text': '::text',  # 相对 a
+    'note': 'div.verlist-note::text',
+    'info': 'div.verlist-info em',
+}
+
+# div.verlist-info em 内的字段
+VERSION_INFO_FIELDS = {
+    'icon': 'i.iconfont::text',
+    'span_title': 'span::attr(title)',
+    'span_text': 'span::text',
+}
+
+
+class ListPage(ABC):
+    """列表页原始字段（root: lxml 文档树，供 eyeuc.extraction 的字段规则使用）"""
+
+    root = None
+
+    @abstractmethod
+    def cards(self):
+        """资源卡片列表，每个卡片提供 root（卡片节点）和 fingerprint()"""
+
+    @abstractmethod
+    def link_hrefs(self):
+        """页面中所有链接（用于解析分页栏）"""
+
+
+class DetailPage(ABC):
+    """详情页（只提供 root，字段规则见 eyeuc.extraction 的 DETAIL_RULES）"""
+
+    root = None
+
+
+def _version_entry(h4_found, a_found, href, text, a_html, note, info):
+    """toversion 片段中一个分支的原始字段"""
+    return {
+        'has_link': h4_found and a_found,
+        'href': href,
+        'text': text,
+        'a_html': a_html,  # 第一个 a 标签的 HTML（用于判断"默认分支"）
+        'note': note,
+        'info': info,  # [{icon, span_title, span_text, texts}, ...]
+    }
+
+
+# ---- parsel 后端（参考实现） ----
+
+class _ParselCard:
+
+    def __init__(self, sel):
+        self.sel = sel
+        self.root = sel.root
+
+    def fingerprint(self):
+        return card_fingerprint(self.sel)
+
+
+class _ParselListPage(ListPage):
+
+    def __init__(self, response):
+        self.sel = response
+        self.root = response.selector.root
+
+    def cards(self):
+        return [_ParselCard(li) for li in self.sel.css(f"{REGIONS['modlist']} ul li")]
+
+    def link_hrefs(self):
+        return self.sel.css('a::attr(href)').getall()
+
+
+class _ParselDetailPage(DetailPage):
+
+    def __init__(self, response):
+        self.root = response.selector.root
+
+
+class ParselBackend:
+    """参考实现：response.css()"""
+
+    name = 'parsel'
+
+    def list_page(self, response):
+        return _ParselListPage(response)
+
+    def detail_page(self, response):
+        return _ParselDetailPage(response)
+
+    def version_entries(self, text):
+        """toversion 片段中的分支列表（div.verlist）"""
+        entries = []
+        for item in Selector(text=text).css('div.verlist'):
+            a_tag = item.css(VERSION_FIELDS['h4']).css(VERSION_FIELDS['a'])
+            entries.append(_version_entry(
+                bool(item.css(VERSION_FIELDS['h4'])), bool(a_tag),
+                a_tag.css(VERSION_FIELDS['href']).get(),
+                a_tag.css(VERSION_FIELDS['text']).get(),
+                a_tag.get(),
+                item.css(VERSION_FIELDS['note']).get(),
+                [
+                    dict({name: em.css(query).get() for name, query in VERSION_INFO_FIELDS.items()},
+                         texts=em.css('::text').getall())
+                    for em in item.css(VERSION_FIELDS['info'])
+                ],
+            ))
+        return entries
+
+    def fragment_markdown_html(self, text):
+        """HTML 片段中第一个 div.markdown-body 的 HTML（没有时返回 None）"""
+        markdown_body = Selector(text=text).css('div.markdown-body')
+        return markdown_body.get() if markdown_body else None
+
+
+# ---- lxml 后端 ----
+
+def _compile(css):
+    """CSS -> 编译好的 lxml XPath（与 parsel 的转换规则一致）"""
+    return etree.XPath(css2xpath(css))
+
+
+def _tostring(element):
+    """与 parsel Selector.get() 相同的序列化方式"""
+    return etree.tostring(element, method='html', encoding='unicode', with_tail=False)
+
+
+def _first(results):
+    return str(results[0]) if results else None
+
+
+def _strings(results):
+    return [str(r) for r in results]
+
+
+def _each(nodes, query):
+    """对多个节点执行同一查询并按顺序合并结果（同 SelectorList.css）"""
+    results = []
+    for node in nodes:
+        results.extend(query(node))
+    return results
+
+
+class _Queries:
+    """启动时编译的全部查询"""
+
+    def __init__(self):
+        self.regions = {name: _compile(css) for name, css in REGIONS.items()}
+        self.card_items = _compile('ul li')
+        self.fingerprint_parts = [
+            _compile('a::attr(href)'),
+            _compile('img::attr(data-original)'),
+            _compile('[title]::attr(title)'),
+            _compile('a::text'),
+        ]
+        self.link_hrefs = _compile('a::attr(href)')
+        self.verlist = _compile('div.verlist')
+        self.version_fields = {name: _compile(css) for name, css in VERSION_FIELDS.items()}
+        self.version_info_fields = {name: _compile(css) for name, css in VERSION_INFO_FIELDS.items()}
+        self.texts = _compile('::text')
+        self.fragment_markdown_body = _compile('div.markdown-body')
+
+
+class _LxmlPage:
+    """解析一次文档，按需定位区域（每个区域只查找一次）"""
+
+    def __init__(self, queries, root):
+        self.q = queries
+        self.root = root
+        self._regions = {}
+
+    def region(self, name):
+        """区域节点列表（通常只有一个）"""
+        if name not in self._regions:
+            self._regions[name] = self.q.regions[name](self.root)
+        return self._regions[name]
+
+    def in_region(self, name, query):
+        return _each(self.region(name), query)
+
+
+class _LxmlCard:
+
+    def __init__(self, queries, element):
+        self.q = queries
+        self.root = element
+
+    def fingerprint(self):
+        a_href, img_src, titles, a_texts = (query(self.root) for query in self.q.fingerprint_parts)
+        parts = _strings(a_href) + _strings(img_src) + _strings(titles)
+        parts.extend(t.strip() for t in _strings(a_texts) if t.strip())
+        return fingerprint_from_parts(parts)
+
+
+class _LxmlListPage(_LxmlPage, ListPage):
+
+    def __init__(self, queries, root, hrefs=None):
+        super().__init__(queries, root)
+        self._hrefs = hrefs  # 区域切片时从原始 HTML 中提取
+
+    def cards(self):
+        return [_LxmlCard(self.q, li) for li in self.in_region('modlist', self.q.card_items)]
+
+    def link_hrefs(self):
+        if self._hrefs is not None:
+            return self._hrefs
+        return _strings(self.q.link_hrefs(self.root))
+
+
+class _LxmlDetailPage(_LxmlPage, DetailPage):
+    """详情页只提供文档树（字段规则在 root 上执行）"""
+
+
+# ---- 区域切片：只解析与提取相关的 HTML 片段 ----
+
+# 注释、script/style 内容中的标签不参与配对
+_TOKEN_RE = re.compile(
+    r'<!--.*?-->|<(script|style)\b[^>]*>(.*?)</\1\s*>|<(/?)(div|h1|head)\b[^>]*>',
+    re.S | re.I,
+)
+_ATTR_RE = {
+    name: re.compile(rf'\b{name}\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+    for name in ('class', 'id')
+}
+_HREF_RE = re.compile(r'<a\b[^>]*?\shref\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+
+
+def _attr_tokens(tag, name):
+    match = _ATTR_RE[name].search(tag)
+    if not match:
+        return ()
+    return next(g for g in match.groups() if g is not None).split()
+
+
+class RegionSlicer:
+    """从原始 HTML 中切出 <head>、所有 <h1>、指定的 div 区域和包含指定文本的 script，
+    拼成一个小文档交给 lxml 解析。
+
+    区域按 div 开闭标签配对（与 libxml2 遇到 </div> 关闭最近的 div 行为一致）。
+    任何无法确定的情况（没有 <head>、区域未闭合、区域标记出现在非 div 标签上）
+    返回 None，调用方退回整页解析，保证输出与整页解析一致。
+    """
+
+    def __init__(self, classes=(), ids=(), script_marker=None):
+        self.classes = set(classes)
+        self.ids = set(ids)
+        self.script_marker = script_marker
+
+    def _is_region(self, tag):
+        return (not self.classes.isdisjoint(_attr_tokens(tag, 'class'))
+                or not self.ids.isdisjoint(_attr_tokens(tag, 'id')))
+
+    def _count_markers(self, text):
+        """区域标记出现在标签 class/id 属性中的次数（用于校验是否都落在 div 上）"""
+        count = 0
+        for attr, tokens in (('class', self.classes), ('id', self.ids)):
+            for token in tokens:
+                pos = text.find(token)
+                while pos != -1:
+                    tag_start = text.rfind('<', 0, pos)
+                    if tag_start > text.rfind('>', 0, pos):  # 位于标签内
+                        tag = text[tag_start:text.find('>', pos) + 1]
+                        if token in _attr_tokens(tag, attr):
+                            count += 1
+                    pos = text.find(token, pos + len(token))
+        return count
+
+    def slice(self, text):
+        spans = []
+        depth = 0
+        region_depth = None  # 正在截取的区域所在深度
+        region_start = h1_start = head_start = None
+        region_count = 0
+        has_head = False
+        for match in _TOKEN_RE.finditer(text):
+            if match.group(1):  # script / style
+                if (region_depth is None and self.script_marker
+                        and match.group(1).lower() == 'script' and self.script_marker in match.group(2)):
+                    spans.append((match.start(), match.end()))
+                continue
+            name = match.group(4)
+            if name is None:  # 注释
+                continue
+            name = name.lower()
+            closing = bool(match.group(3))
+            if name == 'div':
+                if closing:
+                    depth -= 1
+                    if region_depth is not None and depth == region_depth:
+                        spans.append((region_start, match.end()))
+                        region_depth = None
+                    continue
+                if self._is_region(match.group(0)):
+                    region_count += 1
+                    if region_depth is None:
+                        region_start, region_depth = match.start(), depth
+                depth += 1
+            elif name == 'h1':
+                if not closing:
+                    if h1_start is not None:
+                        return None
+                    h1_start = match.start()
+                elif h1_start is not None:
+                    if region_depth is None:
+                        spans.append((h1_start, match.end()))
+                    h1_start = None
+            elif name == 'head':
+                if not closing:
+                    head_start = match.start()
+                elif head_start is not None:
+                    spans.append((head_start, match.end()))
+                    head_start = None
+                    has_head = True
+
+        if region_depth is not None or h1_start is not None or not has_head:
+            return None
+        if region_count != self._count_markers(text):
+            return None
+
+        spans.sort()
+        parts = ['<html>']
+        last_end = 0
+        for start, end in spans:
+            if start < last_end:  # 已包含在前一个片段中
+                continue
+            parts.append(text[start:end])
+            last_end = end
+        parts.append('</html>')
+        return ''.join(parts)
+
+
+def link_hrefs_from_text(text):
+    """原始 HTML 中所有 <a href>（已反转义），不建树"""
+    return [html.unescape(next(g for g in m.groups() if g is not None)) for m in _HREF_RE.finditer(text)]
+
+
+class LxmlBackend:
+    """lxml 后端：预编译 XPath + 区域切片解析 + 区域内查询
+
+    region_parse=True 时只解析切出的区域（见 RegionSlicer），切片失败的页面整页解析。
+    """
+
+    name = 'lxml'
+
+    def __init__(self, region_parse=True):
+        self.q = _Queries()
+        self.region_parse = region_parse
+        self.list_slicer = RegionSlicer(**LIST_SLICE)
+        self.detail_slicer = RegionSlicer(**DETAIL_SLICE)
+        self.sliced_pages = 0
+        self.full_pages = 0
+
+    def _root(self, response, slicer):
+        text = response.text
+        if self.region_parse:
+            sliced = slicer.slice(text)
+            if sliced is not None:
+                self.sliced_pages += 1
+                return create_root_node(sliced, lxml_html.HTMLParser, base_url=response.url), True
+        self.full_pages += 1
+        # 与 Scrapy/parsel 相同的建树方式，保证输出一致
+        return create_root_node(text, lxml_html.HTMLParser, base_url=response.url), False
+
+    def list_page(self, response):
+        root, sliced = self._root(response, self.list_slicer)
+        return _LxmlListPage(self.q, root, link_hrefs_from_text(response.text) if sliced else None)
+
+    def detail_page(self, response):
+        return _LxmlDetailPage(self.q, self._root(response, self.detail_slicer)[0])
+
+    def version_entries(self, text):
+        v, q = self.q.version_fields, self.q
+        entries = []
+        for item in q.verlist(create_root_node(text, lxml_html.HTMLParser)):
+            h4 = v['h4'](item)
+            a_tag = _each(h4, v['a'])
+            entries.append(_version_entry(
+                bool(h4), bool(a_tag),
+                _first(_each(a_tag, v['href'])),
+                _first(_each(a_tag, v['text'])),
+                _tostring(a_tag[0]) if a_tag else None,
+                _first(v['note'](item)),
+                [
+                    dict({name: _first(query(em)) for name, query in q.version_info_fields.items()},
+                         texts=_strings(q.texts(em)))
+                    for em in v['info'](item)
+                ],
+            ))
+        return entries
+
+    def fragment_markdown_html(self, text):
+        bodies = self.q.fragment_markdown_body(create_root_node(text, lxml_html.HTMLParser))
+        return _tostring(bodies[0]) if bodies else None
+
+
+PARSER_BACKENDS = {
+    'parsel': ParselBackend,
+    'lxml': LxmlBackend,
+}
+
+
+def get_parser_backend(name):
+    try:
+        return PARSER_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"未知的解析后端: {name}（可用: {', '.join(PARSER_BACKENDS)}）")
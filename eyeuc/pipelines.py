@@ -1,14 +1,25 @@
 """
 EyeUC Pipelines
 
-按 list_id 分文件导出的管道
+按 list_id 分文件导出的管道；可选的列式（Parquet）导出管道
 """
 
-import json
+import logging
 import os
+import time
 from datetime import datetime
 from pathlib import Path
 
+from scrapy.exceptions import NotConfigured
+from twisted.internet import defer, threads
+
+from eyeuc import segments
+from eyeuc.columnar import ColumnarWriter
+from eyeuc.histogram import LatencyHistogram
+from eyeuc.itemwriter import BufferedItemWriter, dumps
+
+logger = logging.getLogger(__name__)
+
 
 class PerListJsonPipeline:
     """按 list_id 分文件导出的管道
@@ -18,26 +29,53 @@ class PerListJsonPipeline:
     - 支持 JSONL 和 JSON 数组两种格式
     - 自动创建输出目录
     - 文件名包含 list_id、game 和时间戳
+    - reactor 线程只序列化 item，由后台线程批量写入（eyeuc/itemwriter.py）
     
     配置项：
     - PER_LIST_OUTPUT_DIR: 输出目录（默认：per_list_output）
     - PER_LIST_AS_JSONL: 是否使用 JSONL 格式（默认：True）
+    - PER_LIST_BATCH_ITEMS / PER_LIST_BATCH_MS: 攒够多少 item 或多少毫秒提交一次
+    - PER_LIST_QUEUE_SIZE: 写入队列长度（满了以后 item 处理等待写入线程）
+    - PER_LIST_FSYNC: none / batch / close
+    - PER_LIST_COMPRESSION: JSONL 段压缩（gzip / zstd / 空，见 eyeuc/segments.py）
+    - PER_LIST_SEGMENT_MB: 段文件超过该大小（MB）时滚动到下一段（0 表示不滚动）
+    - PER_LIST_MAX_OPEN_FILES: 同时打开的文件句柄上限（LRU）
     """
     
-    def __init__(self, output_dir='per_list_output', as_jsonl=True):
+    def __init__(self, output_dir='per_list_output', as_jsonl=True,
+                 batch_items=500, batch_ms=200, queue_size=10000, fsync='close',
+                 compression=None, segment_mb=0, max_open=64):
         self.output_dir = output_dir
         self.as_jsonl = as_jsonl
-        self.files = {}  # {list_id: file_handle}
+        if not as_jsonl:
+            compression, segment_mb = None, 0  # JSON 数组不分段
+        self.writer = BufferedItemWriter(
+            batch_items, batch_ms, queue_size, fsync,
+            compression=compression, segment_bytes=int(segment_mb * 1024 * 1024), max_open=max_open,
+        )
+        self.files = {}  # {list_id: file_path}
         self.item_counts = {}  # {list_id: count}
         self.list_games = {}  # {list_id: game_name}
         self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.write_latency = LatencyHistogram(lowest=0.000001, highest=60.0)  # 单个 item 序列化 + 入队耗时（秒）
     
     @classmethod
     def from_crawler(cls, crawler):
         """从 Scrapy settings 加载配置"""
+        compression = crawler.settings.get('PER_LIST_COMPRESSION') or None
+        if not segments.available(compression):
+            logger.warning(f"PER_LIST_COMPRESSION={compression!r} 不可用（zstd 需要 pip install zstandard），改用 gzip")
+            compression = 'gzip'
         return cls(
             output_dir=crawler.settings.get('PER_LIST_OUTPUT_DIR', 'per_list_output'),
-            as_jsonl=crawler.settings.get('PER_LIST_AS_JSONL', True),
+            as_jsonl=crawler.settings.getbool('PER_LIST_AS_JSONL', True),
+            batch_items=crawler.settings.getint('PER_LIST_BATCH_ITEMS', 500),
+            batch_ms=crawler.settings.getfloat('PER_LIST_BATCH_MS', 200),
+            queue_size=crawler.settings.getint('PER_LIST_QUEUE_SIZE', 10000),
+            fsync=crawler.settings.get('PER_LIST_FSYNC', 'close'),
+            compression=compression,
+            segment_mb=crawler.settings.getfloat('PER_LIST_SEGMENT_MB', 0),
+            max_open=crawler.settings.getint('PER_LIST_MAX_OPEN_FILES', 64),
         )
     
     def open_spider(self, spider):
@@ -45,36 +83,50 @@ class PerListJsonPipeline:
         self.output_path = Path(self.output_dir)
         self.output_path.mkdir(parents=True, exist_ok=True)
         spider.logger.info(f"PerListJsonPipeline 已启动，输出目录: {self.output_path.absolute()}")
-        spider.logger.info(f"输出格式: {'JSONL' if self.as_jsonl else 'JSON 数组'}")
+        spider.logger.info(f"输出格式: {'JSONL' if self.as_jsonl else 'JSON 数组'}"
+                           + (f"（{self.writer.compression or '不压缩'}，分段 {self.writer.segment_bytes / 1024 / 1024:.4g} MB）"
+                              if self.writer.segmented else ''))
         
         # 获取页数范围（用于文件名）
         self.start_page = getattr(spider, 'start_page', 1)
         self.end_page = getattr(spider, 'end_page', None)
+        
+        # 分布式模式：多个 worker 写同一目录，文件名带 worker id
+        self.worker_id = getattr(spider, 'worker_id', None)
+    
+    @property
+    def queue_depth(self):
+        """等待写入线程处理的记录数"""
+        return self.writer.queue_depth
     
     def close_spider(self, spider):
-        """Spider 关闭时关闭所有文件并输出统计"""
+        """Spider 关闭时等待写入线程写完所有 item，关闭文件并输出统计"""
+        # 在线程中等待队列写完，不阻塞 reactor
+        d = threads.deferToThread(self.writer.close)
+        d.addCallback(lambda _: self._log_summary(spider))
+        return d
+    
+    def _log_summary(self, spider):
         spider.logger.info("=" * 80)
         spider.logger.info("PerListJsonPipeline 统计")
         spider.logger.info("=" * 80)
         
-        for list_id, file_handle in self.files.items():
+        for list_id in self.files:
             count = self.item_counts.get(list_id, 0)
             game = self.list_games.get(list_id, 'unknown')
-            
-            if not self.as_jsonl:
-                # JSON 数组格式：写入结尾的 ]
-                file_handle.write('\n]')
-            
-            file_handle.close()
-            
-            file_path = file_handle.name
-            file_size = os.path.getsize(file_path)
+            paths = self.writer.output_paths(list_id)
+            file_size = sum(os.path.getsize(p) for p in paths if os.path.exists(p))
             
             spider.logger.info(f"  list_id={list_id} ({game}): {count} items, {file_size:,} bytes")
-            spider.logger.info(f"    文件: {file_path}")
+            for path in paths:
+                spider.logger.info(f"    文件: {path}")
         
         spider.logger.info("=" * 80)
         spider.logger.info(f"总计: {len(self.files)} 个列表, {sum(self.item_counts.values())} items")
+        spider.logger.info(f"批量提交 {self.writer.commits} 次（fsync: {self.writer.fsync}），"
+                           f"文件句柄重新打开 {self.writer.reopens} 次")
+        if self.writer.errors:
+            spider.logger.error(f"写入失败 {self.writer.errors} 次，输出文件可能不完整")
         spider.logger.info("=" * 80)
     
     def process_item(self, item, spider):
@@ -89,12 +141,22 @@ class PerListJsonPipeline:
         if list_id not in self.files:
             self._create_file(list_id, item.get('game', 'unknown'), spider)
         
-        # 写入 item
-        self._write_item(list_id, item)
+        # 序列化后交给写入线程
+        started = time.perf_counter()
+        data = dumps(dict(item))
+        if self.as_jsonl:
+            data += b'\n'
+        mid = item.get('mid')
+        waiting = self.writer.write(list_id, data, int(mid) if str(mid).isdigit() else None)
+        self.write_latency.record(time.perf_counter() - started)
         
         # 更新计数
         self.item_counts[list_id] = self.item_counts.get(list_id, 0) + 1
         
+        if waiting is not None:
+            # 写入队列已满：等写入线程腾出空间后再交出 item
+            waiting.addCallback(lambda _: item)
+            return waiting
         return item
     
     def _create_file(self, list_id, game, spider):
@@ -112,6 +174,9 @@ class PerListJsonPipeline:
         if self.end_page:
             filename += f"_p{self.start_page}-{self.end_page}"
         
+        if self.worker_id:
+            filename += f"_{self._slugify(self.worker_id)}"
+        
         # 添加时间戳
         filename += f"_{self.timestamp}"
         
@@ -123,35 +188,16 @@ class PerListJsonPipeline:
         
         file_path = self.output_path / filename
         
-        # 打开文件
-        file_handle = open(file_path, 'w', encoding='utf-8')
-        
-        # JSON 数组格式：写入开头的 [
-        if not self.as_jsonl:
-            file_handle.write('[\n')
-        
-        self.files[list_id] = file_handle
-        self.list_games[list_id] = game
-        
-        spider.logger.info(f"创建输出文件: {file_path}")
-    
-    def _write_item(self, list_id, item):
-        """将 item 写入对应的文件"""
-        file_handle = self.files[list_id]
-        
+        # 文件由写入线程打开；JSON 数组格式写入开头的 [ 和结尾的 ]，对象之间用逗号分隔
         if self.as_jsonl:
-            # JSONL 格式：每行一个 JSON 对象
-            json.dump(item, file_handle, ensure_ascii=False)
-            file_handle.write('\n')
+            self.writer.open(list_id, file_path)
         else:
-            # JSON 数组格式：对象之间用逗号分隔
-            count = self.item_counts.get(list_id, 0)
-            if count > 0:
-                file_handle.write(',\n')
-            
-            json.dump(item, file_handle, ensure_ascii=False, indent=2)
+            self.writer.open(list_id, file_path, header=b'[\n', separator=b',\n', footer=b'\n]')
         
-        file_handle.flush()  # 及时刷新，避免丢失数据
+        self.files[list_id] = file_path
+        self.list_games[list_id] = game
+        
+        spider.logger.info(f"创建输出文件: {self.writer.segment_path(file_path, 1)}")
     
     def _slugify(self, text):
         """将文本转换为文件名安全的 slug"""
@@ -161,3 +207,79 @@ class PerListJsonPipeline:
         slug = ''.join(c for c in slug if c.isalnum() or c in ['_', '-'])
         return slug[:50]  # 限制长度
 
+
+
+class ColumnarExportPipeline:
+    """列式导出管道：把 item 拆成 lists / mods / versions / downloads / images 表写入 Parquet
+    
+    表结构见 eyeuc/columnar.py（与 schema.sql 对应）。每次运行在
+    COLUMNAR_EXPORT_DIR/<表名>/ 下写一个文件，多个分片写同一目录互不覆盖。
+    item 在 reactor 线程中拆表缓存，满一个 row group 后在线程中编码写盘。
+    
+    配置项：
+    - COLUMNAR_EXPORT_DIR: 输出目录（未设置时不启用；需要安装 pyarrow）
+    - COLUMNAR_ROW_GROUP_SIZE: 每个 row group 的行数（默认：10000）
+    - COLUMNAR_COMPRESSION: 压缩算法（默认：zstd）
+    """
+    
+    def __init__(self, output_dir, row_group_size=10000, compression='zstd'):
+        self.output_dir = output_dir
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.writer = None
+        self._writing = defer.succeed(None)  # 串行化写盘任务
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        output_dir = crawler.settings.get('COLUMNAR_EXPORT_DIR')
+        if not output_dir:
+            raise NotConfigured
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise NotConfigured('列式导出需要安装 pyarrow: pip install pyarrow')
+        return cls(
+            output_dir,
+            row_group_size=crawler.settings.getint('COLUMNAR_ROW_GROUP_SIZE', 10000),
+            compression=crawler.settings.get('COLUMNAR_COMPRESSION', 'zstd'),
+        )
+    
+    def open_spider(self, spider):
+        list_ids = '-'.join(str(x) for x in getattr(spider, 'target_list_ids', None) or []) or 'all'
+        name = f"eyeuc_list{list_ids}"
+        end_page = getattr(spider, 'end_page', None)
+        if end_page:
+            name += f"_p{getattr(spider, 'start_page', 1)}-{end_page}"
+        worker_id = getattr(spider, 'worker_id', None)
+        if worker_id:
+            name += f"_{''.join(c for c in str(worker_id) if c.isalnum() or c in '_-')}"
+        name += f"_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.writer = ColumnarWriter(self.output_dir, name, self.row_group_size, self.compression)
+        spider.logger.info(f"ColumnarExportPipeline 已启动，输出目录: {Path(self.output_dir).absolute()}")
+    
+    def process_item(self, item, spider):
+        self.writer.add(item)
+        ready = self.writer.ready()
+        if ready:
+            self._in_thread(self.writer.write, self.writer.take(ready))
+        return item
+    
+    def close_spider(self, spider):
+        d = self._in_thread(self.writer.close)
+        d.addCallback(lambda paths: self._log_summary(spider, paths))
+        return d
+    
+    def _in_thread(self, func, *args):
+        """在线程中执行写盘任务，前一个任务完成后才开始下一个"""
+        self._writing.addCallback(lambda _: threads.deferToThread(func, *args))
+        self._writing.addErrback(self._log_failure)
+        return self._writing
+    
+    def _log_failure(self, failure):
+        logger.error(f"列式导出写入失败: {failure.value}")
+    
+    def _log_summary(self, spider, paths):
+        counts = ', '.join(f"{table} {count}" for table, count in self.writer.counts.items())
+        spider.logger.info(f"ColumnarExportPipeline: {counts} 行（跳过 {self.writer.skipped} 个重复或无效 item）")
+        for table, path in (paths or {}).items():
+            spider.logger.info(f"  {table}: {path}")
@@ -0,0 +1,88 @@
+"""
+EyeUC 跨进程 mid 登记表
+
+并行分片（parallel_crawl.sh / smart_crawl.sh 启动的多个进程）共用一个
+run_id 和同一个 SQLite 文件。parse_list 发出详情请求前先登记 mid，
+已被任一分片（或本进程其他页）登记过的 mid 不再抓取。
+网站在抓取期间有新资源时，卡片会在页间移动，但每个 mid 在一次运行中只抓取一次。
+详情页重试后仍失败时撤销登记，其他分片（或本进程之后的页）遇到时可以重新抓取。
+
+没有 run_id 时只在进程内去重。打开共享表时删除最后一次登记早于 retention_days 天的旧 run_id。
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+
+
+class MidRegistry:
+    """mid 登记表（进程内集合 + 可选的 SQLite 共享表）"""
+
+    def __init__(self, path=None, run_id=None, owner=None, retention_days=7):
+        self.run_id = run_id
+        self.owner = owner
+        self._claimed = set()  # 本进程登记的 mid
+        self.conn = None
+        self.pruned = 0  # 打开时删除的旧 run_id 登记数
+        if path and run_id:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 自动提交：登记结果需要立即对其他进程可见
+            self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS mid_claims (
+                    run_id TEXT NOT NULL,
+                    mid TEXT NOT NULL,
+                    owner TEXT,
+                    claimed_at REAL,
+                    PRIMARY KEY (run_id, mid)
+                )
+                """
+            )
+            if retention_days:
+                self.pruned = self.conn.execute(
+                    'DELETE FROM mid_claims WHERE run_id != ? AND run_id IN ('
+                    '  SELECT run_id FROM mid_claims GROUP BY run_id HAVING MAX(claimed_at) < ?)',
+                    (run_id, time.time() - retention_days * 86400),
+                ).rowcount
+
+    @property
+    def shared(self):
+        return self.conn is not None
+
+    def claim(self, mid):
+        """登记 mid，返回 True 表示本进程获得抓取权（此前未被登记）"""
+        if mid in self._claimed:
+            return False
+        if self.conn is not None:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO mid_claims (run_id, mid, owner, claimed_at) VALUES (?, ?, ?, ?)',
+                (self.run_id, mid, self.owner, time.time()),
+            )
+            if cursor.rowcount == 0:
+                return False
+        self._claimed.add(mid)
+        return True
+
+    def release(self, mid):
+        """撤销本进程的登记（详情页抓取失败），之后任一分片都可以重新登记；返回是否撤销"""
+        if mid not in self._claimed:
+            return False
+        self._claimed.discard(mid)
+        if self.conn is not None:
+            self.conn.execute(
+                'DELETE FROM mid_claims WHERE run_id = ? AND mid = ? AND owner = ?',
+                (self.run_id, mid, self.owner),
+            )
+        return True
+
+    def __len__(self):
+        return len(self._claimed)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,134 @@
+"""
+压缩 JSONL 段文件的读写
+
+PerListJsonPipeline 开启压缩（PER_LIST_COMPRESSION）或按大小滚动（PER_LIST_SEGMENT_MB）后，
+每个 list_id 的输出写成一个或多个段文件：
+
+    eyeuc_list182_nba_2k25_p1-5_20251017_120000.jsonl.gz           不滚动
+    eyeuc_list182_nba_2k25_p1-5_20251017_120000_part0001.jsonl.zst 按大小滚动
+
+每个段的最后一行是清单（读取时跳过）：
+    {"_manifest": {"list_id": 182, "segment": 1, "items": 500, "mid_min": 31001, "mid_max": 31500, ...}}
+
+gzip 段可以由多个 gzip member 拼接，zstd 段可以由多个 frame 拼接（文件句柄被 LRU 池关闭后
+再次打开时追加新的 member/frame），标准工具（zcat / zstdcat）和 iter_jsonl() 都能连续读取。
+进程崩溃留下的段没有清单，末尾可能不完整，读取时在损坏处停止。
+
+zstd 需要 zstandard 包（可选依赖），gzip 使用标准库。
+"""
+
+import gzip
+import io
+import json
+import logging
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+MANIFEST_KEY = '_manifest'
+
+
+def available(compression):
+    """该压缩算法在当前环境中是否可用"""
+    return compression in EXTENSIONS and (compression != 'zstd' or zstandard is not None)
+
+
+def compression_of(path):
+    path = str(path)
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return None
+
+
+def open_append(path, compression, level=None):
+    """以追加方式打开段文件，返回 (写入流, 底层文件)；写入流关闭时不关闭底层文件"""
+    raw = open(path, 'ab')
+    if compression == 'gzip':
+        stream = gzip.GzipFile(fileobj=raw, mode='ab', compresslevel=level or 6)
+    elif compression == 'zstd':
+        stream = zstandard.ZstdCompressor(level=level or 3).stream_writer(raw, closefd=False)
+    else:
+        stream = raw
+    return stream, raw
+
+
+def flush(stream, raw):
+    """把已写入的数据推到磁盘缓冲（压缩流做一次同步 flush，之后的数据仍可解压）"""
+    if stream is not raw:
+        if zstandard is not None and isinstance(stream, zstandard.ZstdCompressionWriter):
+            stream.flush(zstandard.FLUSH_BLOCK)
+        else:
+            stream.flush()
+    raw.flush()
+
+
+def close(stream, raw):
+    """结束压缩流（写入 gzip member / zstd frame 结尾）并关闭文件"""
+    if stream is not raw:
+        stream.close()
+    raw.close()
+
+
+def manifest_line(manifest):
+    return json.dumps({MANIFEST_KEY: manifest}, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def open_text(path):
+    """按扩展名以文本方式打开（gzip / zstd / 普通文件）"""
+    compression = compression_of(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError(f"读取 {path} 需要安装 zstandard: pip install zstandard")
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(raw, encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def iter_records(path):
+    """逐行读取 JSONL（可以是压缩段），产出 (是否清单, 记录)
+
+    无法解析的行跳过；压缩流在中途损坏（进程崩溃）时记录警告并停止。
+    """
+    with open_text(path) as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"跳过无法解析的行: {path}")
+                    continue
+                if isinstance(record, dict) and MANIFEST_KEY in record:
+                    yield True, record[MANIFEST_KEY]
+                else:
+                    yield False, record
+        except (EOFError, OSError) as e:
+            logger.warning(f"段文件不完整，已读到损坏处为止: {path}: {e}")
+        except Exception as e:
+            if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                logger.warning(f"段文件不完整，已读到损坏处为止: {path}: {e}")
+            else:
+                raise
+
+
+def iter_jsonl(path):
+    """逐个读取 item（跳过清单行）"""
+    for is_manifest, record in iter_records(path):
+        if not is_manifest:
+            yield record
+
+
+def manifests(path):
+    """段文件中的清单（正常结束的段只有一个，未写完的段没有）"""
+    return [record for is_manifest, record in iter_records(path) if is_manifest]
@@ -0,0 +1,376 @@
+"""
+登录会话池：多账号调度、按账号限速与会话健康检测
+
+spider 的 cookies 参数可以是逗号分隔的多个 cookies 文件（支持通配符），每个文件一个账号：
+
+    scrapy crawl eyeuc_mods -a cookies=accounts/a.json,accounts/b.json -a list_ids=182
+    scrapy crawl eyeuc_mods -a 'cookies=accounts/*.json' -a list_ids=182
+
+SessionHealthMiddleware 负责（未加载 cookies 时不生效）：
+- 分配：没有指定会话的请求（列表页、新资源的详情页）分给当前预算最充足的健康账号；
+  详情页的 toversion / todownload 请求沿用详情页的账号（spider 在 meta['session'] 中传递），
+  cookiejar 按 "账号:list_id" 隔离。账号不健康时它的请求改派给其他账号
+- 限速：每个账号一个令牌桶（SESSION_RATE 个请求/秒，突发 SESSION_BURST），
+  预算不足的请求延迟发出；账号越多，总吞吐上限越高
+- 健康检测只用字节匹配：302 的 Location / 响应 URL 是否为登录地址，以及 body 前
+  SESSION_CHECK_BYTES 字节（页头登录栏）内是否出现 SESSION_LOGIN_MARKERS（不解码 body）。
+  标记只在 SESSION_MARKER_ENDPOINTS（默认 list / detail 整页）中检查：
+  todownload 片段里单个下载项的 showWindow('login') 可能只是该项需要更高权限
+- 账号会话失效：标记为不健康，受影响的请求改派其他账号重放（每个请求最多
+  SESSION_MAX_REPLAYS 次）；在线程中调用 SESSION_REFRESH_HOOK（"模块.函数"，参数为
+  spider 和 AccountSession，返回新的 {name: value} cookies），未配置时重新读取该账号的
+  cookies 文件，拿到 cookies 后账号恢复健康。所有账号都不健康时暂停引擎调度
+- 账号恢复后 SESSION_REFRESH_COOLDOWN 秒内再次失效，说明新 cookies 同样无效：
+  之后只接受与当前不同的 cookies，每 SESSION_REFRESH_POLL 秒重试一次，
+  超过 SESSION_REFRESH_TIMEOUT 秒停用该账号；所有账号都停用时以 session_expired 关闭 spider
+
+需放在 RedirectMiddleware（600）之后（数值更大）、CookiesMiddleware（700）之前。
+"""
+
+import glob
+import json
+import logging
+import time
+from pathlib import Path
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.misc import load_object
+from twisted.internet import defer, threads
+from twisted.internet.task import deferLater
+
+from eyeuc.endpoints import DETAIL, LIST, endpoint_class, is_login_url
+
+logger = logging.getLogger(__name__)
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def read_cookies_file(path):
+    """读取浏览器导出的 cookies JSON，返回 {name: value}（只保留 eyeuc.com 域名）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        cookies_list = json.load(f)
+    return {
+        cookie['name']: cookie['value'] for cookie in cookies_list
+        if 'eyeuc.com' in cookie.get('domain', '')
+    }
+
+
+def expand_cookie_files(spec):
+    """逗号分隔的 cookies 文件列表（支持通配符）展开为文件路径列表"""
+    paths = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        matches = sorted(glob.glob(part)) if glob.has_magic(part) else [part]
+        paths.extend(p for p in matches if p not in paths)
+    return paths
+
+
+def login_reason(response, markers, check_bytes):
+    """会话失效的原因（redirect / login_page / marker），正常时返回 None
+
+    只做字节级匹配：Location 头、响应 URL，以及 body 的前 check_bytes 字节
+    （markers 为空时不检查 body）。
+    """
+    if response.status in REDIRECT_STATUSES:
+        location = response.headers.get('Location', b'').decode('latin-1')
+        return 'redirect' if is_login_url(location) else None
+    if is_login_url(response.url):
+        return 'login_page'
+    body = response.body
+    end = min(len(body), check_bytes)
+    for marker in markers:
+        if body.find(marker, 0, end) != -1:
+            return 'marker'
+    return None
+
+
+class AccountSession:
+    """会话池中的一个账号：cookies、令牌桶预算和健康状态"""
+
+    def __init__(self, name, cookies_file, cookies):
+        self.name = name
+        self.cookies_file = cookies_file
+        self.cookies = cookies  # 刷新时原地替换，已构造的请求引用同一个 dict
+        self.healthy = True
+        self.disabled = False  # 等待新 cookies 超时，不再使用
+        self.refreshing = False
+        self.last_refresh = None  # 上次恢复的时间（monotonic）
+        self.rate = 0.0  # 每秒请求数，0 为不限速
+        self.burst = 1.0
+        self.tokens = 1.0
+        self._updated = time.monotonic()
+        self.requests = 0
+        self.expired = 0
+
+    def set_budget(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self, now):
+        """当前可用的令牌数（不限速时为无穷大）"""
+        if self.rate <= 0:
+            return float('inf')
+        self._refill(now)
+        return self.tokens
+
+    def reserve(self, now):
+        """预留一个请求的预算，返回需要等待的秒数（令牌允许透支，按透支量排队）"""
+        self.requests += 1
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def replace_cookies(self, cookies):
+        self.cookies.clear()
+        self.cookies.update(cookies)
+
+
+class SessionPool:
+    """按 cookies 文件加载的账号集合（保持加载顺序）"""
+
+    def __init__(self):
+        self.sessions = {}
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __iter__(self):
+        return iter(self.sessions.values())
+
+    def add(self, cookies_file, cookies):
+        name = Path(cookies_file).stem
+        base, n = name, 1
+        while name in self.sessions:
+            n += 1
+            name = f'{base}-{n}'
+        session = AccountSession(name, cookies_file, cookies)
+        self.sessions[name] = session
+        return session
+
+    def get(self, name):
+        return self.sessions.get(name) if name is not None else None
+
+    def first(self):
+        return next(iter(self.sessions.values()), None)
+
+    def healthy(self):
+        return [s for s in self.sessions.values() if s.healthy and not s.disabled]
+
+    def choose(self, now):
+        """预算最充足的健康账号（同等时选请求数最少的），没有时返回 None"""
+        candidates = self.healthy()
+        if not candidates:
+            return None
+        return max(candidates, key=lambda s: (s.available(now), -s.requests))
+
+
+class SessionHealthMiddleware:
+    """多账号会话池：分配账号、按账号限速、会话失效时刷新 cookies 并重放请求"""
+
+    def __init__(self, crawler, markers, marker_endpoints=(LIST, DETAIL), check_bytes=32768, hook=None,
+                 max_replays=2, cooldown=60.0, poll_interval=30.0, timeout=600.0, rate=0.0, burst=1.0):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.markers = markers
+        self.marker_endpoints = frozenset(marker_endpoints)
+        self.check_bytes = check_bytes
+        self.hook = hook
+        self.max_replays = max_replays
+        self.cooldown = cooldown
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.rate = rate
+        self.burst = burst
+        self.pool = None
+        self.paused = False  # 所有账号都不健康，引擎调度已暂停
+        self.gave_up = False  # 所有账号都已停用并关闭 spider
+        self._waiters = []  # 等待有健康账号的请求
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('SESSION_CHECK_ENABLED', True):
+            raise NotConfigured
+        hook = settings.get('SESSION_REFRESH_HOOK')
+        middleware = cls(
+            crawler,
+            markers=[m.encode('utf-8') for m in settings.getlist('SESSION_LOGIN_MARKERS')],
+            marker_endpoints=settings.getlist('SESSION_MARKER_ENDPOINTS', [LIST, DETAIL]),
+            check_bytes=settings.getint('SESSION_CHECK_BYTES', 32768),
+            hook=load_object(hook) if hook else None,
+            max_replays=settings.getint('SESSION_MAX_REPLAYS', 2),
+            cooldown=settings.getfloat('SESSION_REFRESH_COOLDOWN', 60.0),
+            poll_interval=settings.getfloat('SESSION_REFRESH_POLL', 30.0),
+            timeout=settings.getfloat('SESSION_REFRESH_TIMEOUT', 600.0),
+            rate=settings.getfloat('SESSION_RATE', 0.0),
+            burst=settings.getfloat('SESSION_BURST', 1.0),
+        )
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider):
+        pool = getattr(spider, 'session_pool', None)
+        if not pool:
+            return
+        self.pool = pool
+        for session in pool:
+            session.set_budget(self.rate, self.burst)
+        budget = f"每个账号 {self.rate:g} 请求/秒（突发 {self.burst:g}）" if self.rate > 0 else '不限速'
+        logger.info(
+            f"会话池: {len(pool)} 个账号（{', '.join(s.name for s in pool)}），{budget}，"
+            f"刷新方式: {'SESSION_REFRESH_HOOK' if self.hook else 'cookies 文件'}"
+        )
+
+    def spider_closed(self, spider):
+        if not self.pool:
+            return
+        for session in self.pool:
+            state = '停用' if session.disabled else ('正常' if session.healthy else '失效')
+            logger.info(f"  账号 {session.name}: 请求 {session.requests}，会话失效 {session.expired} 次，{state}")
+
+    # ---- 分配与限速 ----
+
+    def process_request(self, request, spider):
+        if not self.pool or urlparse_cached(request).scheme not in ('http', 'https'):
+            return None
+        if self.gave_up:
+            raise IgnoreRequest('所有账号都已停用')
+        now = time.monotonic()
+        session = self.pool.get(request.meta.get('session'))
+        if session is None or not session.healthy:
+            if session is not None:
+                self.stats.inc_value('session/reassigned')
+            session = self.pool.choose(now)
+            if session is None:
+                # 所有账号都在刷新：等到有账号恢复后重新分配
+                d = defer.Deferred()
+                d.addCallback(lambda _: self.process_request(request, spider))
+                self._waiters.append(d)
+                return d
+            request.meta['session'] = session.name
+
+        request.meta['cookiejar'] = f"{session.name}:{request.meta.get('list_id', '')}"
+        request.cookies = session.cookies
+        wait = session.reserve(now)
+        self.stats.inc_value(f'session/{session.name}/requests')
+        if wait > 0:
+            from twisted.internet import reactor
+            self.stats.inc_value(f'session/{session.name}/throttled')
+            return deferLater(reactor, wait, lambda: None)
+        return None
+
+    # ---- 健康检测 ----
+
+    def process_response(self, request, response, spider):
+        if not self.pool or self.gave_up or 'cached' in response.flags or 'archived' in response.flags:
+            return response
+        session = self.pool.get(request.meta.get('session'))
+        if session is None:
+            return response
+        markers = self.markers if endpoint_class(request.url) in self.marker_endpoints else ()
+        reason = login_reason(response, markers, self.check_bytes)
+        if reason is None:
+            return response
+
+        self.stats.inc_value(f'session/expired/{reason}')
+        replays = request.meta.get('session_replays', 0)
+        if replays >= self.max_replays:
+            self.stats.inc_value('session/replay_exhausted')
+            logger.warning(f"会话失效，重放 {replays} 次后放弃: {request.url}")
+            return response
+
+        if session.healthy:
+            logger.warning(f"账号 {session.name} 会话失效（{reason}）: {request.url}，刷新 cookies")
+            self._start_refresh(spider, session)
+        self.stats.inc_value('session/replayed')
+        replay = request.replace(dont_filter=True)
+        replay.meta['session_replays'] = replays + 1
+        replay.meta.pop('session', None)  # 重新分配给健康的账号
+        return replay
+
+    def _start_refresh(self, spider, session):
+        session.healthy = False
+        session.refreshing = True
+        session.expired += 1
+        self.stats.inc_value('session/refreshes')
+        if not self.pool.healthy() and not self.paused:
+            logger.warning("所有账号的会话都已失效，暂停调度")
+            self.paused = True
+            self.crawler.engine.pause()
+        require_change = (
+            session.last_refresh is not None and time.monotonic() - session.last_refresh < self.cooldown
+        )
+        if require_change:
+            logger.warning(f"账号 {session.name} 恢复后 {self.cooldown:g} 秒内再次失效，等待新的 cookies")
+        d = self._refresh(spider, session, dict(session.cookies), require_change, time.monotonic())
+        d.addErrback(lambda failure: logger.error(f"刷新 cookies 出错: {failure.getErrorMessage()}"))
+
+    def _load(self, spider, session):
+        if self.hook is not None:
+            return self.hook(spider, session)
+        return read_cookies_file(session.cookies_file)
+
+    def _refresh(self, spider, session, old_cookies, require_change, started):
+        d = threads.deferToThread(self._load, spider, session)
+
+        def done(cookies):
+            if cookies and not (require_change and cookies == old_cookies):
+                self._resume(session, cookies, started)
+                return None
+            return self._retry_later(spider, session, old_cookies, started)
+
+        def failed(failure):
+            logger.warning(f"账号 {session.name} 获取 cookies 失败: {failure.getErrorMessage()}")
+            return self._retry_later(spider, session, old_cookies, started)
+
+        d.addCallbacks(done, failed)
+        return d
+
+    def _retry_later(self, spider, session, old_cookies, started):
+        if time.monotonic() - started < self.timeout:
+            from twisted.internet import reactor
+            return deferLater(reactor, self.poll_interval, self._refresh,
+                              spider, session, old_cookies, True, started)
+        session.refreshing = False
+        session.disabled = True
+        self.stats.inc_value('session/disabled')
+        logger.error(f"账号 {session.name} {self.timeout:g} 秒内没有拿到可用的 cookies，停用")
+        if all(s.disabled for s in self.pool):
+            self.gave_up = True
+            logger.error("所有账号都已停用，关闭 spider")
+            self._release()
+            self.crawler.engine.close_spider(spider, 'session_expired')
+        return None
+
+    def _resume(self, session, cookies, started):
+        session.replace_cookies(cookies)
+        paused = time.monotonic() - started
+        self.stats.inc_value('session/paused_ms', int(paused * 1000))
+        session.last_refresh = time.monotonic()
+        session.refreshing = False
+        session.healthy = True
+        logger.info(f"账号 {session.name} 已刷新 {len(cookies)} 个 cookies（{paused:.1f}s）")
+        self._release()
+
+    def _release(self):
+        """恢复调度，并让等待账号的请求重新分配"""
+        if self.paused:
+            self.paused = False
+            self.crawler.engine.unpause()
+            logger.info("恢复调度")
+        waiters, self._waiters = self._waiters, []
+        for d in waiters:
+            d.callback(None)
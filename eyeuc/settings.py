@@ -9,6 +9,9 @@
 
 BOT_NAME = "eyeuc"
 
+# 站点地址（scripts/bench_crawl.py 对本地模拟站点测试时改为 http://127.0.0.1:<port>）
+SITE_URL = "https://bbs.eyeuc.com"
+
 SPIDER_MODULES = ["eyeuc.spiders"]
 NEWSPIDER_MODULE = "eyeuc.spiders"
 
@@ -62,6 +65,17 @@ DOWNLOADER_MIDDLEWARES = {
     "eyeuc.middlewares.EnhancedRetryMiddleware": 550,
     # 统计收集
     "eyeuc.middlewares.StatsCollectorMiddleware": 585,
+    # 多账号会话池：分配账号、按账号限速、会话失效时刷新 cookies 并重放请求
+    # （需在 RedirectMiddleware 600 之后、CookiesMiddleware 700 之前）
+    "eyeuc.session.SessionHealthMiddleware": 620,
+    # 按接口分 slot + AIMD 自适应并发（需在 RedirectMiddleware 600 之后）
+    "eyeuc.middlewares.EndpointConcurrencyMiddleware": 650,
+    # HTTP 缓存（按接口类别统计命中和节省字节数，HTTPCACHE_ENABLED 开启时生效）
+    "scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware": None,
+    # 原始响应归档（ARCHIVE_DIR）/ 离线回放（ARCHIVE_REPLAY_DIR），未配置目录时不启用
+    "eyeuc.archive.ResponseArchiveMiddleware": 890,
+    "eyeuc.archive.ArchiveReplayMiddleware": 895,
+    "eyeuc.httpcache.EndpointHttpCacheMiddleware": 900,
 }
 
 # Enable or disable extensions
@@ -69,11 +83,16 @@ DOWNLOADER_MIDDLEWARES = {
 # EXTENSIONS = {
 #    "scrapy.extensions.telnet.TelnetConsole": None,
 # }
+EXTENSIONS = {
+    # 实时指标（Prometheus 文本格式），METRICS_FILE / METRICS_PORT 都未设置时不启用
+    "eyeuc.metrics.MetricsExporter": 500,
+}
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
    "eyeuc.pipelines.PerListJsonPipeline": 300,
+   "eyeuc.pipelines.ColumnarExportPipeline": 310,  # 未设置 COLUMNAR_EXPORT_DIR 时不启用
 }
 
 # Enable and configure the AutoThrottle extension (disabled by default)
@@ -89,13 +108,64 @@ AUTOTHROTTLE_TARGET_CONCURRENCY = 2.5  # Stage 2: 提升到 2.5
 # Enable showing throttle stats for every response received:
 AUTOTHROTTLE_DEBUG = False  # 生产环境设为 False，开发时可设为 True
 
-# Enable and configure HTTP caching (disabled by default)
-# See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
-# HTTPCACHE_ENABLED = True
-# HTTPCACHE_EXPIRATION_SECS = 0
-# HTTPCACHE_DIR = "httpcache"
-# HTTPCACHE_IGNORE_HTTP_CODES = []
-# HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+# HTTP 缓存（开发重跑 / 局部重抓用，默认关闭；-s HTTPCACHE_ENABLED=true 开启）
+# 单文件 SQLite 存储（压缩 body，超过上限按 LRU 淘汰）+ 按接口类别的缓存策略，见 eyeuc/httpcache.py
+HTTPCACHE_ENABLED = False
+HTTPCACHE_STORAGE = "eyeuc.httpcache.SqliteCacheStorage"
+HTTPCACHE_POLICY = "eyeuc.httpcache.EndpointCachePolicy"
+HTTPCACHE_SQLITE_PATH = "httpcache/eyeuc_cache.db"
+HTTPCACHE_MAX_MB = 512  # 缓存文件大小上限（MB）
+HTTPCACHE_COMPRESS_LEVEL = 6  # zlib 压缩级别
+# ttl：缓存时间（秒），过期后 revalidate=True 时用 ETag / Last-Modified 条件请求重新验证
+HTTPCACHE_ENDPOINT_POLICY = {
+    "list": {"ttl": 600, "revalidate": True},
+    "detail": {"ttl": 0, "revalidate": True},
+    "toversion": {"ttl": 86400, "revalidate": True},
+    "todownload": {"ttl": 86400, "revalidate": True},
+}
+
+# 原始响应归档：设置目录后把每个响应写入压缩段文件（-s ARCHIVE_DIR=archive/list182），
+# 修复解析 bug 后用 scripts/reparse_archive.py 离线重新生成输出
+ARCHIVE_DIR = None
+ARCHIVE_SEGMENT_MB = 64  # 单个段文件大小上限（MB）
+ARCHIVE_COMPRESS_LEVEL = 6
+ARCHIVE_REPLAY_DIR = None  # 回放模式：只从该归档读取响应，不访问网络
+
+# 按接口类别的自适应并发（EndpointConcurrencyMiddleware）
+# 每类接口独立 slot：start=初始并发，min/max=调整范围，target_latency=目标延迟（秒）
+# 总并发仍受 CONCURRENT_REQUESTS 限制
+ENDPOINT_CONCURRENCY_ENABLED = True
+ENDPOINT_CONCURRENCY = {
+    "list": {"start": 2, "min": 1, "max": 3, "target_latency": 4.0},
+    "detail": {"start": 3, "min": 1, "max": 6, "target_latency": 4.0},
+    "toversion": {"start": 4, "min": 1, "max": 10, "target_latency": 2.0},
+    "todownload": {"start": 4, "min": 1, "max": 10, "target_latency": 2.0},
+}
+ENDPOINT_CONCURRENCY_DECREASE = 0.5  # 乘性减因子
+
+# 响应延迟统计（StatsCollectorMiddleware）：按接口类别和状态码的流式直方图，
+# 每隔 N 秒把 p50/p90/p99/max 写入 stats（latency/<接口>/...），0 表示只在结束时写入
+LATENCY_STATS_INTERVAL = 60
+
+# 登录会话池（eyeuc.session.SessionHealthMiddleware，只在加载了 cookies 时生效）
+# -a cookies=a.json,b.json 加载多个账号，请求分散到健康的账号上
+SESSION_CHECK_ENABLED = True
+SESSION_RATE = 0  # 每个账号每秒最多请求数（令牌桶），0 为不限速
+SESSION_BURST = 4  # 每个账号允许的突发请求数
+SESSION_LOGIN_MARKERS = ["showWindow('login'", 'id="messagelogin"']  # 未登录页面/片段中的标记（字节匹配）
+SESSION_MARKER_ENDPOINTS = ["list", "detail"]  # 检查标记的接口类别（XHR 片段只按登录跳转判断）
+SESSION_CHECK_BYTES = 32768  # 只在 body 的前 N 字节中查找标记（页头登录栏所在区域）
+SESSION_REFRESH_HOOK = None  # "模块.函数"，参数为 (spider, 账号)，返回新的 {name: value} cookies；为空时重新读取该账号的 cookies 文件
+SESSION_MAX_REPLAYS = 2  # 每个请求因会话失效最多重放次数
+SESSION_REFRESH_COOLDOWN = 60  # 恢复后 N 秒内再次失效时，只接受与当前不同的 cookies
+SESSION_REFRESH_POLL = 30  # 等待新 cookies 时的重试间隔（秒）
+SESSION_REFRESH_TIMEOUT = 600  # 等待超过 N 秒仍没有可用 cookies 时停用该账号，全部停用时关闭 spider
+
+# 实时指标（eyeuc.metrics.MetricsExporter），Prometheus 文本格式
+METRICS_FILE = None  # 每 METRICS_INTERVAL 秒重写该文件（多进程分片时各自一个文件）
+METRICS_PORT = None  # HTTP 端点端口，可以是 "9410,9430" 范围（依次尝试）
+METRICS_HOST = "127.0.0.1"
+METRICS_INTERVAL = 5  # 采集间隔（秒）
 
 # Retry settings
 RETRY_ENABLED = True
@@ -116,6 +186,19 @@ LOG_LEVEL = "INFO"
 # Per-list output settings (for阶段1.5)
 PER_LIST_OUTPUT_DIR = "per_list_output"
 PER_LIST_AS_JSONL = True  # True = JSONL, False = JSON array
+PER_LIST_BATCH_ITEMS = 500  # 写入线程攒够多少个 item 提交一次（write + flush）
+PER_LIST_BATCH_MS = 200  # 或距第一个未提交 item 超过多少毫秒提交一次
+PER_LIST_QUEUE_SIZE = 10000  # 写入队列长度，满了以后 item 处理等待写入线程（背压）
+PER_LIST_FSYNC = "close"  # none = 只 flush，batch = 每次提交后 fsync，close = 关闭文件前 fsync
+PER_LIST_COMPRESSION = "gzip"  # JSONL 段压缩：gzip / zstd（需要 zstandard）/ None（不压缩、不写段清单）
+PER_LIST_SEGMENT_MB = 256  # 段文件（压缩后）超过该大小时滚动到下一段，0 = 不滚动
+PER_LIST_MAX_OPEN_FILES = 64  # 同时打开的输出文件句柄上限，超过时关闭最久未写入的文件
+
+# 列式导出（Parquet，需要 pip install pyarrow）：设置 COLUMNAR_EXPORT_DIR 后启用 ColumnarExportPipeline
+# 也可以用 scripts/export_parquet.py 转换已有的 per_list_output 文件
+COLUMNAR_EXPORT_DIR = None  # 例如 "columnar_output"
+COLUMNAR_ROW_GROUP_SIZE = 10000  # 每个 row group 的行数
+COLUMNAR_COMPRESSION = "zstd"
 
 # Stage 2: 随机延迟中间件配置
 RANDOM_DELAY_MIN = 0.1  # 最小延迟（秒）
@@ -124,6 +207,8 @@ RANDOM_DELAY_MAX = 0.4  # 最大延迟（秒）
 # Stage 2: 解析错误监控配置
 PARSE_ERROR_OUTPUT_DIR = "parse_errors"  # 失败样本保存目录
 PARSE_ERROR_SAVE_SAMPLES = True  # 是否保存失败样本
+PARSE_ERROR_SAMPLES_PER_SIGNATURE = 5  # 每个签名（异常类型 + 回调 + URL 模式）最多保存的样本数
+PARSE_ERROR_QUEUE_SIZE = 100  # 后台写入队列长度，队列满时丢弃样本（只计数）
 
 # Images pipeline settings (for阶段3，暂时注释)
 # IMAGES_STORE = "images"
@@ -140,3 +225,42 @@ DUPEFILTER_CLASS = 'scrapy.dupefilters.BaseDupeFilter'  # 完全禁用去重（r
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 FEED_EXPORT_ENCODING = "utf-8"
 
+
+# 增量抓取（-a incremental=true）
+INCREMENTAL_STATE_DB = "state/eyeuc_state.db"  # 按 mid 记录卡片指纹/更新时间的 SQLite 状态库
+INCREMENTAL_STOP_PAGES = 2  # 连续 N 页全部为已知且未变化的资源时停止翻页
+# 分支缓存（-a branch_cache=true，增量模式默认启用）：详情页更新时间/默认 vid 未变化时复用分支列表，
+# 分支更新时间未变化时复用 todownload 的解析结果
+BRANCH_CACHE_DB = "state/branch_cache.db"
+
+# 未完成的多分支 items（部分分支请求失败/未返回）
+PENDING_ITEM_TIMEOUT = 600  # 超过 N 秒未收齐分支：落盘并输出 partial item
+PENDING_ITEM_MAX = 2000  # 同时等待的 items 上限，超出时最早的先输出
+PENDING_JOURNAL_DIR = "pending_journal"  # 落盘日志目录（崩溃后下次运行自动补输出）
+
+# 可恢复抓取（-a job=<id>）：frontier 保存目录，每个 job 一个 SQLite 文件
+FRONTIER_DIR = "frontier"
+
+# 分布式模式（-a queue=sqlite:///queue/eyeuc.db 或 tcp://host:7700）
+WORK_QUEUE_PREFETCH = 16  # 每个 worker 同时持有的任务数
+WORK_QUEUE_LEASE_SECONDS = 300  # 任务租约时长（worker 崩溃后任务在租约到期时回到队列）
+WORK_QUEUE_MAX_ATTEMPTS = 3  # 任务最多领取次数，超过后标记为 failed
+
+# 并发翻页：每解析一页，发出其后 LIST_PAGE_WINDOW 页（分页栏给出最大页码时一次发出全部），
+# 遇到空页/404 停止；增量模式下固定为串行翻页
+LIST_PAGE_WINDOW = 8
+
+# mid 登记表：并行分片指定相同的 -a run_id 时共享此文件，每个 mid 每次运行只抓取一次
+MID_REGISTRY_DB = "state/mid_registry.db"
+MID_REGISTRY_RETENTION_DAYS = 7  # 最后一次登记超过 N 天的 run_id，打开登记表时删除
+
+# 页面解析后端：lxml（预编译 XPath + 区域内查询，默认）或 parsel（response.css 参考实现，输出一致）
+PARSER_BACKEND = "lxml"
+
+# 字段规则（eyeuc/extraction.py）：每个字段每提取多少次评估一次候选选择器顺序，
+# 命中率低于阈值的候选调到兜底选择器之后
+EXTRACTION_REORDER_INTERVAL = 100
+EXTRACTION_MIN_HIT_RATE = 0.5
+
+# 保存 todownload 原始响应（{mid}_{vid}.xml）的目录，用于补充 scripts/golden/todownload 样本；留空不保存
+TODOWNLOAD_RECORD_DIR = ""
@@ -1,15 +1,34 @@
 import scrapy
-import json
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from scrapy.spidermiddlewares.httperror import HttpError
+from twisted.internet import defer, threads
+import os
 import re
+import socket
+import time
+from pathlib import Path
 from urllib.parse import urljoin, urlparse
 from datetime import datetime, timedelta
 
+from eyeuc.assembler import ItemAssembler
+from eyeuc.extraction import ExtractionEngine
+from eyeuc.frontier import CrawlFrontier
+from eyeuc.journal import PendingJournal
+from eyeuc.registry import MidRegistry
+from eyeuc.session import SessionPool, expand_cookie_files, read_cookies_file
+from eyeuc.parsers import get_parser_backend
+from eyeuc.state import BranchCache, ModStateStore
+from eyeuc.todownload import download_entries, parse_todownload
+from eyeuc.workqueue import open_work_queue
+
 
 class EyeucModsSpider(scrapy.Spider):
     """EyeUC 多列表采集 Spider - 阶段 1.2-1.3"""
     
     name = "eyeuc_mods"
     allowed_domains = ["eyeuc.com"]
+    site_url = "https://bbs.eyeuc.com"  # SITE_URL 配置（本地模拟站点基准测试时指向 http://127.0.0.1:<port>）
     
     # 静态游戏名映射（兜底）
     GAME_NAME_MAP = {
@@ -20,18 +39,28 @@ class EyeucModsSpider(scrapy.Spider):
     }
     
     def __init__(self, cookies=None, list_ids=None, list_range=None, use_pw=None, 
-                 direct_dl=None, prefer_versions=None, start_page='1', end_page='0', *args, **kwargs):
+                 direct_dl=None, prefer_versions=None, start_page='1', end_page='0',
+                 incremental=None, state_db=None, branch_cache=None, job=None, queue=None, worker=None, run_id=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
         # 参数解析
         self.cookies_file = cookies
         self.cookies_dict = {}
+        self.session_pool = SessionPool()  # 多账号会话池（eyeuc/session.py）
         self.formhash = None  # 用于 buy 接口
         self.list_ids_param = list_ids
         self.list_range_param = list_range
         self.use_pw = use_pw and use_pw.lower() in ('true', '1', 'yes')
         self.direct_dl = direct_dl and direct_dl.lower() in ('true', '1', 'yes')  # 默认 false（只抓元数据）
         self.prefer_versions = prefer_versions and prefer_versions.lower() in ('true', '1', 'yes')
+        self.incremental = bool(incremental and incremental.lower() in ('true', '1', 'yes'))
+        self.state_db = state_db  # 为空时使用 INCREMENTAL_STATE_DB 配置
+        # 分支缓存：未指定时增量模式启用
+        self.use_branch_cache = (branch_cache.lower() in ('true', '1', 'yes')) if branch_cache else self.incremental
+        self.job = job  # 可恢复抓取的 job id（同一 job 重启时从 frontier 继续）
+        self.run_id = run_id  # 并行分片共用的运行 id（跨进程 mid 去重）
+        self.queue_url = queue  # 分布式模式：共享任务队列地址（sqlite:///... 或 tcp://host:port）
+        self.worker_id = (worker or f'{socket.gethostname()}-{os.getpid()}') if queue else None
         
         # 页数范围（用于分批抓取）
         self.start_page = int(start_page)
@@ -54,79 +83,579 @@ class EyeucModsSpider(scrapy.Spider):
         self.stats_counter = {
             'items_scraped': 0,
             'parse_errors': 0,
-            'selector_fallbacks': 0,
             'lists_processed': set(),
+            'incremental_skipped': 0,
+            'resume_skipped': 0,
+            'registry_skipped': 0,
+            'toversion_skipped': 0,
+            'todownload_skipped': 0,
         }
         
-        # 收集未完成的 items（key: mid, value: item_data）
-        self.pending_items = {}
+        # 页面解析后端（在 from_crawler 中按 PARSER_BACKEND 配置替换）
+        self.parser = get_parser_backend('lxml')
+        
+        # 声明式字段规则（eyeuc/extraction.py），启动时编译一次
+        self.extractor = ExtractionEngine(logger=self.logger)
+        
+        # todownload 原始响应保存目录（TODOWNLOAD_RECORD_DIR，None 为不保存）
+        self.todownload_record_dir = None
+        
+        # 多分支 item 组装器（按 mid 保存详情数据，收集分支结果）
+        self.assembler = ItemAssembler()
+        
+        # 未完成 item：超时/超量时落盘并输出 partial item（在 from_crawler 中配置）
+        self.journal = None
+        self.pending_timeout = 600
+        self.pending_max = 2000
+        self.spilled_queue = []  # 已落盘、等待通过 flush 请求输出的 partial items
+        self._last_pending_check = 0.0
+        self._shutdown_requested = False
+        self._after_flush = None  # flush 完成后执行（SIGTERM 时为原有的关闭处理）
+        
+        # 增量模式：状态存储在 from_crawler 中打开（需要读取 settings）
+        self.state_store = None
+        self.branch_cache = None  # BranchCache（分支列表/下载结果缓存）
+        self.incremental_stop_pages = 2
+        self.unchanged_page_streak = {}  # {list_id: 连续"全部未变化"的页数}
+        
+        # 可恢复抓取：frontier 在 from_crawler 中打开
+        self.frontier = None
+        
+        # mid 登记表：每个 mid 每次运行只抓取一次（有 run_id 时跨进程共享）
+        self.mid_registry = None
+        
+        # 并发翻页：预取窗口在 from_crawler 中配置
+        self.list_page_window = 8
+        self.list_pages_issued = {}  # {list_id: 已发出请求的最大页码}
+        self.list_last_page = {}  # {list_id: 已确认的末页页码}
+        
+        # 分布式模式：任务队列在 from_crawler 中打开
+        self.work_queue = None
+        self.queue_prefetch = 16
+        self.queue_lease_seconds = 300
+        self.queue_tasks = {}  # {task_id: WorkTask} 本 worker 正在处理的任务
+        self.queue_detail_tasks = {}  # {mid: task_id} 等待 item 输出后 ack 的详情任务
+        self._last_lease_renew = 0.0
+        self._queue_ops = defer.succeed(None)  # 队列调用在线程中串行执行（tcp 后端是阻塞的网络往返）
+        self._queue_leasing = 0  # 已发出、结果未返回的 lease 数量
+        self._queue_polling = False
+        self._queue_drained = False  # 最近一次空闲检查时队列已全部完成
     
-    def _load_cookies(self):
-        """从 JSON 文件加载 cookies"""
-        try:
-            with open(self.cookies_file, 'r', encoding='utf-8') as f:
-                cookies_list = json.load(f)
-            
-            # 转换为 {name: value} 字典，过滤域名
-            for cookie in cookies_list:
-                domain = cookie.get('domain', '')
-                if 'eyeuc.com' in domain:
-                    self.cookies_dict[cookie['name']] = cookie['value']
-            
-            self.logger.info(f"已加载 {len(self.cookies_dict)} 个 cookies")
-        except Exception as e:
-            self.logger.error(f"加载 cookies 失败: {e}")
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.parser = get_parser_backend(crawler.settings.get('PARSER_BACKEND', 'lxml'))
+        spider.site_url = crawler.settings.get('SITE_URL', cls.site_url).rstrip('/')
+        site_host = urlparse(spider.site_url).hostname
+        if not any(site_host == d or site_host.endswith('.' + d) for d in spider.allowed_domains):
+            spider.allowed_domains = spider.allowed_domains + [site_host]
+        spider.extractor = ExtractionEngine(
+            reorder_interval=crawler.settings.getint('EXTRACTION_REORDER_INTERVAL', 100),
+            min_hit_rate=crawler.settings.getfloat('EXTRACTION_MIN_HIT_RATE', 0.5),
+            logger=spider.logger,
+        )
+        record_dir = crawler.settings.get('TODOWNLOAD_RECORD_DIR')
+        if record_dir:
+            spider.todownload_record_dir = Path(record_dir)
+            spider.todownload_record_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 增量模式按顺序统计连续无变化的页数，保持串行翻页
+        spider.list_page_window = 1 if spider.incremental else max(1, crawler.settings.getint('LIST_PAGE_WINDOW', 8))
+        
+        if spider.incremental:
+            spider._open_state_store(crawler.settings)
+            crawler.signals.connect(spider._close_state_store, signal=signals.spider_closed)
+        
+        if spider.use_branch_cache:
+            spider._open_branch_cache(crawler.settings)
+            crawler.signals.connect(spider._close_branch_cache, signal=signals.spider_closed)
+        
+        if spider.queue_url:
+            if spider.job:
+                spider.logger.warning("分布式模式下任务队列本身可恢复，忽略 job 参数")
+                spider.job = None
+            spider._open_work_queue(crawler.settings)
+            crawler.signals.connect(spider._close_work_queue, signal=signals.spider_closed)
+        
+        if spider.job:
+            spider._open_frontier(crawler.settings)
+            crawler.signals.connect(spider._close_frontier, signal=signals.spider_closed)
+        
+        spider._open_registry(crawler.settings)
+        crawler.signals.connect(spider._close_registry, signal=signals.spider_closed)
+        
+        spider._open_journal(crawler.settings)
+        crawler.signals.connect(spider._on_spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(spider._on_item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(spider._close_journal, signal=signals.spider_closed)
+        crawler.signals.connect(spider._on_spider_opened, signal=signals.spider_opened)
+        return spider
+    
+    def _on_spider_opened(self, spider):
+        self.extractor.stats = self.crawler.stats
+        
+        recovered = self.journal.recover()
+        if recovered:
+            self.logger.warning(f"从遗留日志中恢复 {len(recovered)} 个未输出的 partial items")
+            self.spilled_queue.extend(recovered)
+            self.crawler.stats.inc_value('pending/recovered', len(recovered))
+        
+        # Scrapy 在 reactor 启动后才安装自己的信号处理，这里延后一拍再包装
+        from twisted.internet import reactor
+        reactor.callLater(0, self._install_shutdown_hook)
     
-    def _extract_with_fallback(self, response, primary_selector, fallback_selectors=None, 
-                                extract_method='get', default='', field_name='unknown'):
+    def _open_state_store(self, settings):
+        """增量模式：打开本地状态存储"""
+        path = self.state_db or settings.get('INCREMENTAL_STATE_DB', 'state/eyeuc_state.db')
+        self.incremental_stop_pages = settings.getint('INCREMENTAL_STOP_PAGES', 2)
+        self.state_store = ModStateStore(path)
+        self.logger.info(
+            f"增量模式: 启用（状态库 {path}，已记录 {len(self.state_store)} 个 mid，"
+            f"连续 {self.incremental_stop_pages} 页无变化时停止翻页）"
+        )
+    
+    def _close_state_store(self, spider):
+        """增量模式：提交并关闭状态存储"""
+        if self.state_store is not None:
+            self.logger.info(
+                f"增量模式: 跳过 {self.stats_counter['incremental_skipped']} 个未变化资源，"
+                f"状态库共 {len(self.state_store)} 个 mid"
+            )
+            self.state_store.close()
+            self.state_store = None
+    
+    def _open_branch_cache(self, settings):
+        """打开分支缓存（详情页未变化时跳过 toversion，分支未更新时跳过 todownload）"""
+        path = settings.get('BRANCH_CACHE_DB', 'state/branch_cache.db')
+        self.branch_cache = BranchCache(path)
+        self.logger.info(f"分支缓存: 启用（{path}，已缓存 {len(self.branch_cache)} 个 mid 的分支列表）")
+    
+    def _close_branch_cache(self, spider):
+        if self.branch_cache is not None:
+            self.logger.info(
+                f"分支缓存: 跳过 toversion {self.stats_counter['toversion_skipped']} 次，"
+                f"todownload {self.stats_counter['todownload_skipped']} 次"
+            )
+            self.branch_cache.close()
+            self.branch_cache = None
+    
+    def _record_mod_state(self, mid, list_id, fingerprint, metadata):
+        """增量模式：资源抓取完成后记录状态"""
+        if self.state_store is None or not mid:
+            return
+        metadata = metadata or {}
+        self.state_store.record(
+            mid,
+            list_id=list_id,
+            fingerprint=fingerprint,
+            last_updated=metadata.get('last_updated'),
+            current_version_updated=metadata.get('current_version_updated'),
+        )
+    
+    def _open_frontier(self, settings):
+        """恢复模式：打开 job 对应的 frontier"""
+        path = Path(settings.get('FRONTIER_DIR', 'frontier')) / f'{self.job}.db'
+        self.frontier = CrawlFrontier(path)
+        if self.frontier.resuming:
+            self.logger.info(f"恢复 job {self.job}: 已完成 {self.frontier.completed_count} 个 mid（{path}）")
+        else:
+            self.logger.info(f"新建 job {self.job}（{path}）")
+    
+    def _close_frontier(self, spider):
+        if self.frontier is not None:
+            self.logger.info(
+                f"job {self.job}: 已完成 {self.frontier.completed_count} 个 mid，"
+                f"本次跳过已完成 {self.stats_counter['resume_skipped']} 个"
+            )
+            self.frontier.close()
+            self.frontier = None
+    
+    def _open_work_queue(self, settings):
+        """分布式模式：连接共享任务队列"""
+        self.queue_prefetch = settings.getint('WORK_QUEUE_PREFETCH', 16)
+        self.queue_lease_seconds = settings.getfloat('WORK_QUEUE_LEASE_SECONDS', 300)
+        self.work_queue = open_work_queue(
+            self.queue_url, max_attempts=settings.getint('WORK_QUEUE_MAX_ATTEMPTS', 3)
+        )
+        self.logger.info(
+            f"分布式模式: worker={self.worker_id}，队列 {self.queue_url}，"
+            f"预取 {self.queue_prefetch} 个任务，租约 {self.queue_lease_seconds:.0f}s"
+        )
+    
+    def _close_work_queue(self, spider):
+        """归还未完成的任务（其他 worker 可立即领取）并断开队列（排在已发出的队列调用之后）"""
+        if self.work_queue is None:
+            return
+        if self.queue_tasks:
+            self.logger.warning(f"关闭时归还 {len(self.queue_tasks)} 个未完成的队列任务")
+            self._queue_call('release', list(self.queue_tasks))
+            self.queue_tasks.clear()
+        counts = self._queue_call('counts')
+        counts.addCallback(lambda result: result and self.logger.info(f"队列状态: {result}"))
+        closed = self._queue_call('close')
+        self.work_queue = None
+        return closed
+    
+    def _open_registry(self, settings):
+        """打开 mid 登记表（指定 run_id 时与其他分片共享）"""
+        path = settings.get('MID_REGISTRY_DB', 'state/mid_registry.db')
+        owner = f"p{self.start_page}-{self.end_page or 'all'}"
+        self.mid_registry = MidRegistry(
+            path if self.run_id else None, self.run_id, owner,
+            retention_days=settings.getfloat('MID_REGISTRY_RETENTION_DAYS', 7),
+        )
+        if self.mid_registry.shared:
+            self.logger.info(f"mid 登记表: run_id={self.run_id}（{path}），跨分片去重")
+            if self.mid_registry.pruned:
+                self.logger.info(f"mid 登记表: 删除旧 run_id 的 {self.mid_registry.pruned} 条登记")
+    
+    def _close_registry(self, spider):
+        if self.mid_registry is not None:
+            if self.stats_counter['registry_skipped']:
+                self.logger.info(f"mid 登记表: 跳过 {self.stats_counter['registry_skipped']} 个已被登记的资源")
+            self.mid_registry.close()
+            self.mid_registry = None
+    
+    def _open_journal(self, settings):
+        """打开未完成 item 日志（遗留日志在 spider_opened 时接管）"""
+        self.pending_timeout = settings.getfloat('PENDING_ITEM_TIMEOUT', 600)
+        self.pending_max = settings.getint('PENDING_ITEM_MAX', 2000)
+        
+        # 日志名区分列表和页数范围，并行分片互不干扰
+        if self.worker_id:
+            name = f"{self.name}_worker_{self.worker_id}"
+        else:
+            list_part = '-'.join(str(i) for i in self.target_list_ids)
+            name = f"{self.name}_list{list_part}_p{self.start_page}-{self.end_page or 'all'}"
+        self.journal = PendingJournal(settings.get('PENDING_JOURNAL_DIR', 'pending_journal'), name)
+    
+    def _close_journal(self, spider, reason):
+        """Spider 关闭时仍未完成的 items 只落盘（下次运行恢复输出）"""
+        if self.journal is None:
+            return
+        leftovers = len(self.assembler)
+        for mid in self.assembler.mids():
+            self._spill(mid, 'closed')
+        leftovers += len(self.spilled_queue)
+        if leftovers:
+            self.logger.warning(f"关闭时仍有 {leftovers} 个未输出的 items，已保存到 {self.journal.path}")
+        self.spilled_queue = []
+        self.journal.close()
+    
+    def _spill(self, mid, reason):
+        """将未完成的 item 移出组装器并落盘，返回 partial item"""
+        collected, total = self.assembler.collected(mid)
+        item = self.assembler.pop(mid)
+        if item is None:
+            return None
+        item['partial'] = True
+        self.journal.spill(mid, item)
+        self.crawler.stats.inc_value(f'pending/spilled_{reason}')
+        self.logger.warning(
+            f"未完成 item 落盘（{reason}）: mid={mid}, 分支 {collected}/{total}, "
+            f"标题: {item.get('title', '')[:50]}"
+        )
+        return item
+    
+    def _check_pending(self):
+        """超出数量上限或超时的未完成 items 落盘并作为 partial item 输出"""
+        overflow = len(self.assembler) - self.pending_max
+        spill = [(mid, 'cap') for mid in self.assembler.oldest(overflow)] if overflow > 0 else []
+        
+        # 超时扫描最多每秒一次
+        now = time.monotonic()
+        if now - self._last_pending_check >= 1.0:
+            self._last_pending_check = now
+            spill.extend((mid, 'timeout') for mid in self.assembler.expired(self.pending_timeout))
+        
+        for mid, reason in spill:
+            item = self._spill(mid, reason)
+            if item is not None:
+                yield item
+    
+    def _schedule_flush(self):
+        """所有未完成 items 落盘，并通过一个本地请求把它们送进 item 管道"""
+        for mid in self.assembler.mids():
+            item = self._spill(mid, 'shutdown' if self._shutdown_requested else 'idle')
+            if item is not None:
+                self.spilled_queue.append(item)
+        if not self.spilled_queue:
+            return False
+        
+        self.crawler.engine.crawl(scrapy.Request(
+            'data:,',
+            callback=self._flush_spilled,
+            errback=self._flush_failed,
+            priority=1000,
+            dont_filter=True,
+            meta={'dont_retry': True},
+        ))
+        return True
+    
+    def _flush_spilled(self, response):
+        """输出已落盘的 partial items"""
+        self.logger.warning(f"输出 {len(self.spilled_queue)} 个 partial items")
+        while self.spilled_queue:
+            yield self.spilled_queue.pop(0)
+        self._run_after_flush()
+    
+    def _flush_failed(self, failure):
+        self.logger.error(f"partial items 输出失败（已保存在 {self.journal.path}）: {failure.value}")
+        self._run_after_flush()
+    
+    def _run_after_flush(self):
+        if self._after_flush is not None:
+            from twisted.internet import reactor
+            callback, self._after_flush = self._after_flush, None
+            reactor.callLater(0, callback)
+    
+    def _on_spider_idle(self, spider):
+        """没有待处理请求时，把剩余的未完成 items 作为 partial 输出后再关闭
+        
+        分布式模式下继续从队列领取任务，队列全部完成后才关闭。
         """
-        Stage 2: 带兜底的选择器提取
+        if self._schedule_flush():
+            raise DontCloseSpider
         
-        Args:
-            response: Scrapy response
-            primary_selector: 主选择器（CSS 或 XPath）
-            fallback_selectors: 兜底选择器列表
-            extract_method: 'get' 或 'getall'
-            default: 默认值
-            field_name: 字段名（用于日志）
+        if self.work_queue is not None and not self._shutdown_requested and not self._queue_drained:
+            self._poll_queue()
+            raise DontCloseSpider
+    
+    def _on_item_scraped(self, item, response, spider):
+        if self.work_queue is not None:
+            task_id = self.queue_detail_tasks.pop(self._item_mid(item), None)
+            if task_id is not None:
+                # partial item 缺少分支：放回队列，由其他 worker（或本 worker）重新抓取
+                self._finish_task(task_id, done=not item.get('partial'))
+        
+        # partial item 缺少分支：留在 frontier 的 pending 中，恢复时重新抓取
+        if self.frontier is not None and not item.get('partial'):
+            mid = self._item_mid(item)
+            if mid:
+                self.frontier.complete(mid)
+        
+        if item.get('partial') and self.journal is not None:
+            self.stats_counter['items_scraped'] += 1
+            self.journal.mark_emitted(item.get('mid'))
+    
+    def _item_mid(self, item):
+        """item 的 mid（无 mid 的兜底 item 从详情页 URL 提取）"""
+        mid = item.get('mid')
+        if not mid:
+            mid_match = re.search(r'/down/view/(\d+)', item.get('detail_url', ''))
+            mid = mid_match.group(1) if mid_match else None
+        return mid
+    
+    # ---- 分布式模式：任务队列 ----
+    
+    def _queue_call(self, method, *args):
+        """在线程中调用任务队列，按调用顺序串行执行
         
-        Returns:
-            提取的值或默认值
+        返回 Deferred，结果为队列方法的返回值；调用失败时记录错误，结果为 None。
         """
-        fallback_selectors = fallback_selectors or []
+        queue = self.work_queue
+        result = defer.Deferred()
         
-        # 尝试主选择器
-        try:
-            if primary_selector.startswith('//'):
-                result = response.xpath(primary_selector)
+        def run(_):
+            d = threads.deferToThread(getattr(queue, method), *args)
+            d.chainDeferred(result)
+            return d
+        
+        self._queue_ops.addCallback(run)
+        result.addErrback(self._queue_call_failed, method)
+        return result
+    
+    def _queue_call_failed(self, failure, method):
+        self.logger.error(f"任务队列调用失败 {method}: {failure.value}")
+        self.crawler.stats.inc_value('queue/errors')
+        return None
+    
+    def _poll_queue(self):
+        """（spider_idle）领取任务；没有领到任务时检查队列是否全部完成"""
+        if self._queue_polling:
+            return
+        self._queue_polling = True
+        
+        def check(leased):
+            if leased:
+                self._queue_polling = False
+                return None
+            counts = self._queue_call('counts')
+            counts.addCallback(self._check_drained)
+            return counts
+        
+        self._lease_tasks().addCallback(check)
+    
+    def _check_drained(self, counts):
+        self._queue_polling = False
+        if counts is None:
+            return
+        if counts['ready'] or counts['leased']:
+            # 其他 worker 仍持有租约（可能产生新任务，或崩溃后租约到期回到队列）
+            self.logger.info(f"等待其他 worker: {counts}")
+        else:
+            self._queue_drained = True  # 下一次 spider_idle 时关闭
+    
+    def _lease_tasks(self):
+        """补足预取数量，领取到的任务转成请求交给引擎（返回 Deferred，结果为领取的任务数）"""
+        self._renew_leases()
+        limit = self.queue_prefetch - len(self.queue_tasks) - self._queue_leasing
+        if limit <= 0:
+            return defer.succeed(0)
+        self._queue_leasing += limit
+        d = self._queue_call('lease', self.worker_id, limit, self.queue_lease_seconds)
+        d.addCallback(self._crawl_leased, limit)
+        return d
+    
+    def _crawl_leased(self, tasks, limit):
+        self._queue_leasing -= limit
+        tasks = tasks or []
+        for task in tasks:
+            # 关闭过程中领到的任务只登记，关闭时归还
+            self.queue_tasks[task.id] = task
+            self.crawler.stats.inc_value(f'queue/leased/{task.kind}')
+            if not self._shutdown_requested:
+                self.crawler.engine.crawl(self._task_request(task))
+        if tasks:
+            self._queue_drained = False
+        return len(tasks)
+    
+    def _renew_leases(self):
+        """续租正在处理的任务（每 1/3 租约时长一次）"""
+        now = time.monotonic()
+        if now - self._last_lease_renew < self.queue_lease_seconds / 3:
+            return
+        self._last_lease_renew = now
+        if self.queue_tasks:
+            self._queue_call('renew', self.worker_id, list(self.queue_tasks), self.queue_lease_seconds)
+    
+    def _task_request(self, task):
+        """队列任务 -> 请求"""
+        data = task.data
+        if task.kind == 'list':
+            request = self._list_request(data['list_id'], data['page'], data.get('game_name'))
+            request = request.replace(callback=self._queued_parse_list, errback=self._queued_task_failed)
+        else:
+            request = self._detail_request(
+                data['url'], data['list_id'], data['game_name'], data['list_url'],
+                data.get('cover_image', ''), data.get('card_fingerprint'),
+            )
+            request = request.replace(callback=self._queued_parse_detail, errback=self._queued_task_failed)
+        request.meta['queue_task'] = task.id
+        return request
+    
+    def _finish_task(self, task_id, done):
+        """任务完成（ack）或放弃（release，其他 worker 可重新领取）"""
+        task = self.queue_tasks.pop(task_id, None)
+        if task is None:
+            return
+        self._queue_call('ack' if done else 'release', [task_id])
+        self.crawler.stats.inc_value(f"queue/{'acked' if done else 'released'}/{task.kind}")
+    
+    def _queued_parse_list(self, response):
+        """列表页任务：后续列表页和详情页作为新任务放回队列（按 key 去重）"""
+        new_tasks = []
+        for output in self.parse_list(response):
+            if isinstance(output, scrapy.Request) and output.callback == self.parse_list:
+                meta = output.meta
+                new_tasks.append((
+                    'list', f"list:{meta['list_id']}:{meta['page']}",
+                    {'list_id': meta['list_id'], 'page': meta['page'], 'game_name': meta.get('game_name')}, 0,
+                ))
+            elif isinstance(output, scrapy.Request) and output.callback == self.parse_detail:
+                meta = output.meta
+                mid_match = re.search(r'/down/view/(\d+)', output.url)
+                key = f"detail:{mid_match.group(1)}" if mid_match else f"detail:{output.url}"
+                new_tasks.append(('detail', key, {
+                    'url': output.url,
+                    'list_id': meta['list_id'],
+                    'game_name': meta['game_name'],
+                    'list_url': meta['list_url'],
+                    'cover_image': meta.get('cover_image', ''),
+                    'card_fingerprint': meta.get('card_fingerprint'),
+                }, 1))  # 详情任务优先，尽快产出 item
             else:
-                result = response.css(primary_selector)
-            
-            value = getattr(result, extract_method)()
-            if value:
-                return value
-        except Exception as e:
-            self.logger.warning(f"主选择器失败 ({field_name}): {e}")
+                yield output
         
-        # 尝试兜底选择器
-        for i, fallback in enumerate(fallback_selectors, 1):
+        if new_tasks:
+            self._queue_call('put_many', new_tasks).addCallback(self._count_added, len(new_tasks))
+        self._finish_task(response.meta['queue_task'], done=True)
+        self._lease_tasks()
+    
+    def _count_added(self, added, total):
+        if added is not None:
+            self.crawler.stats.inc_value('queue/added', added)
+            self.crawler.stats.inc_value('queue/duplicates', total - added)
+    
+    def _queued_parse_detail(self, response):
+        """详情页任务：分支请求在本 worker 内完成，item 输出后 ack"""
+        task_id = response.meta['queue_task']
+        mid_match = re.search(r'/down/view/(\d+)', response.url)
+        mid = mid_match.group(1) if mid_match else None
+        self.queue_detail_tasks[mid] = task_id
+        
+        produced = False
+        for output in self.parse_detail(response):
+            if isinstance(output, dict):
+                produced = True
+            yield output
+        
+        if not produced and mid not in self.assembler:
+            self.queue_detail_tasks.pop(mid, None)
+            self._finish_task(task_id, done=False)
+        self._lease_tasks()
+    
+    def _queued_task_failed(self, failure):
+        """队列任务请求失败：列表页 HTTP 错误视为末页，其余放回队列重试"""
+        request = failure.request
+        task = self.queue_tasks.get(request.meta.get('queue_task'))
+        if task is None:
+            return
+        if task.kind == 'list' and failure.check(HttpError):
+            self.handle_page_error(failure)
+            self._finish_task(task.id, done=True)
+        else:
+            self.logger.warning(f"队列任务失败，放回队列: {task.key} ({failure.value})")
+            self._finish_task(task.id, done=False)
+        self._lease_tasks()
+    
+    def _install_shutdown_hook(self):
+        """SIGTERM/SIGINT：先落盘并输出未完成 items，再交给 Scrapy 正常关闭"""
+        import signal as os_signal
+        from twisted.internet import reactor
+        
+        for signum in (os_signal.SIGTERM, os_signal.SIGINT):
+            previous = os_signal.getsignal(signum)
+            if not callable(previous):
+                continue
+            
+            def handler(signum, frame, previous=previous):
+                if self._shutdown_requested:
+                    previous(signum, frame)
+                    return
+                self._shutdown_requested = True
+                reactor.callFromThread(self._flush_on_shutdown, previous, signum)
+            
+            os_signal.signal(signum, handler)
+    
+    def _flush_on_shutdown(self, previous, signum):
+        self.logger.warning(f"收到信号 {signum}，输出 {len(self.assembler)} 个未完成 items 后关闭")
+        self._after_flush = lambda: previous(signum, None)
+        if not self._schedule_flush():
+            self._run_after_flush()
+    
+    def _load_cookies(self):
+        """从 JSON 文件加载 cookies（逗号分隔多个文件时每个文件一个账号，加入会话池）"""
+        for path in expand_cookie_files(self.cookies_file):
             try:
-                if fallback.startswith('//'):
-                    result = response.xpath(fallback)
-                else:
-                    result = response.css(fallback)
-                
-                value = getattr(result, extract_method)()
-                if value:
-                    self.logger.info(f"选择器兜底成功 ({field_name}): 使用第 {i} 个兜底选择器")
-                    self.stats_counter['selector_fallbacks'] += 1
-                    return value
+                session = self.session_pool.add(path, read_cookies_file(path))
+                self.logger.info(f"已加载 {len(session.cookies)} 个 cookies（账号 {session.name}）")
             except Exception as e:
-                self.logger.warning(f"兜底选择器 {i} 失败 ({field_name}): {e}")
-        
-        # 所有选择器都失败，返回默认值
-        self.logger.warning(f"所有选择器失败 ({field_name})，使用默认值: {default}")
-        return default
+                self.logger.error(f"加载 cookies 失败 {path}: {e}")
+        # 请求默认带第一个账号的 cookies；启用 SessionHealthMiddleware 时按账号替换
+        first = self.session_pool.first()
+        if first is not None:
+            self.cookies_dict = first.cookies
     
     def expand_list_ids(self, list_ids, list_range):
         """
@@ -161,23 +690,95 @@ class EyeucModsSpider(scrapy.Spider):
         return sorted(result)
     
     def start_requests(self):
-        """为每个 list_id 发起起始请求"""
+        """为每个 list_id 发起起始请求（恢复模式下从 frontier 继续）"""
+        if self.work_queue is not None:
+            # 分布式模式：起始列表页放入队列（多个 worker 重复放入时按 key 去重）
+            self._queue_call('put_many', [
+                ('list', f'list:{list_id}:{self.start_page}', {'list_id': list_id, 'page': self.start_page}, 0)
+                for list_id in self.target_list_ids
+            ])
+            self._lease_tasks()
+            return
+        
         for list_id in self.target_list_ids:
-            # 从 start_page 开始
-            url = f"https://bbs.eyeuc.com/down/list/{list_id}/{self.start_page}"
+            if self.frontier is not None and self.frontier.resuming:
+                yield from self._resume_list(list_id)
+                continue
             
-            # 每个 list_id 使用独立的 cookiejar
-            yield scrapy.Request(
-                url=url,
-                callback=self.parse_list,
-                cookies=self.cookies_dict if self.cookies_dict else None,
-                meta={
-                    'cookiejar': list_id,  # 会话隔离
-                    'list_id': list_id,
-                    'page': self.start_page,
-                },
-                dont_filter=True,
+            # 从 start_page 开始
+            yield self._list_request(list_id, self.start_page, errback=None)
+    
+    def _list_request(self, list_id, page, game_name=None, errback=True):
+        """构造列表页请求"""
+        meta = {
+            'cookiejar': list_id,  # 每个 list_id 使用独立的 cookiejar（会话隔离）
+            'list_id': list_id,
+            'page': page,
+        }
+        if game_name:
+            meta['game_name'] = game_name
+        
+        return scrapy.Request(
+            url=f"{self.site_url}/down/list/{list_id}/{page}",
+            callback=self.parse_list,
+            cookies=self.cookies_dict if self.cookies_dict else None,
+            meta=meta,
+            dont_filter=True,
+            errback=self.handle_page_error if errback else None,
+        )
+    
+    def _detail_request(self, url, list_id, game_name, list_url, cover_image, fingerprint=None):
+        """构造详情页请求"""
+        return scrapy.Request(
+            url=url,
+            callback=self.parse_detail,
+            cookies=self.cookies_dict if self.cookies_dict else None,
+            meta={
+                'cookiejar': list_id,
+                'list_id': list_id,
+                'game_name': game_name,
+                'list_url': list_url,
+                'cover_image': cover_image,  # 传递封面图
+                'card_fingerprint': fingerprint,
+            },
+            dont_filter=True,  # 禁用 Scrapy 全局去重（seen_in_page 已做页内去重）
+            errback=self.handle_detail_error,
+        )
+    
+    def handle_detail_error(self, failure):
+        """详情页重试后仍失败：撤销 mid 登记，其他分片遇到时可以重新抓取"""
+        request = failure.request
+        self.logger.error(f"详情页抓取失败: {request.url} ({failure.value})")
+        mid_match = re.search(r'/down/view/(\d+)', request.url)
+        if mid_match and self.mid_registry is not None and self.mid_registry.release(mid_match.group(1)):
+            self.crawler.stats.inc_value('mid_registry/released')
+    
+    def _resume_list(self, list_id):
+        """恢复模式：重发未完成的详情请求，从已解析的最大页之后继续翻页"""
+        game_name, done, pages = self.frontier.list_state(list_id)
+        game_name = game_name or self.GAME_NAME_MAP.get(list_id) or f'list_{list_id}'
+        
+        # 未完成的 mid 从详情页重新开始（详情数据不持久化，分支请求随之重发）
+        pending = self.frontier.pending_mids(list_id)
+        for mid, page, cover_image in pending:
+            list_url = f"{self.site_url}/down/list/{list_id}/{page}"
+            yield self._detail_request(
+                f"{self.site_url}/down/view/{mid}", list_id, game_name, list_url, cover_image or '',
             )
+        
+        # 并发翻页时已解析的页可能不连续，先补抓缺失的页
+        next_page = max(pages) + 1 if pages else self.start_page
+        missing = sorted(set(range(self.start_page, next_page)) - pages)
+        self.logger.info(
+            f"恢复列表 {list_id}: 已解析 {len(pages)} 页，补抓 {len(missing)} 页，重发 {len(pending)} 个未完成详情，"
+            f"{'已到末页' if done else f'从第 {next_page} 页继续'}"
+        )
+        for page in missing:
+            yield self._list_request(list_id, page, game_name if pages else None)
+        if done or (self.end_page and next_page > self.end_page):
+            return
+        self.list_pages_issued[list_id] = next_page
+        yield self._list_request(list_id, next_page, game_name if pages else None)
     
     def parse_list(self, response):
         """解析列表页，提取详情链接和翻页"""
@@ -189,10 +790,12 @@ class EyeucModsSpider(scrapy.Spider):
         
         self.logger.info(f"正在解析列表 {list_id} 第 {page} 页: {response.url}")
         
+        page_doc = self.parser.list_page(response)
+        
         # 解析游戏名（如果还没有的话）
         if 'game_name' not in response.meta:
             # 首次访问该列表（可能不是第 1 页），尝试提取游戏名
-            game_name = self._guess_game_name(response, list_id)
+            game_name = self._guess_game_name(page_doc, list_id)
             response.meta['game_name'] = game_name
             self.logger.info(f"列表 {list_id} 游戏名: {game_name}")
         else:
@@ -201,12 +804,13 @@ class EyeucModsSpider(scrapy.Spider):
         
         # 提取详情链接和封面图（页内去重）
         # 封面图在列表页，结构：.modlist ul li
-        items = response.css('.modlist ul li')  # 每个资源卡片
+        items = page_doc.cards()  # 每个资源卡片
         
         seen_in_page = set()
+        unchanged_in_page = 0
         for item in items:
-            # 提取详情链接
-            detail_link = item.css('a[href*="/down/view/"]::attr(href)').get()
+            # 提取详情链接（规则见 eyeuc/extraction.py）
+            detail_link = self.extractor.extract('list', 'card_href', item.root)
             if not detail_link:
                 continue
             
@@ -215,127 +819,153 @@ class EyeucModsSpider(scrapy.Spider):
                 continue
             seen_in_page.add(full_url)
             
+            mid_match = re.search(r'/down/view/(\d+)', full_url)
+            card_mid = mid_match.group(1) if mid_match else None
+            
+            # 恢复模式：本 job 已输出过的 mid 不再抓取
+            if self.frontier is not None and card_mid and self.frontier.is_completed(card_mid):
+                self.stats_counter['resume_skipped'] += 1
+                continue
+            
+            # 增量模式：卡片指纹未变化的 mid 直接跳过详情抓取
+            fingerprint = None
+            if self.state_store is not None:
+                fingerprint = item.fingerprint()
+                if card_mid and self.state_store.is_unchanged(card_mid, fingerprint):
+                    unchanged_in_page += 1
+                    continue
+            
+            # 跨页/跨分片去重：mid 已被登记（本进程其他页或其他分片）时跳过
+            if card_mid and not self.mid_registry.claim(card_mid):
+                self.stats_counter['registry_skipped'] += 1
+                self.crawler.stats.inc_value('mid_registry/duplicates')
+                continue
+            
             # 提取封面图：从 .modpic img 的 data-original 属性
             cover_image = ''
-            img_url = item.css('.modpic img::attr(data-original)').get()
+            img_url = self.extractor.extract('list', 'card_cover', item.root)
             if img_url and not img_url.startswith('data:image'):
                 # 去掉缩略图后缀 /fw_285
                 img_url = re.sub(r'/f[wh]_\d+$', '', img_url)
                 cover_image = urljoin(response.url, img_url)
             
-            yield scrapy.Request(
-                url=full_url,
-                callback=self.parse_detail,
-                cookies=self.cookies_dict if self.cookies_dict else None,
-                meta={
-                    'cookiejar': list_id,
-                    'list_id': list_id,
-                    'game_name': game_name,
-                    'list_url': response.url,
-                    'cover_image': cover_image,  # 传递封面图
-                },
-                dont_filter=True,  # 禁用 Scrapy 全局去重（seen_in_page 已做页内去重）
-            )
+            if self.frontier is not None and card_mid:
+                self.frontier.add_pending(card_mid, list_id, page, cover_image)
+            
+            yield self._detail_request(full_url, list_id, game_name, response.url, cover_image, fingerprint)
         
         self.logger.info(f"列表 {list_id} 第 {page} 页找到 {len(seen_in_page)} 个详情链接")
         
-        # 翻页策略：检查是否有下一页（持续翻页直到没有数据或达到 end_page）
-        # 如果当前页有数据，且未达到 end_page，尝试访问下一页
-        if len(seen_in_page) > 0:
-            next_page = page + 1
+        if self.frontier is not None:
+            self.frontier.page_done(list_id, page, game_name)
+        
+        # 增量模式：统计连续"全部未变化"的页数，达到阈值后停止翻页
+        if self.state_store is not None and seen_in_page:
+            self.stats_counter['incremental_skipped'] += unchanged_in_page
+            if unchanged_in_page:
+                self.logger.info(f"列表 {list_id} 第 {page} 页跳过 {unchanged_in_page} 个未变化资源")
             
-            # 检查是否达到 end_page 限制
-            if self.end_page and next_page > self.end_page:
-                self.logger.info(f"列表 {list_id} 已到达 end_page={self.end_page}，停止翻页")
+            if unchanged_in_page == len(seen_in_page):
+                self.unchanged_page_streak[list_id] = self.unchanged_page_streak.get(list_id, 0) + 1
             else:
-                next_url = f"https://bbs.eyeuc.com/down/list/{list_id}/{next_page}"
-                
-                yield scrapy.Request(
-                    url=next_url,
-                    callback=self.parse_list,
-                    cookies=self.cookies_dict if self.cookies_dict else None,
-                    meta={
-                        'cookiejar': list_id,
-                        'list_id': list_id,
-                        'page': next_page,
-                        'game_name': game_name,
-                    },
-                    dont_filter=True,
-                    errback=self.handle_page_error,
+                self.unchanged_page_streak[list_id] = 0
+            
+            if self.unchanged_page_streak[list_id] >= self.incremental_stop_pages:
+                self.logger.info(
+                    f"列表 {list_id} 连续 {self.unchanged_page_streak[list_id]} 页无变化，增量模式停止翻页"
                 )
+                self._mark_list_done(list_id)
+                return
+        
+        # 翻页策略：当前页有数据时并发发出后续页，直到空页/404 或达到 end_page
+        if len(seen_in_page) > 0:
+            yield from self._paginate(page_doc, list_id, page, game_name)
         else:
             # 当前页没有数据，说明已到末页
-            self.logger.info(f"列表 {list_id} 第 {page} 页无数据，已到达末页")
+            self._mark_list_end(list_id, page, "无数据")
+    
+    def _paginate(self, page_doc, list_id, page, game_name):
+        """并发翻页：按分页栏的最大页码，或当前页之后 LIST_PAGE_WINDOW 页的预取窗口，发出尚未请求的列表页"""
+        last_page = self.list_last_page.get(list_id)
+        if last_page is not None and page > last_page:
+            # 末页之后的页仍有数据（网站在抓取期间新增了资源），取消末页标记
+            del self.list_last_page[list_id]
+        
+        if self.end_page and page >= self.end_page:
+            self.logger.info(f"列表 {list_id} 已到达 end_page={self.end_page}，停止翻页")
+            self._mark_list_done(list_id)
+            return
+        
+        # 分页栏给出最大页码时一次发出全部，之后只逐页确认末页；否则使用预取窗口
+        pager_max = self._parse_max_page(page_doc, list_id) if self.list_page_window > 1 else 0
+        target = max(pager_max, page + (1 if pager_max else self.list_page_window))
+        if self.end_page:
+            target = min(target, self.end_page)
+        # 已确认末页时，末页之前的页不再向末页之后预取
+        last_page = self.list_last_page.get(list_id)
+        if last_page is not None:
+            target = min(target, last_page)
+        
+        issued = max(self.list_pages_issued.get(list_id, page), page)
+        if target <= issued:
+            return
+        self.list_pages_issued[list_id] = target
+        
+        if target - issued > 1:
+            self.logger.info(f"列表 {list_id} 并发发出第 {issued + 1}-{target} 页（分页栏最大页码 {pager_max or '未知'}）")
+        for next_page in range(issued + 1, target + 1):
+            yield self._list_request(list_id, next_page, game_name)
+    
+    def _parse_max_page(self, page_doc, list_id):
+        """分页栏中的最大页码（没有分页栏时返回 0）"""
+        pattern = re.compile(rf'/down/list/{list_id}/(\d+)')
+        pages = [int(p) for href in page_doc.link_hrefs() for p in pattern.findall(href)]
+        return max(pages, default=0)
+    
+    def _mark_list_end(self, list_id, page, reason):
+        """第 page 页为空或不存在：记录末页（预取窗口中的其余空页只更新末页，不重复记录）"""
+        last_page = self.list_last_page.get(list_id)
+        if last_page is not None:
+            self.list_last_page[list_id] = min(last_page, page - 1)
+            self.logger.debug(f"列表 {list_id} 第 {page} 页{reason}（末页为第 {self.list_last_page[list_id]} 页）")
+            return
+        self.list_last_page[list_id] = page - 1
+        self.logger.info(f"列表 {list_id} 第 {page} 页{reason}，已到达末页")
+        self._mark_list_done(list_id)
     
     def handle_page_error(self, failure):
         """处理分页请求错误（如 404）"""
         request = failure.request
         list_id = request.meta.get('list_id')
         page = request.meta.get('page')
-        self.logger.info(f"列表 {list_id} 第 {page} 页不存在（404），已到达末页")
+        self._mark_list_end(list_id, page, "不存在（404）")
+    
+    def _mark_list_done(self, list_id):
+        """恢复模式：记录列表已抓取到末页"""
+        if self.frontier is not None:
+            self.frontier.list_done(list_id)
     
-    def _extract_category(self, response):
+    def _extract_category(self, doc, response):
         """
         从 meta keywords 提取分类：NBA2K25资源下载,NBA2K25照片,巅峰马刺卡
-        提取包含分类的关键词（照片/工具/名单等）
+        提取包含分类的关键词（照片/工具/名单等），兜底从 title 提取
         """
-        # 方法 1: 从 meta keywords 提取
-        keywords = response.css('meta[name="keywords"]::attr(content)').get()
-        if keywords:
-            # 尝试匹配：NBA2K25照片、NBA2K25工具、NBA2K25名单 等
-            pattern = r'NBA\s*2K\s*\d{2,4}\s*([^,，\s]+)'
-            match = re.search(pattern, keywords, re.IGNORECASE)
-            if match:
-                category = match.group(1)
-                # 过滤掉"资源下载"等非分类词
-                if category not in ['资源下载', '资源', '下载', 'mods']:
-                    self.logger.debug(f"提取到分类: {category} (来源: keywords)")
-                    return category
-        
-        # 方法 2: 从 title 提取（格式：xxxx_NBA2K25照片 - EYE资源中心）
-        title = response.css('title::text').get()
-        if title:
-            pattern = r'_NBA\s*2K\s*\d{2,4}\s*([^_\-\s]+)'
-            match = re.search(pattern, title, re.IGNORECASE)
-            if match:
-                category = match.group(1)
-                self.logger.debug(f"提取到分类: {category} (来源: title)")
-                return category
-        
-        self.logger.warning(f"未提取到分类，URL: {response.url}")
-        return None
+        # 规则见 eyeuc/extraction.py（keywords > title）
+        category = self.extractor.extract('detail', 'category', doc.root)
+        if not category:
+            self.logger.warning(f"未提取到分类，URL: {response.url}")
+        return category
     
-    def _guess_game_name(self, response, list_id):
+    def _guess_game_name(self, page_doc, list_id):
         """
         从 H1/title/面包屑聚合文本，用正则归一化游戏名
         优先级：正则提取 > 静态映射 > list_{id}
         """
-        # 聚合文本信号
-        texts = []
-        
-        # H1
-        h1_text = response.css('h1::text').get()
-        if h1_text:
-            texts.append(h1_text.strip())
-        
-        # Title
-        title_text = response.css('title::text').get()
-        if title_text:
-            texts.append(title_text.strip())
-        
-        # 面包屑
-        breadcrumb_texts = response.css('.crumb *::text, .breadcrumb *::text').getall()
-        texts.extend([t.strip() for t in breadcrumb_texts if t.strip()])
-        
-        # 正则提取 NBA 2K 系列
-        pattern = r'(NBA\s*2K\s*\d{2,4})'
-        for text in texts:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                # 归一化：统一大写和空格
-                game = match.group(1).upper()
-                game = re.sub(r'\s+', ' ', game)  # 多个空格变一个
-                return game
+        # 正则提取 NBA 2K 系列（规则见 eyeuc/extraction.py）
+        game = self.extractor.extract('list', 'game_name', page_doc.root)
+        if game:
+            # 归一化：统一大写和空格
+            return re.sub(r'\s+', ' ', game.upper())
         
         # 回退到静态映射
         if list_id in self.GAME_NAME_MAP:
@@ -351,56 +981,89 @@ class EyeucModsSpider(scrapy.Spider):
         list_url = response.meta['list_url']
         cover_image = response.meta.get('cover_image', '')  # 从列表页传递过来
         
+        doc = self.parser.detail_page(response)
+        
         # 1. 标题：从 H1 提取
-        title = self._extract_title(response)
+        title = self._extract_title(doc)
         
         # 2. 分类：从面包屑提取（资源中心 > NBA2K25 > 照片）
-        category = self._extract_category(response)
+        category = self._extract_category(doc, response)
         
         # 3. 正文图片：去掉缩略图后缀获取大图
-        images = self._extract_images(response)
+        images = self._extract_images(doc, response)
         
         # 4. 简介：从资源简介区提取（Markdown 格式返回 HTML，纯文本格式返回文本）
-        intro = self._extract_intro(response)
+        intro = self._extract_intro(doc)
         
         # 5. 提取元数据（作者、发布者、时间、统计等）
-        metadata = self._extract_metadata(response)
+        metadata = self._extract_metadata(doc, response)
         
         # 5. 提取 mid/vid 和 formhash（用于直链提取）
-        mid, vid, formhash = self._extract_resource_ids(response)
+        mid, vid, formhash = self._extract_resource_ids(doc)
         
         # 6. 获取所有分支版本
         if mid:
-            # 请求 toversion 获取所有分支
-            version_url = f'https://bbs.eyeuc.com/down.php?mod=view&mid={mid}&show=toversion'
-            
-            yield scrapy.Request(
-                url=version_url,
-                callback=self.parse_versions,
-                cookies=self.cookies_dict if self.cookies_dict else None,
-                headers={'X-Requested-With': 'XMLHttpRequest'},
-                meta={
-                    'cookiejar': list_id,
+            # 详情数据只在组装器中保存一份，后续请求只携带 mid
+            self.assembler.start(
+                mid,
+                {
+                    'mid': mid,
                     'list_id': list_id,
                     'game': game_name,
                     'category': category,  # 分类
                     'title': title,
                     'cover_image': cover_image,
                     'images': images,
-                    'intro': intro,
+                    'intro': intro,  # 资源主描述（Markdown HTML 或纯文本）
                     'metadata': metadata,  # 元数据（作者、时间、统计等）
                     'detail_url': response.url,
                     'list_url': list_url,
-                    'mid': mid,
+                },
+                context={
                     'default_vid': vid,  # 默认分支的 vid
                     'formhash': formhash,
-                    'versions_data': [],  # 用于收集所有分支数据
+                    'card_fingerprint': response.meta.get('card_fingerprint'),
+                    'detail_key': BranchCache.detail_key(metadata, vid),
+                    'session': response.meta.get('session'),  # 分支请求沿用详情页的账号
+                },
+            )
+            
+            # 详情页的更新时间和默认 vid 与上次一致：分支列表未变化，跳过 toversion
+            if self.branch_cache is not None:
+                versions = self.branch_cache.versions(mid, self.assembler.context(mid)['detail_key'])
+                if versions is not None:
+                    self.stats_counter['toversion_skipped'] += 1
+                    self.crawler.stats.inc_value('branch_cache/toversion_skipped')
+                    yield from self._schedule_branches(mid, list_id, versions)
+                    yield from self._check_pending()
+                    return
+            
+            # 请求 toversion 获取所有分支
+            version_url = f'{self.site_url}/down.php?mod=view&mid={mid}&show=toversion'
+            
+            yield scrapy.Request(
+                url=version_url,
+                callback=self.parse_versions,
+                cookies=self.cookies_dict if self.cookies_dict else None,
+                headers={'X-Requested-With': 'XMLHttpRequest'},
+                meta={
+                    'cookiejar': list_id,
+                    'list_id': list_id,
+                    'mid': mid,
+                    'session': response.meta.get('session'),
                 },
                 dont_filter=True,
             )
+            
+            yield from self._check_pending()
         else:
             # 无法获取 mid：使用旧方法兜底
-            downloads = self._extract_downloads(response)
+            downloads = self._extract_downloads(doc, response)
+            
+            mid_match = re.search(r'/down/view/(\d+)', response.url)
+            if mid_match:
+                self._record_mod_state(mid_match.group(1), list_id,
+                                       response.meta.get('card_fingerprint'), metadata)
             
             # 返回完整字段
             yield {
@@ -417,58 +1080,37 @@ class EyeucModsSpider(scrapy.Spider):
                 'list_url': list_url,
             }
     
-    def _extract_title(self, response):
+    def _extract_title(self, doc):
         """提取标题：H1 优先"""
-        # H1 通常格式：作者 / 标题 / 版本
-        h1_text = response.css('h1#title ::text').getall()
-        if h1_text:
-            # 合并所有文本，去除多余空白
-            title = ''.join(h1_text).strip()
-            return title
-        
-        # 兜底：从 title 标签提取
-        page_title = response.css('title::text').get(default='')
-        if page_title:
-            # 移除后缀 " - EYE资源中心"
-            title = page_title.replace(' - EYE资源中心', '').strip()
-            return title
-        
-        return ''
-    
-    def _extract_images(self, response):
+        # H1 通常格式：作者 / 标题 / 版本；兜底从 title 标签提取（规则见 eyeuc/extraction.py）
+        return self.extractor.extract('detail', 'title', doc.root, default='')
+    
+    def _extract_images(self, doc, response):
         """提取正文图片：去掉缩略图后缀获取大图"""
         images = []
         seen = set()
         
-        # 从多个可能的区域提取图片
-        img_selectors = [
-            '#imglist img::attr(data-original)',
-            '#imglist img::attr(src)',
-            '.view-message img::attr(src)',
-            '.view-message img::attr(data-original)',
-        ]
-        
-        for selector in img_selectors:
-            img_urls = response.css(selector).getall()
-            for img_url in img_urls:
-                if not img_url or img_url.endswith('loading_blue.gif'):
-                    continue
-                
-                # 过滤小图标
-                if self._is_small_icon(img_url):
-                    continue
-                
-                # 转换为绝对 URL
-                abs_url = urljoin(response.url, img_url)
-                
-                # 去掉缩略图后缀，获取大图
-                # 例如：/fh_140 → 原图
-                abs_url = re.sub(r'/f[wh]_\d+$', '', abs_url)
-                
-                # 去重
-                if abs_url not in seen:
-                    seen.add(abs_url)
-                    images.append(abs_url)
+        # 从多个可能的区域提取图片（#imglist 的 data-original/src，.view-message 的 src/data-original，
+        # 规则见 eyeuc/extraction.py）
+        for img_url in self.extractor.extract('detail', 'images', doc.root, default=[]):
+            if img_url.endswith('loading_blue.gif'):
+                continue
+            
+            # 过滤小图标
+            if self._is_small_icon(img_url):
+                continue
+            
+            # 转换为绝对 URL
+            abs_url = urljoin(response.url, img_url)
+            
+            # 去掉缩略图后缀，获取大图
+            # 例如：/fh_140 → 原图
+            abs_url = re.sub(r'/f[wh]_\d+$', '', abs_url)
+            
+            # 去重
+            if abs_url not in seen:
+                seen.add(abs_url)
+                images.append(abs_url)
         
         return images
     
@@ -486,33 +1128,15 @@ class EyeucModsSpider(scrapy.Spider):
         img_lower = img_url.lower()
         return any(pattern in img_lower for pattern in small_patterns)
     
-    def _extract_intro(self, response):
+    def _extract_intro(self, doc):
         """提取简介：资源简介区（统一返回 HTML 格式，保留结构）
         
         Returns:
             str: 返回 HTML 字符串（Markdown 或普通 HTML，保留换行、链接等结构）
         """
-        # 检查是否有 markdown-body（Markdown 格式）
-        markdown_body = response.css('.view-message .markdown-body')
-        if markdown_body:
-            # Markdown 格式：返回 markdown-body 的完整 HTML
-            html_content = markdown_body.get()
-            if html_content:
-                # 清理 script 标签
-                html_content = re.sub(r'<script[^>]*>.*?</script>', '', html_content, flags=re.DOTALL | re.IGNORECASE)
-                return html_content.strip()
-        
-        # 纯文本格式：返回整个 view-message 的 HTML（保留 <br>、<a> 等标签）
-        view_message = response.css('.view-message').get()
-        if view_message:
-            # 清理 script 标签和多余空白
-            view_message = re.sub(r'<script[^>]*>.*?</script>', '', view_message, flags=re.DOTALL | re.IGNORECASE)
-            # 去掉外层 div 的多余换行和空格
-            view_message = re.sub(r'>\s+', '>', view_message)
-            view_message = re.sub(r'\s+<', '<', view_message)
-            return view_message.strip()
-        
-        return ''
+        # Markdown 格式返回 markdown-body 的完整 HTML，纯文本格式返回整个 view-message 的 HTML
+        # （保留 <br>、<a> 等标签；清理 script 标签和多余空白，规则见 eyeuc/extraction.py）
+        return self.extractor.extract('detail', 'intro', doc.root, default='')
     
     def _parse_relative_time(self, time_str):
         """
@@ -591,15 +1215,14 @@ class EyeucModsSpider(scrapy.Spider):
             self.logger.error(f"解析相对时间出错 '{time_str}': {e}")
             return None
     
-    def _extract_metadata(self, response):
+    def _extract_metadata(self, doc, response):
         """提取资源元数据（作者、发布者、时间、统计等）"""
         metadata = {}
         
-        # 1. 提取统计数据（查看、下载、喜欢）
-        stats = response.css('.top-right-info span')
-        for stat in stats:
-            icon_text = stat.css('a::text').get()
-            count = stat.css('em::text').get()
+        # 1. 提取统计数据（查看、下载、喜欢；规则见 eyeuc/extraction.py）
+        for stat in self.extractor.extract('detail', 'stats', doc.root, default=[]):
+            icon_text = stat['label']
+            count = stat['count']
             
             if icon_text and count:
                 icon_text = icon_text.strip()
@@ -611,19 +1234,18 @@ class EyeucModsSpider(scrapy.Spider):
                     metadata['likes'] = count
         
         # 2. 提取详细信息（时间、作者等）
-        info_items = response.css('.uploadinfo ul li')
-        for item in info_items:
-            label = item.css('p.custom-tt::text').get()
+        for item in self.extractor.extract('detail', 'upload_info', doc.root, default=[]):
+            label = item['label']
             if label:
                 label = label.strip()
                 
                 if '当前版本最后更新' in label:
                     # 优先获取绝对时间（title 属性），否则解析相对时间
-                    time_span = item.css('span::attr(title)').get()
-                    time_text = item.css('span::text').get()
+                    time_span = item['span_title']
+                    time_text = item['span_text']
                     # 如果没有 span，直接从 p 标签获取文本
                     if not time_text:
-                        time_text = item.css('p:not(.custom-tt)::text').get()
+                        time_text = item['p_text']
                     
                     if time_span:
                         metadata['current_version_updated'] = time_span
@@ -632,11 +1254,11 @@ class EyeucModsSpider(scrapy.Spider):
                         metadata['current_version_updated'] = parsed_time if parsed_time else time_text.strip()
                     
                 elif '最后更新时间' in label:
-                    time_span = item.css('span::attr(title)').get()
-                    time_text = item.css('span::text').get()
+                    time_span = item['span_title']
+                    time_text = item['span_text']
                     # 如果没有 span，直接从 p 标签获取文本
                     if not time_text:
-                        time_text = item.css('p:not(.custom-tt)::text').get()
+                        time_text = item['p_text']
                     
                     if time_span:
                         metadata['last_updated'] = time_span
@@ -646,11 +1268,11 @@ class EyeucModsSpider(scrapy.Spider):
                     
                 elif '资源创建时间' in label:
                     # 优先获取绝对时间（title 属性），否则解析相对时间
-                    time_span = item.css('span::attr(title)').get()
-                    time_text = item.css('span::text').get()
+                    time_span = item['span_title']
+                    time_text = item['span_text']
                     # 如果没有 span，直接从 p 标签获取文本
                     if not time_text:
-                        time_text = item.css('p:not(.custom-tt)::text').get()
+                        time_text = item['p_text']
                     
                     if time_span:
                         metadata['created_at'] = time_span
@@ -659,16 +1281,16 @@ class EyeucModsSpider(scrapy.Spider):
                         metadata['created_at'] = parsed_time if parsed_time else time_text.strip()
                         
                 elif '资源作者' in label:
-                    author_name = item.css('a::text').get()
-                    author_link = item.css('a::attr(href)').get()
+                    author_name = item['a_text']
+                    author_link = item['a_href']
                     if author_name:
                         metadata['author'] = author_name.strip()
                     if author_link:
                         metadata['author_url'] = response.urljoin(author_link)
                         
                 elif '资源发布者' in label:
-                    publisher_name = item.css('a::text').get()
-                    publisher_link = item.css('a::attr(href)').get()
+                    publisher_name = item['a_text']
+                    publisher_link = item['a_href']
                     if publisher_name:
                         metadata['publisher'] = publisher_name.strip()
                     if publisher_link:
@@ -677,37 +1299,22 @@ class EyeucModsSpider(scrapy.Spider):
         return metadata
     
     
-    def _extract_resource_ids(self, response):
+    def _extract_resource_ids(self, doc):
         """提取 mid/vid/formhash（用于直链提取）"""
-        mid = vid = formhash = None
-        
         # 从 JS 变量中提取：var _data = {"mid": "31047", "vid": "46111", "formhash": "98e0550f",...}
-        script_text = response.css('script:contains("var _data")::text').get()
-        if script_text:
-            mid_match = re.search(r'"mid":\s*"(\d+)"', script_text)
-            vid_match = re.search(r'"vid":\s*"(\d+)"', script_text)
-            hash_match = re.search(r'"formhash":\s*"([a-f0-9]+)"', script_text)
-            
-            if mid_match:
-                mid = mid_match.group(1)
-            if vid_match:
-                vid = vid_match.group(1)
-            if hash_match:
-                formhash = hash_match.group(1)
-        
-        return mid, vid, formhash
+        return tuple(self.extractor.extract('detail', name, doc.root) for name in ('mid', 'vid', 'formhash'))
     
-    def _extract_downloads(self, response):
+    def _extract_downloads(self, doc, response):
         """提取下载链接：从 JS 变量和正文中提取（旧方法，兜底用）"""
         downloads = []
         seen = set()
         
         # 1. 从页面 JS 变量中提取资源 ID，构造下载页面 URL
-        mid, vid, _ = self._extract_resource_ids(response)
+        mid, vid, _ = self._extract_resource_ids(doc)
         
         if mid and vid:
             # 构造下载页面 URL
-            download_page_url = f"https://bbs.eyeuc.com/down/view/{mid}/{vid}"
+            download_page_url = f"{self.site_url}/down/view/{mid}/{vid}"
             downloads.append({
                 'type': 'page',
                 'url': download_page_url,
@@ -717,7 +1324,7 @@ class EyeucModsSpider(scrapy.Spider):
             seen.add(download_page_url)
         
         # 2. 从正文中提取外链
-        content_links = response.css('.view-message a::attr(href)').getall()
+        content_links = self.extractor.extract('detail', 'content_links', doc.root, default=[])
         
         # 下载链接白名单
         download_patterns = [
@@ -733,9 +1340,6 @@ class EyeucModsSpider(scrapy.Spider):
         ]
         
         for link in content_links:
-            if not link:
-                continue
-            
             # 转换为绝对 URL
             abs_link = urljoin(response.url, link)
             
@@ -755,9 +1359,12 @@ class EyeucModsSpider(scrapy.Spider):
     
     def parse_versions(self, response):
         """解析所有分支版本列表"""
-        meta = response.meta
-        mid = meta['mid']
-        default_vid = meta['default_vid']
+        mid = response.meta['mid']
+        list_id = response.meta['list_id']
+        if mid not in self.assembler:
+            self.logger.warning(f"mid={mid} 已作为 partial item 输出，忽略迟到的分支列表")
+            return
+        default_vid = self.assembler.context(mid).get('default_vid')
         
         html_content = response.text
         
@@ -767,93 +1374,101 @@ class EyeucModsSpider(scrapy.Spider):
             html_content = cdata_match.group(1)
         
         # 提取所有版本信息
-        selector = scrapy.Selector(text=html_content)
-        verlist_items = selector.css('div.verlist')
-        
         versions = []
-        for item in verlist_items:
-            h4 = item.css('h4')
-            if h4:
-                a_tag = h4.css('a')
-                if a_tag:
-                    href = a_tag.css('::attr(href)').get()
-                    version_text = a_tag.css('::text').get()
-                    
-                    if version_text and href:
-                        version_name = version_text.strip()
-                        is_default = '默认分支' in a_tag.get()
-                        
-                        # 提取 vid
-                        vid_match = re.search(r'/down/view/\d+/(\d+)', href)
-                        
-                        # 提取分支描述（在同一个 verlist 项中的 verlist-note）
-                        note_div = item.css('div.verlist-note::text').get()
-                        version_intro = note_div.strip() if note_div else ''
-                        
-                        # 提取分支统计信息（时间、查看数、下载数）
-                        version_stats = {}
-                        info_items = item.css('div.verlist-info em')
-                        for info_em in info_items:
-                            # 检查图标类型
-                            icon = info_em.css('i.iconfont::text').get()
-                            if icon:
-                                # &#xe67d; = 时间图标
-                                # &#xe636; = 查看图标  
-                                # &#xe893; = 下载图标
-                                if '&#xe67d;' in icon or '\ue67d' in icon:
-                                    # 时间：优先获取绝对时间（title），否则获取相对时间
-                                    time_absolute = info_em.css('span::attr(title)').get()
-                                    time_relative = info_em.css('span::text').get()
-                                    time_text = info_em.css('::text').getall()  # 没有span的情况
-                                    if time_absolute:
-                                        version_stats['updated_at'] = time_absolute
-                                    elif time_relative:
-                                        version_stats['updated_at'] = time_relative.strip()
-                                    elif time_text:
-                                        # 去掉图标字符
-                                        version_stats['updated_at'] = ''.join([t.strip() for t in time_text if t.strip() and '\ue67d' not in t])
-                                        
-                                elif '&#xe636;' in icon or '\ue636' in icon:
-                                    # 查看数
-                                    views = info_em.css('span::text').get()
-                                    if views:
-                                        version_stats['views'] = views.strip()
-                                        
-                                elif '&#xe893;' in icon or '\ue893' in icon:
-                                    # 下载数
-                                    downloads = info_em.css('span::text').get()
-                                    if downloads:
-                                        version_stats['downloads'] = downloads.strip()
-                        
-                        if vid_match:
-                            vid = vid_match.group(1)
-                            versions.append({
-                                'vid': vid,
-                                'name': version_name,
-                                'is_default': is_default,
-                                'intro': version_intro,  # 直接从版本列表获取描述
-                                'stats': version_stats,  # 分支统计信息
-                            })
+        for entry in self.parser.version_entries(html_content):
+            if not entry['has_link']:
+                continue
+            href = entry['href']
+            version_text = entry['text']
+            
+            if version_text and href:
+                version_name = version_text.strip()
+                is_default = '默认分支' in entry['a_html']
+                
+                # 提取 vid
+                vid_match = re.search(r'/down/view/\d+/(\d+)', href)
+                
+                # 提取分支描述（在同一个 verlist 项中的 verlist-note）
+                note_div = entry['note']
+                version_intro = note_div.strip() if note_div else ''
+                
+                # 提取分支统计信息（时间、查看数、下载数）
+                version_stats = {}
+                for info_em in entry['info']:
+                    # 检查图标类型
+                    icon = info_em['icon']
+                    if icon:
+                        # &#xe67d; = 时间图标
+                        # &#xe636; = 查看图标  
+                        # &#xe893; = 下载图标
+                        if '&#xe67d;' in icon or '\ue67d' in icon:
+                            # 时间：优先获取绝对时间（title），否则获取相对时间
+                            time_absolute = info_em['span_title']
+                            time_relative = info_em['span_text']
+                            time_text = info_em['texts']  # 没有span的情况
+                            if time_absolute:
+                                version_stats['updated_at'] = time_absolute
+                            elif time_relative:
+                                version_stats['updated_at'] = time_relative.strip()
+                            elif time_text:
+                                # 去掉图标字符
+                                version_stats['updated_at'] = ''.join([t.strip() for t in time_text if t.strip() and '\ue67d' not in t])
+                                
+                        elif '&#xe636;' in icon or '\ue636' in icon:
+                            # 查看数
+                            views = info_em['span_text']
+                            if views:
+                                version_stats['views'] = views.strip()
+                                
+                        elif '&#xe893;' in icon or '\ue893' in icon:
+                            # 下载数
+                            downloads = info_em['span_text']
+                            if downloads:
+                                version_stats['downloads'] = downloads.strip()
+                
+                if vid_match:
+                    vid = vid_match.group(1)
+                    versions.append({
+                        'vid': vid,
+                        'name': version_name,
+                        'is_default': is_default,
+                        'intro': version_intro,  # 直接从版本列表获取描述
+                        'stats': version_stats,  # 分支统计信息
+                    })
         
         if not versions:
             # 没有找到分支，使用默认 vid
             self.logger.warning(f"未找到分支列表（mid={mid}），使用默认 vid={default_vid}")
             versions = [{'vid': default_vid, 'name': 'Default', 'is_default': True}]
+        elif self.branch_cache is not None:
+            self.branch_cache.save_versions(mid, self.assembler.context(mid).get('detail_key'), versions)
         
         self.logger.info(f"找到 {len(versions)} 个分支（mid={mid}）")
         
-        # 为每个分支发起请求获取下载文件
-        meta['total_versions'] = len(versions)
-        meta['current_version_index'] = 0
+        yield from self._schedule_branches(mid, list_id, versions)
+        yield from self._check_pending()
+    
+    def _schedule_branches(self, mid, list_id, versions):
+        """登记分支列表，为每个分支请求 todownload（分支未更新且有缓存时直接使用缓存）"""
+        # 分支信息登记到组装器，请求只携带 mid / vid / 分支序号
+        self.assembler.set_versions(mid, versions)
+        
+        session = self.assembler.context(mid).get('session')
         
+        # 为每个分支发起请求获取下载文件
         for idx, ver in enumerate(versions):
             vid = ver['vid']
-            vname = ver['name']
-            version_intro = ver.get('intro', '')
-            version_stats = ver.get('stats', {})
+            
+            if self.branch_cache is not None:
+                cached = self.branch_cache.branch(mid, vid, (ver.get('stats') or {}).get('updated_at'))
+                if cached is not None:
+                    self.stats_counter['todownload_skipped'] += 1
+                    self.crawler.stats.inc_value('branch_cache/todownload_skipped')
+                    yield from self._add_branch(mid, idx, self._version_data(ver, cached['intro'], cached['downloads']))
+                    continue
             
             # 直接请求下载文件列表（不需要再请求 message 接口）
-            ajax_url = f'https://bbs.eyeuc.com/down.php?mod=view&mid={mid}&vid={vid}&show=todownload'
+            ajax_url = f'{self.site_url}/down.php?mod=view&mid={mid}&vid={vid}&show=todownload'
             
             yield scrapy.Request(
                 url=ajax_url,
@@ -861,62 +1476,57 @@ class EyeucModsSpider(scrapy.Spider):
                 cookies=self.cookies_dict if self.cookies_dict else None,
                 headers={'X-Requested-With': 'XMLHttpRequest'},
                 meta={
-                    **meta,
+                    'cookiejar': list_id,
+                    'list_id': list_id,
+                    'mid': mid,
                     'version_vid': vid,
-                    'version_name': vname,
-                    'version_is_default': ver['is_default'],
-                    'version_intro': version_intro,  # 已经从版本列表中提取
-                    'version_stats': version_stats,  # 分支统计信息
                     'version_index': idx,
+                    'session': session,
                 },
                 dont_filter=True,
             )
     
     def parse_download_ajax(self, response):
         """解析 AJAX 下载接口，提取文件列表元数据（mid/vid/fileid/filename/size）"""
-        # 从 meta 恢复数据
+        # 从组装器恢复详情数据（meta 只携带 mid / vid / 分支序号）
         meta = response.meta
-        list_id = meta['list_id']
-        game = meta['game']
-        title = meta['title']
-        cover_image = meta['cover_image']
-        images = meta['images']
-        intro = meta.get('intro', '')
-        metadata = meta.get('metadata', {})
-        detail_url = meta['detail_url']
-        list_url = meta['list_url']
         mid = meta['mid']
+        payload = self.assembler.payload(mid)
+        if payload is None:
+            self.logger.warning(f"未找到 mid={mid} 的详情数据（可能已输出），跳过分支 {meta.get('version_vid')}")
+            return
+        context = self.assembler.context(mid)
+        
+        list_id = payload['list_id']
+        game = payload['game']
+        title = payload['title']
+        cover_image = payload['cover_image']
+        images = payload['images']
+        intro = payload.get('intro', '')
+        metadata = payload.get('metadata', {})
+        detail_url = payload['detail_url']
+        list_url = payload['list_url']
         
         # 多分支模式的字段
         vid = meta.get('version_vid')  # 当前分支的 vid
-        version_name = meta.get('version_name', '')
-        version_intro = meta.get('version_intro', '')
-        version_stats = meta.get('version_stats', {})
-        version_is_default = meta.get('version_is_default', False)
         version_index = meta.get('version_index', 0)
-        total_versions = meta.get('total_versions', 1)
+        ver = self.assembler.version(mid, version_index)
+        version_intro = ver.get('intro', '')
+        version_stats = ver.get('stats', {})
         
-        formhash = meta.get('formhash')
-        
-        # 解析返回的 AJAX HTML 片段
-        html_content = response.text
+        formhash = context.get('formhash')
         
-        # 提取 CDATA 内容
-        cdata_match = re.search(r'<!\[CDATA\[(.*?)\]\]>', html_content, re.DOTALL)
-        if cdata_match:
-            html_content = cdata_match.group(1)
+        # 单次扫描解析 AJAX HTML 片段（CDATA 内的版本名、分支描述、下载项）
+        fragment = parse_todownload(response.text)
+        if self.todownload_record_dir is not None:
+            (self.todownload_record_dir / f'{mid}_{vid}.xml').write_text(response.text, encoding='utf-8')
         
         # 提取完整的分支描述（从 veritem-content 中，保留原始 HTML 格式）
-        # 使用灵活的正则：有些页面在 veritem-content 的 </div> 后还有额外的 </div>
-        veritem_content_match = re.search(r'<div class="veritem-content">(.*?)</div>(?:\s*</div>)?\s*<div class="veritem-footer">', html_content, re.DOTALL)
-        if veritem_content_match:
-            content_area = veritem_content_match.group(1).strip()
-            selector = scrapy.Selector(text=content_area)
-            
+        content_area = fragment.content_html
+        if content_area is not None:
             # 优先尝试 Markdown 格式（返回 HTML）
-            markdown_body = selector.css('div.markdown-body')
-            if markdown_body:
-                html_intro = markdown_body.get()
+            html_intro = self.parser.fragment_markdown_html(content_area)
+            if html_intro is not None:
                 if html_intro:
                     # 清理 script 标签
                     html_intro = re.sub(r'<script[^>]*>.*?</script>', '', html_intro, flags=re.DOTALL | re.IGNORECASE)
@@ -930,253 +1540,72 @@ class EyeucModsSpider(scrapy.Spider):
                 if cleaned_html.strip():
                     version_intro = cleaned_html.strip()
         
-        # 提取版本名（在 veritem-name 中，格式：<span>V1.1</span> 或 <span>现役/复古</span>）
-        version = ''
-        version_span = re.search(r'<div class="veritem-name">.*?<span>([^<]+)</span>', html_content, re.DOTALL)
-        if version_span:
-            version = version_span.group(1).strip()
-        
-        # 检查是否为"暂无文件"
-        if '暂无文件' in html_content or '当前分支版本暂无文件' in html_content:
+        # 每个下载项一条记录（站内附件 / 外链 / 论坛跳转），字段只取自该下载项本身
+        downloads = download_entries(fragment, mid, vid, self.site_url)
+        kinds = {d['type'] for d in downloads}
+        if kinds == {'empty'}:
             self.logger.warning(f"资源暂无文件（mid={mid}, vid={vid}）")
-            downloads = [{
-                'type': 'empty',
-                'mid': mid,
-                'vid': vid,
-                'version': version,
-                'note': '当前版本暂无文件',
-            }]
+        elif kinds == {'unknown'}:
+            self.logger.warning(f"AJAX 返回无文件列表（mid={mid}, vid={vid}）")
         else:
-            # 解析文件列表
-            file_pattern = r'showprotocol\([\'"]([^\'"]+)[\'"]'
-            file_matches = re.findall(file_pattern, html_content)
-            
-            # 提取文件名（从 <em class="bupload"> 中，包含完整文件名）
-            # 匹配 &nbsp; 之后的完整文件名（可能包含空格）
-            filename_pattern = r'<em[^>]*class="bupload"[^>]*>.*?&nbsp;([^<]+?\.(?:iff|rar|zip|7z|png|jpg))</em>'
-            filename_matches = re.findall(filename_pattern, html_content, re.IGNORECASE)
-            
-            # 如果没有找到带扩展名的文件名，尝试提取纯文本文件名
-            if not filename_matches:
-                text_filename_pattern = r'<em[^>]*class="bupload"[^>]*>.*?&nbsp;([^<]+)</em>'
-                text_matches = re.findall(text_filename_pattern, html_content)
-                if text_matches:
-                    filename_matches = text_matches  # 直接使用字符串列表
-            
-            # 检查是否有需要登录的外链/重定向链接（onclick 包含 showWindow('login')）
-            login_required_count = html_content.count("showWindow('login'")
-            download_item_count = html_content.count('veritem-download-item')
-            
-            # 如果所有下载项都需要登录（没有真实的 showprotocol）
-            if download_item_count > 0 and login_required_count >= download_item_count and not file_matches:
-                self.logger.info(f"资源包含外链/重定向（mid={mid}, vid={vid}, items={download_item_count}）")
-                # 提取外链名称（如 "MediaFire", "百度云", "虚拟爵士试用" 等）
-                external_link_pattern = r'<em[^>]*class="bupload"[^>]*>.*?&nbsp;([^<]+)</em>'
-                external_names = re.findall(external_link_pattern, html_content)
-                
-                downloads = []
-                for name in external_names:
-                    name_clean = name.strip()
-                    # 判断是论坛链接还是外部网盘
-                    if any(kw in name_clean.lower() for kw in ['试用', '链接', '地址', '下载']):
-                        link_type = 'forum_redirect'
-                        note = '跳转到论坛帖子（需登录查看）'
-                    elif any(kw in name_clean.lower() for kw in ['baidu', '百度', 'mediafire', 'mega', 'onedrive', '网盘']):
-                        link_type = 'external'
-                        note = f'外部网盘（{name_clean}）'
-                    else:
-                        link_type = 'external'
-                        note = '外部链接或网盘'
-                    
-                    downloads.append({
-                        'type': link_type,
-                        'mid': mid,
-                        'vid': vid,
-                        'name': name_clean,
-                        'version': version,
-                        'note': note,
-                    })
-                
-                # 返回 item
-                yield {
-                    'mid': mid,
-                    'list_id': list_id,
-                    'game': game,
-                    'category': response.meta.get('category'),  # 分类
-                    'title': title,
-                    'cover_image': cover_image,
-                    'images': images,
-                    'intro': intro,
-                    'downloads': downloads,
-                    'detail_url': detail_url,
-                    'list_url': list_url,
-                }
-                return
-            
-            # 提取文件大小
-            size_pattern = r'<span>(\d+\.?\d*\s*(?:KB|MB|GB))</span>'
-            size_matches = re.findall(size_pattern, html_content, re.IGNORECASE)
-            
-            downloads = []
-            
-            if file_matches:
-                self.logger.info(f"找到 {len(file_matches)} 个下载文件（mid={mid}, vid={vid}, version={version}）")
-                
-                for idx, buy_url in enumerate(file_matches):
-                    # 提取 fileid
-                    fileid_match = re.search(r'fileid=(\d+)', buy_url)
-                    
-                    if fileid_match:
-                        # 站内附件：有 fileid
-                        fileid = fileid_match.group(1)
-                        filename = filename_matches[idx] if idx < len(filename_matches) else f'file_{fileid}'
-                        size = size_matches[idx] if idx < len(size_matches) else ''
-                        
-                        downloads.append({
-                            'type': 'internal',
-                            'mid': mid,
-                            'vid': vid,
-                            'fileid': fileid,
-                            'filename': filename,
-                            'size': size,
-                            'version': version,
-                        })
-                    else:
-                        # 外部链接：没有 fileid，提取链接名称
-                        link_name = filename_matches[idx] if idx < len(filename_matches) else '外部链接'
-                        
-                        # 判断链接类型
-                        link_name_lower = link_name.lower()
-                        if any(kw in link_name_lower for kw in ['baidu', '百度', 'mediafire', 'mega', 'onedrive', '网盘']):
-                            link_type = 'external'
-                            note = f'外部网盘（{link_name}）'
-                        elif any(kw in buy_url for kw in ['/t/', '/thread-']):
-                            link_type = 'forum_redirect'
-                            note = f'论坛帖子（{link_name}）'
-                        else:
-                            link_type = 'external'
-                            note = f'外部链接（{link_name}）'
-                        
-                        downloads.append({
-                            'type': link_type,
-                            'name': link_name,
-                            'url': urljoin('https://bbs.eyeuc.com', buy_url) if buy_url.startswith('/') else buy_url,
-                            'version': version,
-                            'note': note,
-                        })
-            else:
-                # 检查是否有外链（iframe 或纯链接）
-                external_link_pattern = r'<a[^>]+href=["\']([^"\']+)["\'][^>]*>.*?(?:外链|网盘|下载)</a>'
-                external_matches = re.findall(external_link_pattern, html_content, re.IGNORECASE)
-                
-                if external_matches:
-                    self.logger.info(f"找到外链资源（mid={mid}, vid={vid}）")
-                    for ext_url in external_matches:
-                        if not ext_url.startswith('javascript:'):
-                            downloads.append({
-                                'type': 'external',
-                                'url': urljoin('https://bbs.eyeuc.com', ext_url),
-                                'version': version,
-                            })
-                else:
-                    # 真正的空资源或需要特殊权限
-                    self.logger.warning(f"AJAX 返回无文件列表（mid={mid}, vid={vid}）")
-                    downloads.append({
-                        'type': 'unknown',
-                        'mid': mid,
-                        'vid': vid,
-                        'version': version,
-                        'note': '未找到下载链接',
-                    })
-        
-        # 创建当前分支的数据
-        version_data = {
-            'vid': vid,
-            'version_name': version_name,
-            'is_default': version_is_default,
-            'intro': version_intro,
-            'stats': version_stats,  # 分支统计信息（时间、查看、下载）
-            'downloads': downloads,
-        }
+            self.logger.info(
+                f"找到 {len(downloads)} 个下载项（mid={mid}, vid={vid}, version={fragment.version}）"
+            )
         
-        # 收集到 versions_data
-        versions_data = meta.get('versions_data', [])
-        versions_data.append(version_data)
+        if self.branch_cache is not None:
+            self.branch_cache.save_branch(mid, vid, version_stats.get('updated_at'),
+                                          {'intro': version_intro, 'downloads': downloads})
         
-        self.logger.info(f"已处理分支 {version_index + 1}/{total_versions}: {version_name} (mid={mid}, vid={vid})")
+        # 创建当前分支的数据，交给组装器
+        yield from self._add_branch(mid, version_index, self._version_data(ver, version_intro, downloads, vid))
         
-        # 构建 item 数据
-        item_data = {
-            'mid': mid,
-            'list_id': list_id,
-            'game': game,
-            'category': response.meta.get('category'),  # 分类
-            'title': title,
-            'cover_image': cover_image,
-            'images': images,
-            'intro': intro,  # 资源主描述（Markdown HTML 或纯文本）
-            'metadata': metadata,  # 元数据（作者、时间、统计等）
-            'versions': versions_data,  # 所有分支数据
-            'detail_url': detail_url,
-            'list_url': list_url,
-            'total_versions': total_versions,  # 记录总分支数
-            'collected_versions': len(versions_data),  # 已收集的分支数
+        yield from self._check_pending()
+    
+    @staticmethod
+    def _version_data(ver, intro, downloads, vid=None):
+        """分支数据（toversion 中的分支信息 + todownload 的分支说明和下载列表）"""
+        return {
+            'vid': vid if vid is not None else ver['vid'],
+            'version_name': ver.get('name', ''),
+            'is_default': ver.get('is_default', False),
+            'intro': intro,
+            'stats': ver.get('stats', {}),  # 分支统计信息（时间、查看、下载）
+            'downloads': downloads,
         }
-        
-        # 存储到 pending_items
-        self.pending_items[mid] = item_data
-        
-        # 检查是否所有分支都处理完毕
-        if len(versions_data) >= total_versions:
-            # 所有分支处理完毕，返回完整 item
-            self.logger.info(f"所有分支处理完毕（mid={mid}），共 {len(versions_data)} 个分支")
+    
+    def _add_branch(self, mid, version_index, version_data):
+        """交给组装器，所有分支到齐时输出完整 item"""
+        payload = self.assembler.payload(mid)
+        context = self.assembler.context(mid)
+        total_versions = self.assembler.collected(mid)[1] or 1
+        self.logger.info(
+            f"已处理分支 {version_index + 1}/{total_versions}: {version_data['version_name']} "
+            f"(mid={mid}, vid={version_data['vid']})"
+        )
+        
+        item_data = self.assembler.add_branch(mid, version_index, version_data)
+        if item_data is not None:
+            self.logger.info(f"所有分支处理完毕（mid={mid}），共 {item_data['collected_versions']} 个分支")
             
             # Stage 2: 更新统计计数器
             self.stats_counter['items_scraped'] += 1
             
-            # 从 pending 中移除
-            self.pending_items.pop(mid, None)
+            self._record_mod_state(mid, payload['list_id'], context.get('card_fingerprint'), payload.get('metadata', {}))
             
             yield item_data
-        else:
-            # 还有分支未处理，更新 meta 中的 versions_data
-            meta['versions_data'] = versions_data
     
     def closed(self, reason):
         """
-        Stage 2: Spider 关闭时输出统计信息 + 清理未完成的 items
+        Stage 2: Spider 关闭时输出统计信息
+        （未完成的 items 已在 spider_idle / 收到信号时作为 partial 输出，见 _schedule_flush）
         """
-        # 处理未完成的 items
-        if self.pending_items:
-            self.logger.warning("=" * 80)
-            self.logger.warning(f"发现 {len(self.pending_items)} 个未完成的 items，强制输出...")
-            self.logger.warning("=" * 80)
-            
-            for mid, item_data in list(self.pending_items.items()):
-                collected = item_data.get('collected_versions', 0)
-                total = item_data.get('total_versions', 0)
-                title = item_data.get('title', '')[:50]
-                
-                self.logger.warning(
-                    f"未完成 item: mid={mid}, 分支 {collected}/{total}, "
-                    f"标题: {title}"
-                )
-                
-                # 移除内部字段
-                item_data.pop('total_versions', None)
-                item_data.pop('collected_versions', None)
-                
-                # 强制输出
-                yield item_data
-                self.stats_counter['items_scraped'] += 1
-        
         self.logger.info("=" * 80)
         self.logger.info("Spider 关闭统计 (Stage 2)")
         self.logger.info("=" * 80)
         self.logger.info(f"  关闭原因: {reason}")
         self.logger.info(f"  抓取 Items: {self.stats_counter['items_scraped']}")
         self.logger.info(f"  解析错误: {self.stats_counter['parse_errors']}")
-        self.logger.info(f"  选择器兜底: {self.stats_counter['selector_fallbacks']}")
+        self.logger.info(f"  选择器兜底: {self.extractor.fallbacks}")
         self.logger.info(f"  处理列表数: {len(self.stats_counter['lists_processed'])}")
         
         if self.stats_counter['lists_processed']:
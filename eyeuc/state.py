@@ -0,0 +1,226 @@
+"""
+EyeUC 增量抓取状态存储
+
+按 mid 记录上次抓取时的列表卡片指纹和更新时间（SQLite 单文件），
+增量模式下用于跳过未变化的资源。
+
+BranchCache 缓存每个 mid 的分支列表和各分支的下载结果，
+详情页/分支未变化时跳过 toversion / todownload 请求。
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+
+def card_fingerprint(card):
+    """计算列表卡片指纹
+
+    只使用稳定的信号：链接、图片地址、title 属性（绝对时间）和链接文本。
+    查看/下载计数和"3 天前"这类相对时间会随时间变化，不参与指纹计算。
+
+    Args:
+        card: 列表页中单个资源卡片的 Selector（.modlist ul li）
+
+    Returns:
+        str: 16 位十六进制指纹
+    """
+    parts = []
+    parts.extend(card.css('a::attr(href)').getall())
+    parts.extend(card.css('img::attr(data-original)').getall())
+    parts.extend(card.css('[title]::attr(title)').getall())
+    parts.extend(t.strip() for t in card.css('a::text').getall() if t.strip())
+    return fingerprint_from_parts(parts)
+
+
+def fingerprint_from_parts(parts):
+    """由卡片字段列表计算指纹（解析后端直接提取字段时使用）"""
+    raw = '\x1f'.join(parts).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+class ModStateStore:
+    """增量抓取状态存储（SQLite）
+
+    表结构：
+    - mod_state(mid, list_id, fingerprint, last_updated, current_version_updated, seen_at)
+
+    写入按批提交（commit_every 条一次），close() 时提交剩余部分。
+    """
+
+    def __init__(self, path, commit_every=200):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.commit_every = commit_every
+        self._uncommitted = 0
+
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS mod_state (
+                mid TEXT PRIMARY KEY,
+                list_id INTEGER,
+                fingerprint TEXT,
+                last_updated TEXT,
+                current_version_updated TEXT,
+                seen_at REAL
+            )
+            """
+        )
+        self.conn.commit()
+
+        # 指纹常驻内存：万级 mid 也只有几百 KB，避免每张卡片一次查询
+        self._fingerprints = dict(
+            self.conn.execute('SELECT mid, fingerprint FROM mod_state')
+        )
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def is_unchanged(self, mid, fingerprint):
+        """mid 已记录且卡片指纹一致"""
+        return fingerprint is not None and self._fingerprints.get(mid) == fingerprint
+
+    def get(self, mid):
+        """读取 mid 的完整状态，不存在时返回 None"""
+        row = self.conn.execute(
+            'SELECT mid, list_id, fingerprint, last_updated, current_version_updated, seen_at '
+            'FROM mod_state WHERE mid = ?',
+            (mid,),
+        ).fetchone()
+        if not row:
+            return None
+        keys = ('mid', 'list_id', 'fingerprint', 'last_updated', 'current_version_updated', 'seen_at')
+        return dict(zip(keys, row))
+
+    def record(self, mid, list_id=None, fingerprint=None, last_updated=None, current_version_updated=None):
+        """记录（覆盖）mid 的最新状态"""
+        self.conn.execute(
+            'INSERT OR REPLACE INTO mod_state '
+            '(mid, list_id, fingerprint, last_updated, current_version_updated, seen_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (mid, list_id, fingerprint, last_updated, current_version_updated, time.time()),
+        )
+        self._fingerprints[mid] = fingerprint
+
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+class BranchCache:
+    """分支列表和分支下载结果缓存（SQLite）
+
+    表结构：
+    - mod_versions(mid, detail_key, versions, saved_at)
+      toversion 解析出的分支列表（JSON），detail_key 为详情页上与分支相关的信号
+      （最后更新时间、当前版本更新时间、默认 vid），一致时可跳过 toversion 请求
+    - branch_downloads(mid, vid, updated_at, data, saved_at)
+      todownload 的解析结果（分支说明 + 下载列表，JSON），分支 updated_at 未变化时复用
+
+    写入按批提交（commit_every 条一次），close() 时提交剩余部分。
+    """
+
+    def __init__(self, path, commit_every=200):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.commit_every = commit_every
+        self._uncommitted = 0
+
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS mod_versions (
+                mid TEXT PRIMARY KEY,
+                detail_key TEXT,
+                versions TEXT,
+                saved_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS branch_downloads (
+                mid TEXT,
+                vid TEXT,
+                updated_at TEXT,
+                data TEXT,
+                saved_at REAL,
+                PRIMARY KEY (mid, vid)
+            );
+            """
+        )
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM mod_versions').fetchone()[0]
+
+    @staticmethod
+    def detail_key(metadata, default_vid):
+        """详情页上与分支相关的信号（任一缺失时返回 None，不使用缓存）"""
+        metadata = metadata or {}
+        parts = (metadata.get('last_updated'), metadata.get('current_version_updated'), default_vid)
+        if not all(parts):
+            return None
+        return '|'.join(parts)
+
+    def versions(self, mid, detail_key):
+        """detail_key 一致时返回缓存的分支列表，否则返回 None"""
+        if not detail_key:
+            return None
+        row = self.conn.execute('SELECT detail_key, versions FROM mod_versions WHERE mid = ?', (mid,)).fetchone()
+        if not row or row[0] != detail_key:
+            return None
+        return json.loads(row[1])
+
+    def save_versions(self, mid, detail_key, versions):
+        if not detail_key:
+            return
+        self.conn.execute(
+            'INSERT OR REPLACE INTO mod_versions (mid, detail_key, versions, saved_at) VALUES (?, ?, ?, ?)',
+            (mid, detail_key, json.dumps(versions, ensure_ascii=False), time.time()),
+        )
+        self._maybe_commit()
+
+    def branch(self, mid, vid, updated_at):
+        """分支 updated_at 一致时返回缓存的 todownload 结果，否则返回 None"""
+        if not updated_at:
+            return None
+        row = self.conn.execute(
+            'SELECT updated_at, data FROM branch_downloads WHERE mid = ? AND vid = ?', (mid, vid)
+        ).fetchone()
+        if not row or row[0] != updated_at:
+            return None
+        return json.loads(row[1])
+
+    def save_branch(self, mid, vid, updated_at, data):
+        if not updated_at:
+            return
+        self.conn.execute(
+            'INSERT OR REPLACE INTO branch_downloads (mid, vid, updated_at, data, saved_at) VALUES (?, ?, ?, ?, ?)',
+            (mid, vid, updated_at, json.dumps(data, ensure_ascii=False), time.time()),
+        )
+        self._maybe_commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def _maybe_commit(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.commit()
@@ -0,0 +1,244 @@
+"""
+EyeUC todownload AJAX 片段解析
+
+down.php?mod=view&mid=...&vid=...&show=todownload 返回 XML 包裹的 CDATA HTML：
+
+    <div class="veritem-name"><span>V1.1</span></div>
+    <div class="veritem-content">分支说明</div>
+    <div class="veritem-footer">...</div>
+    <div class="veritem-download-item">
+        <a onclick="showprotocol('down.php?mod=buy&fileid=46657&...')">
+            <em class="bupload"><i class="iconfont"></i>&nbsp;2k26.zip</em>
+        </a>
+        <span>44.22 MB</span>
+    </div>
+    <div class="veritem-download-item">
+        <a href="javascript:;" onclick="showWindow('login', ...)"><em class="bupload">...&nbsp;百度云</em></a>
+    </div>
+
+parse_todownload() 按 veritem-download-item 把片段切分为下载项，每个下载项只遍历一次，
+它的 showprotocol 地址 / 文件名 / 大小 / 登录标记 / 链接只取自它自己的片段
+（不再对整个片段分别 findall 再按列表下标配对，某一项缺少大小或文件名不会错位）。
+download_entries() 把下载项转换为 item 中 downloads 列表的记录
+（internal / external / forum_redirect / empty / unknown，字段与导入脚本一致），
+相对地址按调用方传入的 site_url（spider 的 SITE_URL 配置）补全。
+"""
+
+import html
+import re
+from urllib.parse import urljoin
+
+DEFAULT_SITE_URL = 'https://bbs.eyeuc.com'  # 未指定 site_url 时（离线脚本）使用
+
+# 下载项起始标记（class 中含 veritem-download-item 的标签）
+_ITEM_RE = re.compile(r'class="(?:[^"]*\s)?veritem-download-item[\s"]')
+# 下载项内的字段
+_PROTOCOL_RE = re.compile(r'showprotocol\([\'"]([^\'"]+)[\'"]')
+_BUPLOAD_RE = re.compile(r'<em[^>]*class="bupload"[^>]*>(.*?)</em>', re.DOTALL | re.IGNORECASE)
+_SIZE_RE = re.compile(r'<span>(\d+\.?\d*\s*(?:KB|MB|GB))</span>', re.IGNORECASE)
+_HREF_RE = re.compile(r'<a\s[^>]*?href=["\']([^"\']+)["\']', re.IGNORECASE)
+_LOGIN_MARKER = "showWindow('login'"
+_VERSION_RE = re.compile(r'<div class="veritem-name">.*?<span>([^<]+)</span>', re.DOTALL)
+# 有些页面在 veritem-content 的 </div> 后还有额外的 </div>
+_CONTENT_RE = re.compile(r'<div class="veritem-content">(.*?)</div>(?:\s*</div>)?\s*<div class="veritem-footer">', re.DOTALL)
+_CONTENT_OPEN = '<div class="veritem-content">'
+_FOOTER_OPEN = '<div class="veritem-footer">'
+_FILEID_RE = re.compile(r'fileid=(\d+)')
+
+# 片段中没有下载项时，正文里的外链（旧页面格式）
+_EXTERNAL_LINK_RE = re.compile(r'<a[^>]+href=["\']([^"\']+)["\'][^>]*>.*?(?:外链|网盘|下载)</a>', re.DOTALL | re.IGNORECASE)
+
+EMPTY_MARKERS = ('暂无文件', '当前分支版本暂无文件')
+NETDISK_KEYWORDS = ('baidu', '百度', 'mediafire', 'mega', 'onedrive', '网盘')
+REDIRECT_KEYWORDS = ('试用', '链接', '地址', '下载')
+
+
+class DownloadItem:
+    """一个 veritem-download-item 下载项的原始字段"""
+
+    __slots__ = ('protocol', 'name', 'size', 'login', 'href')
+
+    def __init__(self):
+        self.protocol = None  # showprotocol() 的地址（站内附件或外链）
+        self.name = None  # bupload 中 &nbsp; 之后的文件名/链接名
+        self.size = None
+        self.login = False  # 需要登录（onclick 为 showWindow('login', ...)）
+        self.href = None  # 第一个非 javascript: 的链接
+
+    @property
+    def fileid(self):
+        if self.protocol:
+            match = _FILEID_RE.search(self.protocol)
+            if match:
+                return match.group(1)
+        return None
+
+
+class TodownloadFragment:
+    """todownload 片段的解析结果"""
+
+    def __init__(self, version='', content_html=None, empty=False, items=None, links=None):
+        self.version = version  # veritem-name 中的版本名
+        self.content_html = content_html  # veritem-content 的原始 HTML（没有时为 None）
+        self.empty = empty  # "暂无文件"
+        self.items = items or []  # [DownloadItem, ...]
+        self.links = links or []  # 没有下载项时正文中的外链地址（旧页面格式）
+
+
+def _bupload_name(em_html):
+    """<em class="bupload"> 中最后一个标签之后、&nbsp; 之后的文本"""
+    tail = em_html[em_html.rfind('>') + 1:]
+    nbsp = tail.find('&nbsp;')
+    if nbsp == -1:
+        return None
+    name = _unescape(tail[nbsp + 6:]).strip()
+    return name or None
+
+
+def _unescape(value):
+    return html.unescape(value) if '&' in value else value
+
+
+def _download_item(block):
+    item = DownloadItem()
+    match = _PROTOCOL_RE.search(block)
+    if match:
+        item.protocol = _unescape(match.group(1))
+    match = _BUPLOAD_RE.search(block)
+    if match:
+        item.name = _bupload_name(match.group(1))
+    match = _SIZE_RE.search(block)
+    if match:
+        item.size = match.group(1)
+    item.login = _LOGIN_MARKER in block
+    for href in _HREF_RE.findall(block):
+        if not href.startswith('javascript:'):
+            item.href = _unescape(href)
+            break
+    return item
+
+
+def _content_html(text):
+    """veritem-content 的内容：到 veritem-footer 之前的一个（或两个）</div> 为止"""
+    start = text.find(_CONTENT_OPEN)
+    if start == -1:
+        return None
+    start += len(_CONTENT_OPEN)
+    footer = text.find(_FOOTER_OPEN, start)
+    segment = text[start:footer].rstrip() if footer != -1 else ''
+    if not segment.endswith('</div>'):
+        # 结构不规整时用完整正则
+        match = _CONTENT_RE.search(text)
+        return match.group(1).strip() if match else None
+    segment = segment[:-6].rstrip()
+    if segment.endswith('</div>'):
+        segment = segment[:-6]
+    return segment.strip()
+
+
+def parse_todownload(text):
+    """解析 todownload 响应（XML/CDATA 包裹或纯 HTML 片段）"""
+    start = text.find('<![CDATA[')
+    if start != -1:
+        end = text.find(']]>', start)
+        if end != -1:
+            text = text[start + 9:end]
+
+    version_match = _VERSION_RE.search(text)
+    fragment = TodownloadFragment(
+        version=version_match.group(1).strip() if version_match else '',
+        content_html=_content_html(text),
+        empty=any(marker in text for marker in EMPTY_MARKERS),
+    )
+
+    # 按下载项切分，每个下载项只在自己的片段内提取字段
+    for block in _ITEM_RE.split(text)[1:]:
+        fragment.items.append(_download_item(block))
+
+    if not fragment.items:
+        fragment.links = [
+            html.unescape(href) for href in _EXTERNAL_LINK_RE.findall(text) if not href.startswith('javascript:')
+        ]
+    return fragment
+
+
+def _classify_link(name, url=''):
+    """外链类型和说明"""
+    name_lower = name.lower()
+    if any(kw in name_lower for kw in NETDISK_KEYWORDS):
+        return 'external', f'外部网盘（{name}）'
+    if any(kw in url for kw in ('/t/', '/thread-')):
+        return 'forum_redirect', f'论坛帖子（{name}）'
+    return 'external', f'外部链接（{name}）'
+
+
+def _absolute(url, site_url):
+    return urljoin(site_url, url) if url.startswith('/') else url
+
+
+def download_entries(fragment, mid, vid, site_url=DEFAULT_SITE_URL):
+    """把片段解析结果转换为 downloads 记录列表（每个下载项一条），相对地址以 site_url 补全"""
+    version = fragment.version
+    if fragment.empty:
+        return [{'type': 'empty', 'mid': mid, 'vid': vid, 'version': version, 'note': '当前版本暂无文件'}]
+
+    downloads = []
+    for item in fragment.items:
+        fileid = item.fileid
+        if fileid:
+            # 站内附件
+            downloads.append({
+                'type': 'internal',
+                'mid': mid,
+                'vid': vid,
+                'fileid': fileid,
+                'filename': item.name or f'file_{fileid}',
+                'size': item.size or '',
+                'version': version,
+            })
+        elif item.protocol:
+            # showprotocol 指向外部地址
+            name = item.name or '外部链接'
+            link_type, note = _classify_link(name, item.protocol)
+            downloads.append({
+                'type': link_type,
+                'name': name,
+                'url': _absolute(item.protocol, site_url),
+                'version': version,
+                'note': note,
+            })
+        elif item.login:
+            # 需要登录才能看到地址的外链/论坛跳转
+            name = item.name or ''
+            if any(kw in name.lower() for kw in REDIRECT_KEYWORDS):
+                link_type, note = 'forum_redirect', '跳转到论坛帖子（需登录查看）'
+            elif any(kw in name.lower() for kw in NETDISK_KEYWORDS):
+                link_type, note = 'external', f'外部网盘（{name}）'
+            else:
+                link_type, note = 'external', '外部链接或网盘'
+            downloads.append({
+                'type': link_type,
+                'mid': mid,
+                'vid': vid,
+                'name': name,
+                'version': version,
+                'note': note,
+            })
+        elif item.href:
+            name = item.name or '外部链接'
+            link_type, note = _classify_link(name, item.href)
+            downloads.append({
+                'type': link_type,
+                'name': name,
+                'url': _absolute(item.href, site_url),
+                'version': version,
+                'note': note,
+            })
+
+    if not downloads:
+        for url in fragment.links:
+            downloads.append({'type': 'external', 'url': urljoin(site_url, url), 'version': version})
+
+    if not downloads:
+        downloads.append({'type': 'unknown', 'mid': mid, 'vid': vid, 'version': version, 'note': '未找到下载链接'})
+    return downloads
@@ -0,0 +1,293 @@
+"""
+EyeUC 分布式抓取的共享任务队列
+
+列表页、详情页都是队列中的任务（kind = list / detail），按 key 去重
+（list:{list_id}:{page}、detail:{mid}）。任意数量的 worker 通过租约领取任务：
+- lease():  领取任务，租约到期前其他 worker 不会拿到同一任务
+- renew():  续租仍在处理中的任务（worker 心跳）
+- ack():    任务完成
+- release(): 放弃任务（失败），立即可被其他 worker 重新领取
+worker 崩溃后，租约到期的任务自动回到可领取状态；领取次数超过
+max_attempts 的任务标记为 failed。
+
+后端（提供相同的方法，由 open_work_queue() 按 URL 选择）：
+- sqlite:///path/queue.db  本地 SQLite（单机多进程，或共享文件系统）
+- tcp://host:port          通过 WorkQueueServer 共享同一个 SQLite 队列（多机）
+"""
+
+import json
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+# 任务状态
+READY = 0
+LEASED = 1
+DONE = 2
+FAILED = 3
+
+STATE_NAMES = {READY: 'ready', LEASED: 'leased', DONE: 'done', FAILED: 'failed'}
+
+
+class WorkTask:
+    """队列中的一个任务"""
+
+    __slots__ = ('id', 'kind', 'key', 'data', 'attempts')
+
+    def __init__(self, id, kind, key, data, attempts=0):
+        self.id = id
+        self.kind = kind
+        self.key = key
+        self.data = data
+        self.attempts = attempts
+
+    def to_dict(self):
+        return {'id': self.id, 'kind': self.kind, 'key': self.key, 'data': self.data, 'attempts': self.attempts}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['id'], d['kind'], d['key'], d['data'], d.get('attempts', 0))
+
+    def __repr__(self):
+        return f'WorkTask({self.id}, {self.key!r})'
+
+
+class SQLiteWorkQueue:
+    """SQLite 任务队列（多个进程可同时打开同一个文件）"""
+
+    def __init__(self, path, max_attempts=3):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+
+        # isolation_level=None：手动控制事务，领取任务时用 BEGIN IMMEDIATE 加写锁
+        self.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL UNIQUE,
+                data TEXT,
+                priority INTEGER DEFAULT 0,
+                state INTEGER DEFAULT 0,
+                worker TEXT,
+                lease_until REAL DEFAULT 0,
+                attempts INTEGER DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks (state, priority DESC, id);
+            """
+        )
+
+    def put_many(self, tasks):
+        """批量加入任务 [(kind, key, data, priority), ...]，返回新加入的数量（已存在的 key 忽略）"""
+        rows = [(kind, key, json.dumps(data, ensure_ascii=False), priority) for kind, key, data, priority in tasks]
+        if not rows:
+            return 0
+        before = self.conn.total_changes
+        self._execute_many('INSERT OR IGNORE INTO tasks (kind, key, data, priority) VALUES (?, ?, ?, ?)', rows)
+        return self.conn.total_changes - before
+
+    def lease(self, worker, limit, lease_seconds):
+        """领取最多 limit 个任务"""
+        if limit <= 0:
+            return []
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = self.conn.execute(
+                'SELECT id, kind, key, data, attempts FROM tasks '
+                'WHERE state = ? OR (state = ? AND lease_until < ?) '
+                'ORDER BY priority DESC, id LIMIT ?',
+                (READY, LEASED, now, limit),
+            ).fetchall()
+
+            tasks, failed = [], []
+            for task_id, kind, key, data, attempts in rows:
+                if attempts >= self.max_attempts:
+                    failed.append((task_id,))
+                    continue
+                tasks.append(WorkTask(task_id, kind, key, json.loads(data), attempts + 1))
+
+            if failed:
+                self.conn.executemany(f'UPDATE tasks SET state = {FAILED} WHERE id = ?', failed)
+            self.conn.executemany(
+                'UPDATE tasks SET state = ?, worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?',
+                [(LEASED, worker, now + lease_seconds, task.id) for task in tasks],
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return tasks
+
+    def renew(self, worker, task_ids, lease_seconds):
+        """续租本 worker 持有的任务"""
+        if not task_ids:
+            return
+        until = time.time() + lease_seconds
+        self._execute_many(
+            'UPDATE tasks SET lease_until = ? WHERE id = ? AND state = ? AND worker = ?',
+            [(until, task_id, LEASED, worker) for task_id in task_ids],
+        )
+
+    def ack(self, task_ids):
+        """标记任务完成"""
+        self._set_state(task_ids, DONE)
+
+    def release(self, task_ids):
+        """放弃任务，立即可被重新领取"""
+        self._set_state(task_ids, READY)
+
+    def counts(self):
+        """各状态任务数 {'ready': n, 'leased': n, 'done': n, 'failed': n}"""
+        counts = {name: 0 for name in STATE_NAMES.values()}
+        now = time.time()
+        for state, expired, count in self.conn.execute(
+            'SELECT state, lease_until < ?, COUNT(*) FROM tasks GROUP BY state, lease_until < ?', (now, now)
+        ):
+            # 租约已过期的任务视为可领取
+            name = 'ready' if state == LEASED and expired else STATE_NAMES[state]
+            counts[name] += count
+        return counts
+
+    def close(self):
+        self.conn.close()
+
+    def _set_state(self, task_ids, state):
+        if not task_ids:
+            return
+        self._execute_many(
+            'UPDATE tasks SET state = ?, lease_until = 0 WHERE id = ?', [(state, task_id) for task_id in task_ids]
+        )
+
+    def _execute_many(self, sql, rows):
+        """在一个写事务中执行，失败时回滚（否则事务一直打开，之后的 BEGIN 都会失败）"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.executemany(sql, rows)
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+
+class WorkQueueServer(socketserver.ThreadingTCPServer):
+    """把本地 SQLite 队列通过 TCP 共享给多台机器上的 worker
+
+    协议：每行一个 JSON 请求 {"op": "...", "args": [...]}，每行一个 JSON 响应
+    {"ok": true, "result": ...} 或 {"ok": false, "error": "..."}。
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    OPS = ('put_many', 'lease', 'renew', 'ack', 'release', 'counts')
+
+    def __init__(self, queue, host='0.0.0.0', port=7700):
+        self.queue = queue
+        self.lock = threading.Lock()
+        super().__init__((host, port), _WorkQueueHandler)
+
+    def call(self, op, args):
+        if op not in self.OPS:
+            raise ValueError(f'未知操作: {op}')
+        with self.lock:
+            result = getattr(self.queue, op)(*args)
+        if op == 'lease':
+            result = [task.to_dict() for task in result]
+        return result
+
+
+class _WorkQueueHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = {'ok': True, 'result': self.server.call(request['op'], request.get('args', []))}
+            except Exception as e:
+                response = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8'))
+
+
+class SocketWorkQueue:
+    """WorkQueueServer 的客户端（方法与 SQLiteWorkQueue 相同，在服务器端执行）"""
+
+    def __init__(self, host, port, timeout=30):
+        self.address = (host, port)
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+
+    def put_many(self, tasks):
+        return self._call('put_many', [list(t) for t in tasks])
+
+    def lease(self, worker, limit, lease_seconds):
+        return [WorkTask.from_dict(d) for d in self._call('lease', worker, limit, lease_seconds)]
+
+    def renew(self, worker, task_ids, lease_seconds):
+        self._call('renew', worker, list(task_ids), lease_seconds)
+
+    def ack(self, task_ids):
+        self._call('ack', list(task_ids))
+
+    def release(self, task_ids):
+        self._call('release', list(task_ids))
+
+    def counts(self):
+        return self._call('counts')
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+
+    def _call(self, op, *args):
+        payload = (json.dumps({'op': op, 'args': args}, ensure_ascii=False) + '\n').encode('utf-8')
+        # 连接断开时重连一次
+        for attempt in range(2):
+            try:
+                if self._sock is None:
+                    self._sock = socket.create_connection(self.address, timeout=self.timeout)
+                    self._file = self._sock.makefile('rb')
+                self._sock.sendall(payload)
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError('队列服务器关闭了连接')
+                break
+            except OSError:
+                self.close()
+                if attempt:
+                    raise
+        response = json.loads(line)
+        if not response['ok']:
+            raise RuntimeError(f"队列服务器错误: {response['error']}")
+        return response['result']
+
+
+# 后端注册表：URL scheme -> 构造函数(parsed_url, **options)
+WORK_QUEUE_BACKENDS = {
+    # sqlite:///relative/path.db 或 sqlite:////absolute/path.db
+    'sqlite': lambda url, **options: SQLiteWorkQueue(url.netloc + url.path[1:], **options),
+    'tcp': lambda url, **options: SocketWorkQueue(url.hostname, url.port or 7700),
+}
+
+
+def open_work_queue(url, **options):
+    """按 URL 打开任务队列（没有 scheme 时视为 SQLite 文件路径）"""
+    if '://' not in url:
+        return SQLiteWorkQueue(url, **options)
+    parsed = urlparse(url)
+    try:
+        backend = WORK_QUEUE_BACKENDS[parsed.scheme]
+    except KeyError:
+        raise ValueError(f"不支持的队列后端: {parsed.scheme}（可用: {', '.join(WORK_QUEUE_BACKENDS)}）")
+    return backend(parsed, **options)
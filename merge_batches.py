@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 """
-合并分批抓取的 JSONL 文件
+合并分批抓取的 JSONL 文件（包括 gzip / zstd 压缩段，见 eyeuc/segments.py）
 
 用法：
-    python merge_batches.py per_list_output/eyeuc_list182_*_p*.jsonl
+    python merge_batches.py "per_list_output/eyeuc_list182_*_p[0-9]*-*.jsonl*"
     或
     python merge_batches.py 182
+
+按 list_id 合并时只选取文件名带页数范围（_p<起始页>-<结束页>_）的批次文件；
+不带页数范围的整表输出（如 eyeuc_list182_nba_2k25_20251017_120000_part0001.jsonl.gz）
+和之前的合并结果不参与合并。
 """
 
 import json
@@ -15,11 +19,13 @@ from pathlib import Path
 from collections import defaultdict
 import re
 
+from eyeuc.segments import iter_jsonl
+
 def parse_filename(filepath):
     """从文件名中提取 list_id 和页数范围"""
     filename = Path(filepath).name
     
-    # 匹配格式：eyeuc_list182_xxx_p1-5_xxx.jsonl 或 eyeuc_list182_p1-5_xxx.jsonl
+    # 匹配格式：eyeuc_list182_xxx_p1-5_xxx.jsonl 或 eyeuc_list182_p1-5_xxx_part0001.jsonl.gz
     pattern = r'eyeuc_list(\d+).*?_p(\d+)-(\d+)_'
     match = re.search(pattern, filename)
     
@@ -32,7 +38,7 @@ def parse_filename(filepath):
     return None, None, None
 
 def merge_jsonl_files(files, output_file):
-    """合并多个 JSONL 文件，去重（基于 mid）"""
+    """合并多个 JSONL 文件（逐行流式读取压缩段），去重（基于 mid）"""
     seen_mids = set()
     total_items = 0
     duplicate_items = 0
@@ -46,7 +52,8 @@ def merge_jsonl_files(files, output_file):
         else:
             files_with_meta.append((f, 0))
     
-    files_with_meta.sort(key=lambda x: x[1])
+    # 同一批次的多个段按文件名（_part0001、_part0002 ...）排序
+    files_with_meta.sort(key=lambda x: (x[1], Path(x[0]).name))
     sorted_files = [f for f, _ in files_with_meta]
     
     print(f"\n📄 找到 {len(sorted_files)} 个文件:")
@@ -57,27 +64,19 @@ def merge_jsonl_files(files, output_file):
     
     with open(output_file, 'w', encoding='utf-8') as out:
         for filepath in sorted_files:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    try:
-                        item = json.loads(line)
-                        mid = item.get('mid')
-                        
-                        if mid and mid in seen_mids:
-                            duplicate_items += 1
-                            continue
-                        
-                        if mid:
-                            seen_mids.add(mid)
-                        
-                        out.write(json.dumps(item, ensure_ascii=False) + '\n')
-                        total_items += 1
-                    except json.JSONDecodeError as e:
-                        print(f"⚠️  解析错误: {filepath}: {e}")
+            # 无法解析的行和压缩段末尾的损坏在 iter_jsonl 中跳过（记录警告），清单行不输出
+            for item in iter_jsonl(filepath):
+                mid = item.get('mid')
+                
+                if mid and mid in seen_mids:
+                    duplicate_items += 1
+                    continue
+                
+                if mid:
+                    seen_mids.add(mid)
+                
+                out.write(json.dumps(item, ensure_ascii=False) + '\n')
+                total_items += 1
     
     print(f"\n✅ 合并完成!")
     print(f"  - 总 items: {total_items}")
@@ -90,7 +89,7 @@ def main():
     if len(sys.argv) < 2:
         print("用法: python merge_batches.py <list_id> 或 <文件模式>")
         print("示例: python merge_batches.py 182")
-        print("示例: python merge_batches.py per_list_output/eyeuc_list182_*_p*.jsonl")
+        print('示例: python merge_batches.py "per_list_output/eyeuc_list182_*_p[0-9]*-*.jsonl*"')
         sys.exit(1)
     
     arg = sys.argv[1]
@@ -98,8 +97,9 @@ def main():
     # 如果参数是数字，视为 list_id
     if arg.isdigit():
         list_id = int(arg)
-        pattern = f"per_list_output/eyeuc_list{list_id}_*_p*.jsonl"
-        files = glob.glob(pattern)
+        # 段文件后缀 _partNNNN 也以 _p 开头，不能用 glob 区分批次文件，按 parse_filename 的页数范围筛选
+        pattern = f"per_list_output/eyeuc_list{list_id}_*.jsonl*"
+        files = [f for f in glob.glob(pattern) if parse_filename(f)[0] == list_id]
         
         if not files:
             print(f"❌ 未找到 list {list_id} 的批次文件 (模式: {pattern})")
@@ -44,6 +44,9 @@ fi
 
 # 创建日志目录
 LOG_DIR="logs/list${LIST_ID}_$(date +%Y%m%d_%H%M%S)"
+
+# 所有分片共用一个 run_id：同一个 mid 只被一个分片抓取
+export EYEUC_RUN_ID=${EYEUC_RUN_ID:-"list${LIST_ID}_$(date +%Y%m%d_%H%M%S)"}
 mkdir -p "$LOG_DIR"
 
 echo -e "${BLUE}╔════════════════════════════════════════════════════════════╗${NC}"
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+端到端抓取吞吐量基准测试（对本地模拟站点运行 eyeuc_mods）
+
+在本进程内启动 scripts/mock_eyeuc_server.py 的模拟站点（随机端口），
+在子进程中用项目配置运行 eyeuc_mods（SITE_URL 指向模拟站点，输出写到临时目录），
+结束后输出：
+- items/s、requests/s、总耗时
+- 下载延迟 p50 / p99（download_latency，客户端观测）
+- 子进程峰值内存（ru_maxrss）
+- 模拟站点注入的故障次数（按状态码）
+
+模拟站点的参数（--pages / --latency / --burst ...）与 mock_eyeuc_server.py 相同，
+配置改动用 --set 传入（可重复）。用 --save 保存结果作为基线，之后用 --baseline 对比。
+
+用法：
+    python scripts/bench_crawl.py --pages 10 --latency lognormal:0.05,0.5
+    python scripts/bench_crawl.py --pages 10 --latency lognormal:0.05,0.5 --save bench/baseline.json
+    python scripts/bench_crawl.py --pages 10 --latency lognormal:0.05,0.5 \\
+        --set CONCURRENT_REQUESTS=24 --baseline bench/baseline.json
+    python scripts/bench_crawl.py --burst 429:20:3 --error-rate 0.02 --login-rate 0.005 --runs 3
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# 结果中参与基线对比的指标：(键, 显示名, 越大越好)
+METRICS = (
+    ('items_per_sec', 'items/s', True),
+    ('requests_per_sec', 'requests/s', True),
+    ('elapsed', '耗时 s', False),
+    ('latency_p50_ms', '延迟 p50 ms', False),
+    ('latency_p99_ms', '延迟 p99 ms', False),
+    ('peak_rss_mb', '峰值内存 MB', False),
+)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def run_child(config_path, result_path):
+    """子进程：运行 eyeuc_mods 并写出统计结果"""
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    config = json.loads(Path(config_path).read_text(encoding='utf-8'))
+    os.chdir(PROJECT_DIR)
+    settings = get_project_settings()
+    settings.setdict(config['settings'], priority='cmdline')
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler('eyeuc_mods')
+    latencies = []
+
+    def on_response(response, request, spider):
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            latencies.append(latency)
+
+    crawler.signals.connect(on_response, signal=signals.response_received)
+    started = time.perf_counter()
+    process.crawl(crawler, **config['spider_args'])
+    process.start()
+    elapsed = time.perf_counter() - started
+
+    stats = crawler.stats.get_stats()
+    items = stats.get('item_scraped_count', 0)
+    requests = stats.get('downloader/request_count', 0)
+    result = {
+        'items': items,
+        'requests': requests,
+        'elapsed': round(elapsed, 3),
+        'items_per_sec': round(items / elapsed, 2),
+        'requests_per_sec': round(requests / elapsed, 2),
+        'latency_p50_ms': round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        'latency_p99_ms': round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'errors': stats.get('log_count/ERROR', 0),
+        'retries': stats.get('retry/count', 0),
+        'statuses': {k.rsplit('/', 1)[1]: v for k, v in stats.items()
+                     if k.startswith('downloader/response_status_count/')},
+    }
+    Path(result_path).write_text(json.dumps(result), encoding='utf-8')
+
+
+def run_once(args, site_url, workdir, run_index):
+    output_dir = workdir / f'run{run_index}'
+    settings = {
+        'SITE_URL': site_url,
+        'PER_LIST_OUTPUT_DIR': str(output_dir / 'out'),
+        'PARSE_ERROR_OUTPUT_DIR': str(output_dir / 'parse_errors'),
+        'PENDING_JOURNAL_DIR': str(output_dir / 'journal'),
+        'LOG_FILE': str(output_dir / 'crawl.log'),
+        'LOG_LEVEL': args.log_level,
+        'TELNETCONSOLE_ENABLED': False,
+    }
+    for item in args.set:
+        key, _, value = item.partition('=')
+        settings[key] = value
+    spider_args = {'list_ids': args.list_ids or args.lists}
+    for item in args.arg:
+        key, _, value = item.partition('=')
+        spider_args[key] = value
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    config_path = output_dir / 'config.json'
+    result_path = output_dir / 'result.json'
+    config_path.write_text(json.dumps({'settings': settings, 'spider_args': spider_args}), encoding='utf-8')
+    subprocess.run([sys.executable, __file__, '--child', str(config_path), str(result_path)],
+                   cwd=PROJECT_DIR, check=True)
+    return json.loads(result_path.read_text(encoding='utf-8'))
+
+
+def summarize(results):
+    """多次运行取中位数"""
+    summary = dict(results[-1])
+    for key, _, _ in METRICS:
+        values = [r[key] for r in results if r.get(key) is not None]
+        summary[key] = round(statistics.median(values), 2) if values else None
+    summary['runs'] = len(results)
+    return summary
+
+
+def print_report(summary, server_stats, baseline=None):
+    print(f"\n资源 {summary['items']} 个，请求 {summary['requests']} 个，"
+          f"错误日志 {summary['errors']} 条，重试 {summary['retries']} 次（{summary['runs']} 次运行取中位数）")
+    print(f"响应状态码: {summary['statuses']}")
+    print(f"模拟站点: {server_stats['requests']}，发送 {server_stats['bytes_sent'] / 1024 / 1024:.1f} MB")
+    header = f"\n{'指标':<14} {'本次':>10}"
+    if baseline:
+        header += f" {'基线':>10} {'变化':>8}"
+    print(header)
+    for key, name, higher_better in METRICS:
+        value = summary.get(key)
+        line = f"{name:<14} {value if value is not None else '-':>10}"
+        base = (baseline or {}).get(key)
+        if baseline and value is not None and base:
+            change = (value - base) / base * 100
+            better = change >= 0 if higher_better else change <= 0
+            line += f" {base:>10} {change:>+7.1f}%{'' if better or abs(change) < 1 else ' ⚠️'}"
+        print(line)
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3])
+        return
+
+    import mock_eyeuc_server
+
+    parser = argparse.ArgumentParser(description='端到端抓取吞吐量基准测试（本地模拟站点）')
+    mock_eyeuc_server.add_arguments(parser)
+    parser.set_defaults(port=0)
+    parser.add_argument('--list-ids', help='spider 的 list_ids（默认与 --lists 相同）')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE', help='scrapy 配置（可重复）')
+    parser.add_argument('--arg', action='append', default=[], metavar='KEY=VALUE', help='spider 参数（可重复）')
+    parser.add_argument('--runs', type=int, default=1, help='运行次数，结果取中位数（默认 1）')
+    parser.add_argument('--log-level', default='WARNING', help='抓取日志级别（默认 WARNING）')
+    parser.add_argument('--save', help='把结果保存为 JSON（作为基线）')
+    parser.add_argument('--baseline', help='与之前保存的结果对比')
+    parser.add_argument('--keep', action='store_true', help='保留临时目录（输出、日志）')
+    args = parser.parse_args()
+
+    server = mock_eyeuc_server.build_server(args)
+    host, port = server.server_address[:2]
+    site_url = f'http://{host}:{port}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    site = mock_eyeuc_server.MockHandler.site
+    print(f"模拟站点: {site_url}（列表 {sorted(site.lists)}，每个 {site.pages} 页 × {site.per_page} 个资源，"
+          f"分支 {site.min_branches}-{site.max_branches} 个）")
+
+    workdir = Path(tempfile.mkdtemp(prefix='eyeuc_bench_'))
+    results = []
+    try:
+        for i in range(args.runs):
+            result = run_once(args, site_url, workdir, i + 1)
+            results.append(result)
+            print(f"  第 {i + 1} 次: {result['items_per_sec']} items/s，{result['requests_per_sec']} requests/s，"
+                  f"{result['elapsed']}s")
+        with urllib.request.urlopen(f'{site_url}/__stats') as resp:
+            server_stats = json.loads(resp.read())
+    finally:
+        server.shutdown()
+
+    summary = summarize(results)
+    summary['config'] = {'argv': sys.argv[1:]}
+    baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8')) if args.baseline else None
+    print_report(summary, server_stats, baseline)
+
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(summary, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+        print(f"\n结果已保存到 {args.save}")
+    if args.keep:
+        print(f"输出和日志: {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
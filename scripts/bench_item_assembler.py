@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+多分支 item 组装内存基准测试
+
+用离线模拟站点（下载中间件直接生成响应，不访问网络）跑 eyeuc_mods，
+列表中全部是多分支、带大段简介的资源，统计：
+- 峰值 RSS
+- 每类请求（list/detail/toversion/todownload）的 meta 大小（pickle 字节数）
+
+--baseline 指定一个 git 版本，会用该版本的 eyeuc/spiders/eyeuc_mods.py
+跑同样的负载作为对照（其余模块使用当前工作区代码）。
+
+用法：
+    python scripts/bench_item_assembler.py
+    python scripts/bench_item_assembler.py --pages 20 --branches 6 --baseline 48f220e
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+PER_PAGE = 20
+
+
+class MockSite:
+    """离线生成列表页/详情页/toversion/todownload 响应"""
+
+    def __init__(self, pages, branches, intro_kb):
+        self.pages = pages
+        self.branches = branches
+        self.filler = '<p>' + 'EyeUC 模拟简介 mock intro text. ' * 32 + '</p>'
+        self.intro_repeat = max(1, intro_kb * 1024 // len(self.filler.encode('utf-8')))
+
+    def render(self, url):
+        from urllib.parse import parse_qs, urlparse
+        import re
+
+        parsed = urlparse(url)
+        match = re.match(r'/down/list/(\d+)/(\d+)', parsed.path)
+        if match:
+            return self.list_page(int(match.group(1)), int(match.group(2)))
+        match = re.match(r'/down/view/(\d+)$', parsed.path)
+        if match:
+            return self.detail(match.group(1))
+        query = parse_qs(parsed.query)
+        if query.get('show') == ['toversion']:
+            return self.toversion(query['mid'][0])
+        if query.get('show') == ['todownload']:
+            return self.todownload(query['mid'][0], query['vid'][0])
+        return ''
+
+    def list_page(self, list_id, page):
+        if page > self.pages:
+            return '<html><body><div class="modlist"><ul></ul></div></body></html>'
+        cards = []
+        for i in range(PER_PAGE):
+            mid = list_id * 100000 + (page - 1) * PER_PAGE + i
+            cards.append(
+                f'<li><div class="modpic"><a href="/down/view/{mid}">'
+                f'<img data-original="/data/cover/{mid}.jpg/fw_285"></a></div>'
+                f'<h3><a href="/down/view/{mid}">Mod {mid}</a></h3></li>'
+            )
+        return (
+            '<html><head><title>NBA2K25 - EYE资源中心</title></head><body><h1>NBA 2K25</h1>'
+            f'<div class="modlist"><ul>{"".join(cards)}</ul></div></body></html>'
+        )
+
+    def detail(self, mid):
+        images = ''.join(f'<img data-original="/data/img/{mid}_{i}.jpg/fh_140">' for i in range(20))
+        return (
+            f'<html><head><title>Mod {mid}_NBA2K25照片 - EYE资源中心</title>'
+            '<meta name="keywords" content="NBA2K25资源下载,NBA2K25照片"></head><body>'
+            f'<h1 id="title">author / Mod {mid} / v1</h1>'
+            '<div class="top-right-info"><span><a>查看</a><em>100</em></span>'
+            '<span><a>下载</a><em>20</em></span><span><a>喜欢</a><em>3</em></span></div>'
+            '<div class="uploadinfo"><ul>'
+            '<li><p class="custom-tt">当前版本最后更新</p><span title="2025-10-01 10:00">x</span></li>'
+            '<li><p class="custom-tt">最后更新时间</p><span title="2025-10-02 10:00">x</span></li>'
+            '<li><p class="custom-tt">资源作者</p><a href="/u/1">author</a></li>'
+            '</ul></div>'
+            f'<div id="imglist">{images}</div>'
+            f'<div class="view-message"><div class="markdown-body">{self.filler * self.intro_repeat}</div></div>'
+            f'<script>var _data = {{"mid": "{mid}", "vid": "{int(mid) * 10}", "formhash": "98e0550f"}};</script>'
+            '</body></html>'
+        )
+
+    def toversion(self, mid):
+        items = []
+        for b in range(self.branches):
+            vid = int(mid) * 10 + b
+            default = '<i>默认分支</i>' if b == 0 else ''
+            items.append(
+                f'<div class="verlist"><h4><a href="/down/view/{mid}/{vid}">V{b}{default}</a></h4>'
+                f'<div class="verlist-note">branch {b}</div></div>'
+            )
+        return f'<?xml version="1.0" encoding="utf-8"?><root><![CDATA[{"".join(items)}]]></root>'
+
+    def todownload(self, mid, vid):
+        return (
+            '<?xml version="1.0" encoding="utf-8"?><root><![CDATA['
+            f'<div class="veritem-name"><span>V{vid}</span></div>'
+            '<div class="veritem-content"><p>branch intro</p></div><div class="veritem-footer"></div>'
+            f'<div class="veritem-download-item"><a onclick="showprotocol(\'down.php?mod=buy&fileid={vid}1\')">'
+            f'<em class="bupload">i&nbsp;file_{vid}.zip</em></a><span>1.5 MB</span></div>'
+            ']]></root>'
+        )
+
+
+class MockSiteMiddleware:
+    """下载中间件：按 URL 生成模拟响应，并记录每类请求的 meta 大小"""
+
+    def __init__(self, site, latency):
+        self.site = site
+        self.latency = latency
+        self.meta_sizes = {}
+
+    def process_request(self, request, spider):
+        from scrapy.http import HtmlResponse
+        from twisted.internet import reactor
+        from twisted.internet.task import deferLater
+        from eyeuc.endpoints import endpoint_class
+
+        meta = {k: v for k, v in request.meta.items() if not k.startswith('download_')}
+        self.meta_sizes.setdefault(endpoint_class(request.url), []).append(len(pickle.dumps(meta)))
+
+        body = self.site.render(request.url).encode('utf-8')
+        response = HtmlResponse(url=request.url, body=body, encoding='utf-8', request=request)
+        return deferLater(reactor, self.latency, lambda: response)
+
+
+def load_spider_class(rev):
+    """加载当前工作区或指定 git 版本的 EyeucModsSpider"""
+    if not rev:
+        from eyeuc.spiders.eyeuc_mods import EyeucModsSpider
+        return EyeucModsSpider
+
+    source = subprocess.run(
+        ['git', 'show', f'{rev}:eyeuc/spiders/eyeuc_mods.py'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    path = Path(tempfile.mkdtemp()) / 'eyeuc_mods_baseline.py'
+    path.write_text(source, encoding='utf-8')
+    spec = importlib.util.spec_from_file_location('eyeuc_mods_baseline', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.EyeucModsSpider
+
+
+def run_once(args):
+    """子进程中运行一次爬取，输出 JSON 结果"""
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    os.chdir(PROJECT_ROOT)
+    spider_cls = load_spider_class(args.rev)
+    mock = MockSiteMiddleware(MockSite(args.pages, args.branches, args.intro_kb), args.latency)
+
+    settings = get_project_settings()
+    middlewares = dict(settings.getdict('DOWNLOADER_MIDDLEWARES'))
+    middlewares['eyeuc.middlewares.RandomDelayMiddleware'] = None
+    settings.set('DOWNLOADER_MIDDLEWARES', middlewares)
+    settings.set('ITEM_PIPELINES', {})
+    settings.set('AUTOTHROTTLE_ENABLED', False)
+    settings.set('DOWNLOAD_DELAY', 0)
+    settings.set('LOG_LEVEL', 'WARNING')
+    settings.set('TELNETCONSOLE_ENABLED', False)
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(spider_cls)
+    items = []
+
+    def install_mock(spider):
+        # 模拟站点放在所有下载中间件之后（最靠近下载器）
+        crawler.engine.downloader.middleware.methods['process_request'].append(mock.process_request)
+
+    def count_item(item, response, spider):
+        items.append(1)
+
+    crawler.signals.connect(install_mock, signal=signals.spider_opened, weak=False)
+    crawler.signals.connect(count_item, signal=signals.item_scraped, weak=False)
+
+    started = time.perf_counter()
+    process.crawl(crawler, list_ids='182')
+    process.start()
+    elapsed = time.perf_counter() - started
+
+    meta = {
+        name: {'count': len(sizes), 'avg': round(sum(sizes) / len(sizes)), 'max': max(sizes)}
+        for name, sizes in sorted(mock.meta_sizes.items())
+    }
+    print(json.dumps({
+        'rev': args.rev or 'working tree',
+        'items': len(items),
+        'elapsed': round(elapsed, 2),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'meta_bytes': meta,
+        'meta_bytes_total': sum(sum(sizes) for sizes in mock.meta_sizes.values()),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多分支 item 组装内存基准测试')
+    parser.add_argument('--pages', type=int, default=10, help=f'列表页数（每页 {PER_PAGE} 个资源，默认 10）')
+    parser.add_argument('--branches', type=int, default=4, help='每个资源的分支数（默认 4）')
+    parser.add_argument('--intro-kb', type=int, default=64, help='每个资源简介大小 KB（默认 64）')
+    parser.add_argument('--latency', type=float, default=0.02, help='模拟响应延迟秒数（默认 0.02）')
+    parser.add_argument('--baseline', help='对照的 git 版本（使用该版本的 eyeuc_mods.py）')
+    parser.add_argument('--rev', help=argparse.SUPPRESS)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_once(args)
+        return
+
+    print(f"负载: {args.pages} 页 × {PER_PAGE} 个资源，每个 {args.branches} 个分支，简介 {args.intro_kb} KB")
+    revs = ([args.baseline] if args.baseline else []) + ['']
+    for rev in revs:
+        cmd = [sys.executable, __file__, '--child', '--pages', str(args.pages), '--branches', str(args.branches),
+               '--intro-kb', str(args.intro_kb), '--latency', str(args.latency)]
+        if rev:
+            cmd += ['--rev', rev]
+        output = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        print(f"\n[{result['rev']}] {result['items']} items / {result['elapsed']}s，峰值 RSS {result['peak_rss_mb']} MB")
+        print(f"  meta 总量: {result['meta_bytes_total'] / 1024 / 1024:.2f} MB")
+        for name, sizes in result['meta_bytes'].items():
+            print(f"  {name:<11} {sizes['count']:>6} 个请求，meta 平均 {sizes['avg']:>8,} B，最大 {sizes['max']:>8,} B")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+页面解析后端基准测试与一致性校验
+
+用生成的列表页/详情页/toversion 片段（带论坛页头页脚等无关区域），
+分别用 parsel 和 lxml 后端运行 spider 的提取方法：
+- 校验两个后端的提取结果完全一致（不一致时列出字段并以非零状态退出）
+- 输出每页平均解析耗时（lxml 后端另外输出区域切片成功/退回整页解析的页数）
+
+用法：
+    python scripts/bench_parser_backends.py
+    python scripts/bench_parser_backends.py --pages 200 --chrome 120
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrapy.http import HtmlResponse, Request
+
+from eyeuc.parsers import PARSER_BACKENDS
+from eyeuc.spiders.eyeuc_mods import EyeucModsSpider
+
+
+def chrome(blocks):
+    """论坛页头/页脚/侧栏（与提取无关的区域）"""
+    links = ''.join(f'<li><a href="/forum-{i}.html" title="版块 {i}">版块 {i}</a></li>' for i in range(20))
+    return ''.join(f'<div class="nav nav-{b}"><ul>{links}</ul></div>' for b in range(blocks))
+
+
+def list_page(list_id, page, blocks, per_page=27):
+    cards = []
+    for i in range(per_page):
+        mid = list_id * 100000 + page * 100 + i
+        cards.append(
+            f'<li><div class="modpic"><a href="/down/view/{mid}"><img data-original="/data/cover/{mid}.jpg/fw_285"></a></div>'
+            f'<h3><a href="/down/view/{mid}" title="Mod {mid}">Mod {mid} &amp; 名单</a></h3>'
+            f'<span title="2025-10-0{1 + i % 9} 12:00">{i} 天前</span><em>{i * 7}</em></li>'
+        )
+    # 置顶帖重复出现
+    cards.append(cards[0])
+    pager = ''.join(f'<a href="/down/list/{list_id}/{p}">{p}</a>' for p in (1, 2, 3, 4, 5, 100))
+    return (
+        '<html><head><title>NBA2K25 资源 - EYE资源中心</title></head><body>'
+        f'<div id="hd">{chrome(blocks)}</div>'
+        '<div class="crumb"><a href="/">资源中心</a> &gt; <a href="/down/list/182">NBA 2K25</a></div>'
+        f'<h1>NBA 2K25</h1><div class="modlist"><ul>{"".join(cards)}</ul></div>'
+        f'<div class="pg">{pager}</div><div id="ft">{chrome(blocks)}</div></body></html>'
+    )
+
+
+def detail_page(mid, blocks, markdown=True):
+    images = ''.join(f'<img data-original="/data/img/{mid}_{i}.jpg/fh_140" src="/static/loading_blue.gif">' for i in range(8))
+    body = (
+        f'<div class="markdown-body"><p>Intro <b>{mid}</b> &lt;v2&gt;</p><script>x()</script>'
+        f'<p><a href="https://pan.baidu.com/s/{mid}">网盘</a><img src="/data/b_{mid}.png"></p></div>'
+        if markdown else
+        f'\n  <p>纯文本简介<br>\n第二行 <a href="/forum.php?mod=attachment.php&aid={mid}">附件</a></p>\n'
+        '<img src="/static/image/smiley/1.gif">'
+    )
+    return (
+        f'<html><head><title>Mod {mid}_NBA2K25照片 - EYE资源中心</title>'
+        '<meta name="keywords" content="NBA2K25资源下载,NBA2K25照片,球衣"></head><body>'
+        f'<div id="hd">{chrome(blocks)}</div>'
+        f'<h1 id="title">author / <span>Mod {mid}</span> / v1</h1>'
+        '<div class="top-right-info"><span><a>查看</a><em>1,024</em></span>'
+        '<span><a>下载</a><em>20</em></span><span><a>喜欢</a><em>3</em></span></div>'
+        '<div class="uploadinfo"><ul>'
+        '<li><p class="custom-tt">当前版本最后更新</p><span title="2025-10-01 10:00">3 天前</span></li>'
+        '<li><p class="custom-tt">最后更新时间</p><p>2025-10-02 10:00</p></li>'
+        '<li><p class="custom-tt">资源创建时间</p><span>2025-01-01 10:00</span></li>'
+        '<li><p class="custom-tt">资源作者</p><a href="/u/1">author</a></li>'
+        '<li><p class="custom-tt">资源发布者</p><a href="/u/2">publisher</a></li>'
+        '</ul></div>'
+        f'<div id="imglist">{images}</div>'
+        f'<div class="view-message">{body}</div>'
+        f'<div id="ft">{chrome(blocks)}</div>'
+        f'<script>var _data = {{"mid": "{mid}", "vid": "{mid}0", "formhash": "98e0550f"}};</script>'
+        '</body></html>'
+    )
+
+
+def toversion(mid, branches=4):
+    items = []
+    for b in range(branches):
+        default = '<i>默认分支</i>' if b == 0 else ''
+        items.append(
+            f'<div class="verlist"><h4><a href="/down/view/{mid}/{mid}{b}">V{b} 版本{default}</a></h4>'
+            f'<div class="verlist-note"> 分支说明 {b} </div><div class="verlist-info">'
+            '<em><i class="iconfont"></i><span title="2025-10-01 11:00">昨天 11:00</span></em>'
+            f'<em><i class="iconfont"></i><span>{b * 10}</span></em>'
+            f'<em><i class="iconfont"></i><span>{b * 3}</span></em></div></div>'
+        )
+    items.append('<div class="verlist"><h4>无链接分支</h4></div>')
+    return f'<?xml version="1.0" encoding="utf-8"?><root><![CDATA[{"".join(items)}]]></root>'
+
+
+def response(url, text, **meta):
+    return HtmlResponse(url=url, body=text.encode('utf-8'), encoding='utf-8', request=Request(url, meta=meta))
+
+
+def extract_list(spider, resp):
+    doc = spider.parser.list_page(resp)
+    extract = spider.extractor.extract
+    cards = [(extract('list', 'card_href', c.root), extract('list', 'card_cover', c.root), c.fingerprint())
+             for c in doc.cards()]
+    return {
+        'game_name': spider._guess_game_name(doc, 182),
+        'cards': cards,
+        'max_page': spider._parse_max_page(doc, 182),
+    }
+
+
+def extract_detail(spider, resp):
+    doc = spider.parser.detail_page(resp)
+    return {
+        'title': spider._extract_title(doc),
+        'category': spider._extract_category(doc, resp),
+        'images': spider._extract_images(doc, resp),
+        'intro': spider._extract_intro(doc),
+        'metadata': spider._extract_metadata(doc, resp),
+        'ids': spider._extract_resource_ids(doc),
+        'downloads': spider._extract_downloads(doc, resp),
+    }
+
+
+def extract_versions(spider, text):
+    return spider.parser.version_entries(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='页面解析后端基准测试与一致性校验')
+    parser.add_argument('--pages', type=int, default=100, help='每类页面数量（默认 100）')
+    parser.add_argument('--chrome', type=int, default=60, help='页头/页脚无关区块数量（默认 60，约 100KB/页）')
+    args = parser.parse_args()
+
+    lists = [response(f'https://bbs.eyeuc.com/down/list/182/{p}', list_page(182, p, args.chrome), list_id=182, page=p)
+             for p in range(1, args.pages + 1)]
+    details = [response(f'https://bbs.eyeuc.com/down/view/{30000 + i}', detail_page(30000 + i, args.chrome, i % 2 == 0))
+               for i in range(args.pages)]
+    fragments = [toversion(30000 + i) for i in range(args.pages)]
+    print(f"页面: 列表页 {len(lists)} / 详情页 {len(details)} / toversion 片段 {len(fragments)}，"
+          f"详情页平均 {sum(len(r.body) for r in details) // len(details) // 1024} KB")
+
+    spider = EyeucModsSpider(list_ids='182')
+    results = {}
+    for name, backend_cls in PARSER_BACKENDS.items():
+        spider.parser = backend_cls()
+        timings = {}
+        outputs = {}
+        for kind, pages, extract in (
+            ('list', lists, extract_list),
+            ('detail', details, extract_detail),
+            ('toversion', fragments, extract_versions),
+        ):
+            if kind != 'toversion':
+                # 新建 response，避免复用已缓存的 Selector
+                pages = [page.replace() for page in pages]
+            started = time.perf_counter()
+            outputs[kind] = [extract(spider, page) for page in pages]
+            timings[kind] = (time.perf_counter() - started) / len(pages) * 1000
+        results[name] = (timings, outputs)
+        if hasattr(spider.parser, 'sliced_pages'):
+            print(f"{name}: 区域切片解析 {spider.parser.sliced_pages} 页，整页解析 {spider.parser.full_pages} 页")
+
+    print(f"\n{'后端':<8} {'列表页':>10} {'详情页':>10} {'toversion':>10}   (ms/页)")
+    for name, (timings, _) in results.items():
+        print(f"{name:<8} {timings['list']:>10.2f} {timings['detail']:>10.2f} {timings['toversion']:>10.2f}")
+
+    reference = results['parsel'][1]
+    mismatches = 0
+    for name, (_, outputs) in results.items():
+        for kind, values in outputs.items():
+            for i, (expected, actual) in enumerate(zip(reference[kind], values)):
+                if expected != actual:
+                    mismatches += 1
+                    if mismatches <= 5:
+                        print(f"不一致: {name} {kind} #{i}\n  parsel: {expected}\n  {name}: {actual}")
+    if mismatches:
+        print(f"\n❌ {mismatches} 处输出与 parsel 后端不一致")
+        sys.exit(1)
+    print("\n✅ 各后端输出与 parsel 后端完全一致")
+
+
+if __name__ == '__main__':
+    main()
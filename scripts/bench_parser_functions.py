@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+解析函数微基准（固定样本集 + 基线对比）
+
+对 scripts/fixtures/parser/ 中保存的页面样本（以及 scripts/golden/todownload/ 中的
+todownload 片段）逐个计时 spider 的解析函数：
+    parse_list / parse_detail / _extract_metadata / _extract_images / _extract_intro /
+    _parse_relative_time / parse_versions / parse_download_ajax
+
+每次调用前的准备工作（构造 response、解析文档、登记组装器状态）不计入耗时。
+输出每个函数单次调用的耗时（微秒）和峰值内存分配（tracemalloc，KB）：
+    最快 us      每个样本 --rounds 轮中最快一次，再取各样本的中位数（用于基线对比）
+    中位数 / p90  全部计时的分布（受机器负载影响较大，仅供参考）
+用 --save 保存结果作为基线；--baseline 对比时任一函数的耗时或内存超过基线 --threshold
+（默认 20%）即以非零状态退出。修改提取逻辑前先保存基线，且在同一台机器上对比。
+
+样本集：
+    list_<list_id>_<page>.html      列表页
+    detail_<mid>.html               详情页（Markdown 简介 / 纯文本简介 / 大量图片 / 相对时间）
+    toversion_<mid>.xml             分支列表（单分支 / 多分支 / 含无链接分支）
+--import-archive 可以从响应归档（ARCHIVE_DIR）中按上述命名导入真实页面。
+
+用法：
+    python scripts/bench_parser_functions.py --save bench/parser_baseline.json
+    python scripts/bench_parser_functions.py --baseline bench/parser_baseline.json
+    python scripts/bench_parser_functions.py --only parse_detail,_extract_intro --rounds 50
+    python scripts/bench_parser_functions.py --import-archive archive/list182 --limit 5
+"""
+
+import argparse
+import gc
+import json
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scrapy.http import HtmlResponse, Request, XmlResponse
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.test import get_crawler
+
+from eyeuc.assembler import ItemAssembler
+from eyeuc.registry import MidRegistry
+from eyeuc.spiders.eyeuc_mods import EyeucModsSpider
+
+FIXTURE_DIR = Path(__file__).resolve().parent / 'fixtures' / 'parser'
+TODOWNLOAD_DIR = Path(__file__).resolve().parent / 'golden' / 'todownload'
+SITE_URL = 'https://bbs.eyeuc.com'
+LIST_ID = 182
+
+# _parse_relative_time 的输入（列表卡片和详情页中出现过的格式）
+TIME_SAMPLES = (
+    '2025-10-01 12:00', '2025-10-01', '刚刚', '30 秒前', '5 分钟前', '2 小时前',
+    '昨天 17:37', '前天 12:34', '3 天前', '半小时前', '', '2025-9-8 08:05',
+)
+
+
+def html_response(url, text, **meta):
+    return HtmlResponse(url=url, body=text.encode('utf-8'), encoding='utf-8', request=Request(url, meta=meta))
+
+
+def xml_response(url, text, **meta):
+    return XmlResponse(url=url, body=text.encode('utf-8'), encoding='utf-8', request=Request(url, meta=meta))
+
+
+def build_spider():
+    settings = get_project_settings().copy_to_dict()
+    settings['TWISTED_REACTOR'] = None  # 不启动 reactor
+    crawler = get_crawler(EyeucModsSpider, settings)
+    return EyeucModsSpider.from_crawler(crawler, list_ids=str(LIST_ID))
+
+
+def load_fixtures():
+    fixtures = {'list': [], 'detail': [], 'toversion': {}, 'todownload': []}
+    for path in sorted(FIXTURE_DIR.glob('list_*.html')):
+        _, list_id, page = path.stem.split('_')
+        fixtures['list'].append((path.stem, int(list_id), int(page), path.read_text(encoding='utf-8')))
+    for path in sorted(FIXTURE_DIR.glob('detail_*.html')):
+        fixtures['detail'].append((path.stem, path.stem.split('_')[1], path.read_text(encoding='utf-8')))
+    for path in sorted(FIXTURE_DIR.glob('toversion_*.xml')):
+        fixtures['toversion'][path.stem.split('_')[1]] = path.read_text(encoding='utf-8')
+    for path in sorted(FIXTURE_DIR.glob('todownload_*.xml')) + sorted(TODOWNLOAD_DIR.glob('*.xml')):
+        fixtures['todownload'].append((path.stem, path.read_text(encoding='utf-8')))
+    return fixtures
+
+
+class Bench:
+    """基准用例：prepare() 完成准备工作，返回要计时的无参函数"""
+
+    def __init__(self, spider, fixtures):
+        self.spider = spider
+        self.fixtures = fixtures
+
+    def _reset(self):
+        spider = self.spider
+        spider.assembler = ItemAssembler()
+        spider.mid_registry = MidRegistry()
+        spider.list_pages_issued.clear()
+        spider.list_last_page.clear()
+
+    def _detail_response(self, mid, text):
+        return html_response(
+            f'{SITE_URL}/down/view/{mid}', text, list_id=LIST_ID, game_name='NBA 2K25',
+            list_url=f'{SITE_URL}/down/list/{LIST_ID}/1', cover_image='', card_fingerprint=None,
+        )
+
+    def _start_detail(self, mid, text):
+        """parse_detail（不计时）：在组装器中登记 mid"""
+        for _ in self.spider.parse_detail(self._detail_response(mid, text)):
+            pass
+
+    def _toversion_response(self, mid, text):
+        return xml_response(f'{SITE_URL}/down.php?mod=view&mid={mid}&show=toversion', text,
+                            mid=mid, list_id=LIST_ID)
+
+    def cases(self, name):
+        spider = self.spider
+        fx = self.fixtures
+
+        if name == 'parse_list':
+            for label, list_id, page, text in fx['list']:
+                def prepare(list_id=list_id, page=page, text=text):
+                    self._reset()
+                    response = html_response(f'{SITE_URL}/down/list/{list_id}/{page}', text, list_id=list_id, page=page)
+                    return lambda: list(spider.parse_list(response))
+                yield label, prepare
+
+        elif name == 'parse_detail':
+            for label, mid, text in fx['detail']:
+                def prepare(mid=mid, text=text):
+                    self._reset()
+                    response = self._detail_response(mid, text)
+                    return lambda: list(spider.parse_detail(response))
+                yield label, prepare
+
+        elif name in ('_extract_metadata', '_extract_images', '_extract_intro'):
+            method = getattr(spider, name)
+            for label, mid, text in fx['detail']:
+                def prepare(mid=mid, text=text):
+                    response = self._detail_response(mid, text)
+                    doc = spider.parser.detail_page(response)
+                    if name == '_extract_intro':
+                        return lambda: method(doc)
+                    return lambda: method(doc, response)
+                yield label, prepare
+
+        elif name == '_parse_relative_time':
+            def prepare():
+                return lambda: [spider._parse_relative_time(s) for s in TIME_SAMPLES]
+            yield f'{len(TIME_SAMPLES)} 个时间字符串', prepare
+
+        elif name == 'parse_versions':
+            details = {mid: text for _, mid, text in fx['detail']}
+            for mid, text in fx['toversion'].items():
+                if mid not in details:
+                    continue
+                def prepare(mid=mid, text=text):
+                    self._reset()
+                    self._start_detail(mid, details[mid])
+                    response = self._toversion_response(mid, text)
+                    return lambda: list(spider.parse_versions(response))
+                yield f'toversion_{mid}', prepare
+
+        elif name == 'parse_download_ajax':
+            # 多分支资源：先登记详情和分支列表，再计时第一个分支的下载列表解析
+            mid = max(fx['toversion'], key=lambda m: fx['toversion'][m].count('verlist'))
+            details = {m: text for _, m, text in fx['detail']}
+            for label, text in fx['todownload']:
+                def prepare(text=text):
+                    self._reset()
+                    self._start_detail(mid, details[mid])
+                    for _ in spider.parse_versions(self._toversion_response(mid, fx['toversion'][mid])):
+                        pass
+                    vid = spider.assembler.version(mid, 0)['vid']
+                    response = xml_response(
+                        f'{SITE_URL}/down.php?mod=view&mid={mid}&vid={vid}&show=todownload', text,
+                        mid=mid, list_id=LIST_ID, version_vid=vid, version_index=0,
+                    )
+                    return lambda: list(spider.parse_download_ajax(response))
+                yield label, prepare
+
+
+FUNCTIONS = (
+    'parse_list', 'parse_detail', '_extract_metadata', '_extract_images', '_extract_intro',
+    '_parse_relative_time', 'parse_versions', 'parse_download_ajax',
+)
+
+
+def measure(bench, name, rounds):
+    cases = list(bench.cases(name))
+    if not cases:
+        return None
+    per_case = [[] for _ in cases]
+    for round_index in range(rounds + 1):
+        for samples, (_, prepare) in zip(per_case, cases):
+            fn = prepare()
+            # 计时期间关闭 GC，避免回收准备阶段产生的对象计入耗时
+            gc.disable()
+            started = time.perf_counter_ns()
+            fn()
+            elapsed = (time.perf_counter_ns() - started) / 1000
+            gc.enable()
+            if round_index:  # 第一轮为预热
+                samples.append(elapsed)
+
+    # 内存分配单独跑一轮（tracemalloc 会显著拖慢执行）
+    allocations = []
+    tracemalloc.start()
+    for _, prepare in cases:
+        fn = prepare()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        allocations.append((tracemalloc.get_traced_memory()[1] - base) / 1024)
+    tracemalloc.stop()
+
+    # 基线对比用各样本最快一次的中位数（min_us），受机器抖动的影响远小于全部计时的中位数
+    timings = sorted(x for samples in per_case for x in samples)
+    return {
+        'cases': len(cases),
+        'min_us': round(statistics.median(min(samples) for samples in per_case), 1),
+        'median_us': round(statistics.median(timings), 1),
+        'p90_us': round(timings[int(0.9 * (len(timings) - 1))], 1),
+        'alloc_kb': round(statistics.median(allocations), 1),
+    }
+
+
+def import_archive(directory, limit):
+    """从响应归档导入样本（按接口类别各取前 limit 个状态码 200 的响应）"""
+    from eyeuc.archive import ArchiveReader
+    from eyeuc.endpoints import DETAIL, LIST, TODOWNLOAD, TOVERSION, endpoint_class
+
+    reader = ArchiveReader(directory)
+    counts = {}
+    for entry in reader.entries:
+        url = entry.get('url') or ''
+        kind = endpoint_class(url)
+        if entry.get('status') != 200 or counts.get(kind, 0) >= limit:
+            continue
+        if kind == LIST:
+            match = re.search(r'/down/list/(\d+)/(\d+)', url)
+            name = f'list_{match.group(1)}_{match.group(2)}.html'
+        elif kind == DETAIL:
+            mid = re.search(r'/down/view/(\d+)', url).group(1)
+            name = f'detail_{mid}.html'
+        elif kind in (TOVERSION, TODOWNLOAD):
+            mid = re.search(r'mid=(\d+)', url).group(1)
+            vid = re.search(r'vid=(\d+)', url)
+            name = f'{kind}_{mid}' + (f'_{vid.group(1)}' if vid else '') + '.xml'
+        else:
+            continue
+        header, body = reader.get(entry['key'])
+        if any(k.lower() == 'content-encoding' for k in header['headers']):
+            continue  # 归档的是压缩前的原始响应，跳过压缩过的
+        (FIXTURE_DIR / name).write_bytes(body)
+        counts[kind] = counts.get(kind, 0) + 1
+        print(f"导入 {name}")
+    print(f"共导入 {sum(counts.values())} 个样本: {counts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析函数微基准（固定样本集 + 基线对比）')
+    parser.add_argument('--rounds', type=int, default=20, help='每个样本的计时轮数（默认 20）')
+    parser.add_argument('--only', help='只测试指定函数（逗号分隔）')
+    parser.add_argument('--save', help='保存结果作为基线（JSON）')
+    parser.add_argument('--baseline', help='与基线对比，超过阈值时以非零状态退出')
+    parser.add_argument('--threshold', type=float, default=0.2, help='回退阈值（默认 0.2 = 20%%）')
+    parser.add_argument('--import-archive', metavar='DIR', help='从响应归档导入样本后退出')
+    parser.add_argument('--limit', type=int, default=3, help='--import-archive 每类导入的数量（默认 3）')
+    args = parser.parse_args()
+
+    if args.import_archive:
+        import_archive(args.import_archive, args.limit)
+        return
+
+    names = [n.strip() for n in args.only.split(',')] if args.only else list(FUNCTIONS)
+    unknown = [n for n in names if n not in FUNCTIONS]
+    if unknown:
+        parser.error(f"未知函数: {', '.join(unknown)}（可选: {', '.join(FUNCTIONS)}）")
+
+    fixtures = load_fixtures()
+    print(f"样本: 列表页 {len(fixtures['list'])} / 详情页 {len(fixtures['detail'])} / "
+          f"toversion {len(fixtures['toversion'])} / todownload {len(fixtures['todownload'])}")
+    bench = Bench(build_spider(), fixtures)
+
+    results = {}
+    for name in names:
+        result = measure(bench, name, args.rounds)
+        if result is not None:
+            results[name] = result
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8')) if args.baseline else {}
+    regressions = []
+    header = f"\n{'函数':<22} {'样本':>4} {'最快 us':>10} {'中位数 us':>10} {'p90 us':>10} {'分配 KB':>9}"
+    if baseline:
+        header += f" {'基线 us':>10} {'变化':>8} {'基线 KB':>9}"
+    print(header)
+    for name, r in results.items():
+        line = (f"{name:<22} {r['cases']:>4} {r['min_us']:>10} {r['median_us']:>10} {r['p90_us']:>10}"
+                f" {r['alloc_kb']:>9}")
+        base = baseline.get(name)
+        if base:
+            change = (r['min_us'] - base['min_us']) / base['min_us']
+            line += f" {base['min_us']:>10} {change:>+7.1%} {base['alloc_kb']:>9}"
+            if change > args.threshold:
+                regressions.append(f"{name}: 耗时 {base['min_us']} → {r['min_us']} us（{change:+.0%}）")
+            if base['alloc_kb'] and (r['alloc_kb'] - base['alloc_kb']) / base['alloc_kb'] > args.threshold:
+                regressions.append(f"{name}: 内存 {base['alloc_kb']} → {r['alloc_kb']} KB")
+        print(line)
+
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(results, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+        print(f"\n结果已保存到 {args.save}")
+    if regressions:
+        print(f"\n❌ 超过阈值 {args.threshold:.0%} 的回退:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    if baseline:
+        print(f"\n✅ 没有超过 {args.threshold:.0%} 的回退")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+PerListJsonPipeline 写入吞吐量基准测试
+
+生成 N 个与 eyeuc_mods 输出结构相同的 item（带中文简介、图片、多分支下载），
+依次调用 process_item，直到 close_spider 完成（数据全部落盘）为止，统计：
+- 总耗时与 items/s（含关闭时等待写入线程写完）
+- reactor 线程耗时：所有 process_item 调用的累计时间（这部分会阻塞抓取）
+
+--baseline 指定一个 git 版本，用该版本的 eyeuc/pipelines.py 跑同样的负载作为对照。
+每个配置在单独的子进程中运行（reactor 不能重启）。
+
+用法：
+    python scripts/bench_pipeline_writer.py
+    python scripts/bench_pipeline_writer.py --items 1000,10000,100000 --baseline HEAD~1
+    python scripts/bench_pipeline_writer.py --format json --fsync batch
+    python scripts/bench_pipeline_writer.py --items 100000 --compression zstd
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from eyeuc.segments import iter_jsonl  # noqa: E402
+
+LIST_IDS = (182, 193, 207)
+
+
+def make_item(i, rng):
+    """与 parse_detail 输出结构相同的 item"""
+    mid = 30000 + i
+    list_id = LIST_IDS[i % len(LIST_IDS)]
+    return {
+        'list_id': list_id,
+        'game': '上古卷轴5：天际',
+        'category': '人物',
+        'title': f'作者{i % 97} / 高清人物美化整合包 第{i}版 / v{i % 10}.{i % 7}',
+        'cover_image': f'https://img.eyeuc.com/forum/{mid}/cover.jpg',
+        'images': [f'https://img.eyeuc.com/forum/{mid}/{n}.jpg' for n in range(rng.randint(2, 8))],
+        'intro': '本补丁替换了全部人物的面部贴图与身体网格，兼容主流框架。' * rng.randint(5, 40),
+        'metadata': {
+            'author': f'作者{i % 97}',
+            'publisher': '3DM',
+            'views': rng.randint(100, 100000),
+            'downloads': rng.randint(10, 50000),
+            'updated_at': '2025-10-17 12:00',
+            'tags': ['美化', '人物', '整合'],
+        },
+        'downloads': [
+            {
+                'vid': v,
+                'version': f'v{v}.0',
+                'size': f'{rng.randint(1, 900)} MB',
+                'url': f'https://bbs.eyeuc.com/down.php?mod=download&mid={mid}&vid={v}',
+                'note': '需要前置插件',
+            }
+            for v in range(1, rng.randint(2, 5))
+        ],
+        'detail_url': f'https://bbs.eyeuc.com/down/view/{mid}',
+        'list_url': f'https://bbs.eyeuc.com/down/list/{list_id}/1',
+    }
+
+
+def load_pipeline_class(rev):
+    """加载当前工作区或指定 git 版本的 PerListJsonPipeline"""
+    if not rev:
+        from eyeuc.pipelines import PerListJsonPipeline
+        return PerListJsonPipeline
+
+    source = subprocess.run(
+        ['git', 'show', f'{rev}:eyeuc/pipelines.py'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    path = Path(tempfile.mkdtemp()) / 'pipelines_baseline.py'
+    path.write_text(source, encoding='utf-8')
+    spec = importlib.util.spec_from_file_location('pipelines_baseline', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.PerListJsonPipeline
+
+
+class FakeSpider:
+    start_page = 1
+    end_page = None
+    worker_id = None
+
+    def __init__(self):
+        self.logger = logging.getLogger('bench')
+
+
+def run_once(args):
+    """子进程中运行一次，输出 JSON 结果"""
+    from scrapy.settings import Settings
+    from scrapy.utils.reactor import install_reactor
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    from twisted.internet import defer, task
+
+    rng = random.Random(7)
+    items = [make_item(i, rng) for i in range(args.items)]
+    output_dir = Path(tempfile.mkdtemp(prefix='eyeuc_bench_pipeline_'))
+    pipeline_cls = load_pipeline_class(args.rev)
+
+    settings = Settings({
+        'PER_LIST_OUTPUT_DIR': str(output_dir),
+        'PER_LIST_AS_JSONL': args.format == 'jsonl',
+        'PER_LIST_FSYNC': args.fsync,
+        'PER_LIST_COMPRESSION': args.compression,
+    })
+    crawler = type('Crawler', (), {'settings': settings})()
+    spider = FakeSpider()
+    result = {}
+
+    @defer.inlineCallbacks
+    def main(reactor):
+        pipeline = pipeline_cls.from_crawler(crawler)
+        pipeline.open_spider(spider)
+        started = time.perf_counter()
+        blocking = 0.0
+        waiting = []
+        for item in items:
+            t0 = time.perf_counter()
+            out = pipeline.process_item(item, spider)
+            blocking += time.perf_counter() - t0
+            if isinstance(out, defer.Deferred):
+                waiting.append(out)
+        if waiting:
+            yield defer.DeferredList(waiting)
+        t0 = time.perf_counter()
+        closed = pipeline.close_spider(spider)
+        blocking += time.perf_counter() - t0
+        if isinstance(closed, defer.Deferred):
+            yield closed
+        elapsed = time.perf_counter() - started
+
+        lines = 0
+        size = 0
+        for path in output_dir.iterdir():
+            size += path.stat().st_size
+            if args.format == 'jsonl':
+                lines += sum(1 for _ in iter_jsonl(path))
+            else:
+                with open(path, encoding='utf-8') as f:
+                    lines += len(json.load(f))
+        assert lines == args.items, f'输出 {lines} 个 item，应为 {args.items}'
+        result.update(
+            items=args.items, seconds=round(elapsed, 4), items_per_sec=round(args.items / elapsed),
+            reactor_ms=round(blocking * 1000, 1), bytes=size,
+        )
+
+    try:
+        task.react(lambda reactor: main(reactor))
+    except SystemExit:
+        pass
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        print(json.dumps(result))
+
+
+def spawn(args, n, rev):
+    cmd = [sys.executable, __file__, '--run', '--items', str(n), '--format', args.format, '--fsync', args.fsync]
+    if args.compression:
+        cmd += ['--compression', args.compression]
+    if rev:
+        cmd += ['--rev', rev]
+    out = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True)
+    lines = [line for line in out.stdout.splitlines() if line.startswith('{')]
+    if out.returncode or not lines or lines[-1] == '{}':
+        sys.stderr.write(out.stderr)
+        raise SystemExit(f'运行失败（rev={rev or "工作区"}, items={n}）')
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PerListJsonPipeline 写入吞吐量基准测试')
+    parser.add_argument('--items', default='1000,10000,100000', help='item 数量，逗号分隔')
+    parser.add_argument('--format', choices=('jsonl', 'json'), default='jsonl')
+    parser.add_argument('--fsync', choices=('none', 'batch', 'close'), default='close')
+    parser.add_argument('--compression', choices=('gzip', 'zstd'), help='JSONL 段压缩（修改前的版本忽略此项）')
+    parser.add_argument('--baseline', help='对照的 git 版本（如 HEAD~1）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个配置运行次数（取最快一次）')
+    parser.add_argument('--run', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--rev', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        args.items = int(args.items)
+        run_once(args)
+        return
+
+    variants = [('当前', None)] + ([(args.baseline, args.baseline)] if args.baseline else [])
+    print(f"格式: {args.format}  fsync: {args.fsync}  压缩: {args.compression or '无'}  每个配置运行 {args.repeat} 次取最快")
+    print(f"{'版本':<10}{'items':>9}{'总耗时(s)':>12}{'items/s':>11}{'reactor(ms)':>13}{'大小(MB)':>11}")
+    for n in [int(x) for x in args.items.split(',')]:
+        for label, rev in variants:
+            runs = [spawn(args, n, rev) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r['seconds'])
+            print(f"{label:<10}{n:>9}{best['seconds']:>12.3f}{best['items_per_sec']:>11,}"
+                  f"{min(r['reactor_ms'] for r in runs):>13.1f}{best['bytes'] / 1e6:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+RandomDelayMiddleware 基准测试：阻塞 time.sleep vs 异步延迟
+
+在本地启动一个桩服务器（固定延迟响应），分别用旧的阻塞实现和当前的
+异步实现跑同一批请求，输出 requests/sec。除延迟中间件外，其余配置
+（CONCURRENT_REQUESTS、DOWNLOAD_DELAY、AutoThrottle、RANDOM_DELAY_*）均沿用
+eyeuc/settings.py。
+
+单一 slot 的吞吐受 DOWNLOAD_DELAY/AutoThrottle 限制，两种实现差别不大；
+阻塞实现的问题在多 slot 时暴露：time.sleep 冻结整个 reactor，所有 slot
+被串行化。--hosts 把请求分散到 127.0.0.1..127.0.0.N（每个 IP 一个 slot）。
+
+用法：
+    python scripts/bench_random_delay.py                  # 默认 200 个请求
+    python scripts/bench_random_delay.py --requests 500 --latency 0.1 --hosts 1
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+VARIANTS = {
+    'blocking': 'scripts.bench_random_delay.BlockingRandomDelayMiddleware',
+    'async': 'eyeuc.middlewares.RandomDelayMiddleware',
+}
+
+
+class BlockingRandomDelayMiddleware:
+    """旧实现（对照组）：在 reactor 线程中 time.sleep"""
+
+    def __init__(self, delay_range):
+        self.delay_range = delay_range
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        delay_min = crawler.settings.getfloat('RANDOM_DELAY_MIN', 0.1)
+        delay_max = crawler.settings.getfloat('RANDOM_DELAY_MAX', 0.5)
+        return cls((delay_min, delay_max))
+
+    def process_request(self, request, spider):
+        time.sleep(random.uniform(*self.delay_range))
+        return None
+
+
+def start_stub_server(latency):
+    """启动桩服务器，每个响应固定等待 latency 秒"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            body = b'<html><body><div class="modlist"><ul><li>ok</li></ul></div></body></html>'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_variant(variant, port, n_requests, n_hosts):
+    """子进程中运行：每个 reactor 只能启动一次"""
+    import scrapy
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    class BenchSpider(scrapy.Spider):
+        name = 'bench_random_delay'
+
+        def start_requests(self):
+            for i in range(n_requests):
+                host = f'127.0.0.{i % n_hosts + 1}'
+                yield scrapy.Request(f'http://{host}:{port}/down/list/182/{i}', dont_filter=True)
+
+        def parse(self, response):
+            return None
+
+    os.chdir(PROJECT_ROOT)
+    settings = get_project_settings()
+    middlewares = dict(settings.getdict('DOWNLOADER_MIDDLEWARES'))
+    middlewares.pop('eyeuc.middlewares.RandomDelayMiddleware', None)
+    middlewares[VARIANTS[variant]] = 100
+    settings.set('DOWNLOADER_MIDDLEWARES', middlewares)
+    settings.set('SPIDER_MIDDLEWARES', {})
+    settings.set('ITEM_PIPELINES', {})
+    settings.set('LOG_LEVEL', 'WARNING')
+    settings.set('TELNETCONSOLE_ENABLED', False)
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(BenchSpider)
+    started = time.perf_counter()
+    process.crawl(crawler)
+    process.start()
+    elapsed = time.perf_counter() - started
+
+    responses = crawler.stats.get_value('downloader/response_count', 0)
+    print(json.dumps({
+        'variant': variant,
+        'responses': responses,
+        'elapsed': round(elapsed, 3),
+        'rps': round(responses / elapsed, 2) if elapsed else 0,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RandomDelayMiddleware 基准测试')
+    parser.add_argument('--requests', type=int, default=200, help='每组请求数（默认 200）')
+    parser.add_argument('--latency', type=float, default=0.05, help='桩服务器响应延迟秒数（默认 0.05）')
+    parser.add_argument('--hosts', type=int, default=4, help='分散到多少个 slot（默认 4）')
+    parser.add_argument('--variant', choices=sorted(VARIANTS), help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.port, args.requests, args.hosts)
+        return
+
+    server = start_stub_server(args.latency)
+    port = server.server_address[1]
+    print(f"桩服务器: 端口 {port}（响应延迟 {args.latency}s），{args.hosts} 个 slot，每组 {args.requests} 个请求")
+
+    results = []
+    for variant in ('blocking', 'async'):
+        output = subprocess.run(
+            [sys.executable, __file__, '--variant', variant, '--port', str(port),
+             '--requests', str(args.requests), '--hosts', str(args.hosts)],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        print(f"  {variant:<9} {result['responses']} 响应 / {result['elapsed']:.2f}s = {result['rps']:.2f} req/s")
+
+    server.shutdown()
+    if results[0]['rps']:
+        print(f"提升: {results[1]['rps'] / results[0]['rps']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+todownload 片段解析基准测试
+
+对比两种实现解析同一批生成的 todownload 片段（带大段分支说明、多个下载项，
+部分下载项没有大小）：
+- 旧实现：CDATA 正则 + 对整个片段分别 re.findall showprotocol / 文件名 / 大小，按列表下标配对
+- 新实现：eyeuc.todownload.parse_todownload 单次扫描，每个下载项独立成记录
+
+输出每个片段的平均耗时，以及旧实现配错大小的记录数。
+
+用法：
+    python scripts/bench_todownload_parser.py
+    python scripts/bench_todownload_parser.py --fragments 500 --items 40 --intro-kb 64
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from eyeuc.todownload import download_entries, parse_todownload
+
+
+def fragment(n, items, intro_kb):
+    intro = '<p>' + '分支更新说明 changelog line. ' * 40 + '</p>'
+    intro *= max(1, intro_kb * 1024 // len(intro.encode('utf-8')))
+    parts = [f'<div class="veritem-name"><span>V{n}</span></div>',
+             f'<div class="veritem-content">{intro}</div><div class="veritem-footer"></div>']
+    for i in range(items):
+        # 每 5 个下载项有一个没有大小
+        size = '' if i % 5 == 2 else f'<span>{i + 1}.5 MB</span>'
+        parts.append(
+            f'<div class="veritem-download-item"><a href="javascript:;" '
+            f'onclick="showprotocol(\'down.php?mod=buy&amp;mid={n}&amp;fileid={n * 1000 + i}\')">'
+            f'<em class="bupload"><i class="iconfont"></i>&nbsp;file_{n}_{i}.zip</em></a>{size}</div>'
+        )
+    return f'<?xml version="1.0" encoding="utf-8"?><root><![CDATA[{"".join(parts)}]]></root>'
+
+
+def legacy_parse(html_content):
+    """旧实现（分支说明 + 站内附件路径）"""
+    cdata_match = re.search(r'<!\[CDATA\[(.*?)\]\]>', html_content, re.DOTALL)
+    if cdata_match:
+        html_content = cdata_match.group(1)
+    re.search(r'<div class="veritem-content">(.*?)</div>(?:\s*</div>)?\s*<div class="veritem-footer">', html_content, re.DOTALL)
+    version = ''
+    version_span = re.search(r'<div class="veritem-name">.*?<span>([^<]+)</span>', html_content, re.DOTALL)
+    if version_span:
+        version = version_span.group(1).strip()
+    file_matches = re.findall(r'showprotocol\([\'"]([^\'"]+)[\'"]', html_content)
+    filename_matches = re.findall(
+        r'<em[^>]*class="bupload"[^>]*>.*?&nbsp;([^<]+?\.(?:iff|rar|zip|7z|png|jpg))</em>', html_content, re.IGNORECASE
+    )
+    html_content.count("showWindow('login'")
+    html_content.count('veritem-download-item')
+    size_matches = re.findall(r'<span>(\d+\.?\d*\s*(?:KB|MB|GB))</span>', html_content, re.IGNORECASE)
+    downloads = []
+    for idx, buy_url in enumerate(file_matches):
+        fileid_match = re.search(r'fileid=(\d+)', buy_url)
+        if fileid_match:
+            fileid = fileid_match.group(1)
+            downloads.append({
+                'type': 'internal',
+                'fileid': fileid,
+                'filename': filename_matches[idx] if idx < len(filename_matches) else f'file_{fileid}',
+                'size': size_matches[idx] if idx < len(size_matches) else '',
+                'version': version,
+            })
+    return downloads
+
+
+def new_parse(text):
+    return download_entries(parse_todownload(text), None, None)
+
+
+def expected_size(fileid):
+    i = int(fileid) % 1000
+    return '' if i % 5 == 2 else f'{i + 1}.5 MB'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='todownload 片段解析基准测试')
+    parser.add_argument('--fragments', type=int, default=200, help='片段数量（默认 200）')
+    parser.add_argument('--items', type=int, default=20, help='每个片段的下载项数量（默认 20）')
+    parser.add_argument('--intro-kb', type=int, default=32, help='分支说明大小 KB（默认 32）')
+    args = parser.parse_args()
+
+    texts = [fragment(n, args.items, args.intro_kb) for n in range(1, args.fragments + 1)]
+    print(f"片段: {len(texts)} 个，每个 {args.items} 个下载项，平均 {sum(len(t) for t in texts) // len(texts) // 1024} KB")
+
+    print(f"\n{'实现':<8} {'ms/片段':>10} {'记录数':>8} {'大小错配':>8}")
+    for name, parse in (('旧实现', legacy_parse), ('新实现', new_parse)):
+        started = time.perf_counter()
+        results = [parse(text) for text in texts]
+        elapsed = (time.perf_counter() - started) / len(texts) * 1000
+        records = [d for downloads in results for d in downloads]
+        wrong = sum(1 for d in records if d['size'] != expected_size(d['fileid']))
+        print(f"{name:<8} {elapsed:>10.3f} {len(records):>8} {wrong:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+todownload 片段解析的标准输出校验
+
+scripts/golden/todownload/ 下每个 <name>.xml 是一个 todownload 响应样本，
+<name>.json 是它的标准解析结果（版本名、分支描述、下载记录）。
+本脚本用 eyeuc.todownload 重新解析所有样本并与标准结果比较，不一致时列出差异并以非零状态退出。
+
+新增样本：抓取时设置 TODOWNLOAD_RECORD_DIR 保存原始响应，把需要的文件复制到
+scripts/golden/todownload/，确认解析结果正确后用 --update 生成 .json。
+
+用法：
+    python scripts/check_todownload_golden.py
+    python scripts/check_todownload_golden.py --update            # 重新生成所有 .json
+    python scripts/check_todownload_golden.py --update empty      # 只更新指定样本
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from eyeuc.todownload import download_entries, parse_todownload
+
+GOLDEN_DIR = Path(__file__).resolve().parent / 'golden' / 'todownload'
+
+# 样本统一使用的 mid / vid（下载记录中会带上）
+MID = '31731'
+VID = '222031'
+
+
+def parse_sample(path):
+    fragment = parse_todownload(path.read_text(encoding='utf-8'))
+    return {
+        'version': fragment.version,
+        'content_html': fragment.content_html,
+        'empty': fragment.empty,
+        'downloads': download_entries(fragment, MID, VID),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='todownload 片段解析的标准输出校验')
+    parser.add_argument('--update', action='store_true', help='用当前解析结果覆盖标准输出')
+    parser.add_argument('names', nargs='*', help='只处理指定样本（默认全部）')
+    args = parser.parse_args()
+
+    samples = sorted(GOLDEN_DIR.glob('*.xml'))
+    if args.names:
+        samples = [p for p in samples if p.stem in args.names]
+    if not samples:
+        print(f"❌ 没有找到样本: {GOLDEN_DIR}")
+        sys.exit(1)
+
+    failures = 0
+    for path in samples:
+        actual = parse_sample(path)
+        expected_path = path.with_suffix('.json')
+        if args.update:
+            expected_path.write_text(json.dumps(actual, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+            print(f"已更新 {expected_path.name}")
+            continue
+        if not expected_path.exists():
+            failures += 1
+            print(f"❌ {path.stem}: 缺少标准输出 {expected_path.name}（用 --update 生成）")
+            continue
+        expected = json.loads(expected_path.read_text(encoding='utf-8'))
+        if actual != expected:
+            failures += 1
+            print(f"❌ {path.stem}")
+            for key in expected:
+                if actual.get(key) != expected[key]:
+                    print(f"  {key}:\n    标准: {expected[key]}\n    实际: {actual.get(key)}")
+
+    if args.update:
+        return
+    if failures:
+        print(f"\n❌ {failures}/{len(samples)} 个样本与标准输出不一致")
+        sys.exit(1)
+    print(f"✅ {len(samples)} 个样本全部一致")
+
+
+if __name__ == '__main__':
+    main()
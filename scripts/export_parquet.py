@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+把 per_list_output 中的 JSONL（含压缩段）/ JSON 数组文件转换为列式 Parquet 表
+
+表结构见 eyeuc/columnar.py（lists / mods / versions / downloads / images，与 schema.sql 对应），
+抓取时也可以设置 COLUMNAR_EXPORT_DIR 由 ColumnarExportPipeline 直接导出。
+同一 mid 在多个文件中出现时只保留第一次（与 merge_batches.py 一致）。
+
+--summary 对导出目录做按游戏的聚合（资源数、浏览量、下载量、下载项数），
+只读取需要的列；加上 --against 会对同一批 JSON 文件做完整解码聚合，对比耗时。
+
+用法：
+    python scripts/export_parquet.py "per_list_output/*.jsonl*" --output columnar_output
+    python scripts/export_parquet.py --summary columnar_output
+    python scripts/export_parquet.py --summary columnar_output --against "per_list_output/*.jsonl*"
+"""
+
+import argparse
+import glob
+import json
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from eyeuc.columnar import ColumnarWriter, parse_int  # noqa: E402
+from eyeuc.segments import iter_jsonl  # noqa: E402
+
+
+def iter_items(path):
+    """逐个读取 item（JSONL 和压缩段按行流式读取，JSON 数组整体解析）"""
+    if str(path).endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            yield from json.load(f)
+    else:
+        yield from iter_jsonl(path)
+
+
+def export(files, output, row_group_size, compression):
+    name = f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    writer = ColumnarWriter(output, name, row_group_size, compression)
+    started = time.perf_counter()
+    total = 0
+    for path in files:
+        count = 0
+        for item in iter_items(path):
+            count += writer.add(item)
+            writer.flush_ready()
+        total += count
+        print(f"  {Path(path).name}: {count} items")
+    paths = writer.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"\n导出 {total} items（跳过 {writer.skipped} 个重复或无效 item），用时 {elapsed:.2f}s")
+    for table, path in paths.items():
+        print(f"  {table:<10}{writer.counts[table]:>9} 行  {path.stat().st_size / 1e6:>8.2f} MB  {path}")
+
+
+def summary_columnar(directory):
+    """按游戏聚合：只扫描 mods 的 game/views/downloads 列和 downloads 的 mod_id 列"""
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    root = Path(directory)
+    mods = ds.dataset(root / 'mods', format='parquet').to_table(columns=['mid', 'game', 'views', 'downloads'])
+    files = ds.dataset(root / 'downloads', format='parquet').to_table(columns=['mod_id'])
+    per_mod = files.group_by('mod_id').aggregate([('mod_id', 'count')])
+    lookup = pc.index_in(mods['mid'], value_set=per_mod['mod_id'])
+    file_counts = pc.fill_null(pc.take(per_mod['mod_id_count'], lookup), 0)
+    mods = mods.append_column('files', file_counts)
+    result = mods.group_by('game').aggregate([
+        ('mid', 'count'), ('views', 'sum'), ('downloads', 'sum'), ('files', 'sum'),
+    ])
+    return {
+        row['game']: (row['mid_count'], row['views_sum'] or 0, row['downloads_sum'] or 0, row['files_sum'] or 0)
+        for row in result.to_pylist()
+    }
+
+
+def summary_json(files):
+    """同样的聚合，逐个解码 JSON item"""
+    totals = defaultdict(lambda: [0, 0, 0, 0])
+    seen = set()
+    for path in files:
+        for item in iter_items(path):
+            mid = item.get('mid') or item.get('detail_url')
+            if mid in seen:
+                continue
+            seen.add(mid)
+            md = item.get('metadata') or {}
+            row = totals[item.get('game') or f"list_{item.get('list_id')}"]
+            row[0] += 1
+            row[1] += parse_int(md.get('views')) or 0
+            row[2] += parse_int(md.get('downloads')) or 0
+            versions = item.get('versions')
+            if versions is None:
+                row[3] += len(item.get('downloads') or [])
+            else:
+                row[3] += sum(len(v.get('downloads') or []) for v in versions)
+    return {game: tuple(row) for game, row in totals.items()}
+
+
+def print_summary(result):
+    print(f"{'游戏':<24}{'资源数':>8}{'浏览量':>14}{'下载量':>14}{'下载项':>9}")
+    for game, (mods, views, downloads, files) in sorted(result.items(), key=lambda kv: -kv[1][2]):
+        print(f"{game[:24]:<24}{mods:>8}{views:>14,}{downloads:>14,}{files:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='per_list_output → Parquet 列式表')
+    parser.add_argument('pattern', nargs='?', help='输入文件 glob（JSONL 或 JSON 数组）')
+    parser.add_argument('--output', default='columnar_output', help='输出目录（默认：columnar_output）')
+    parser.add_argument('--row-group-size', type=int, default=10000, help='每个 row group 的行数')
+    parser.add_argument('--compression', default='zstd', help='压缩算法（默认：zstd）')
+    parser.add_argument('--summary', metavar='DIR', help='对导出目录做按游戏的聚合')
+    parser.add_argument('--against', metavar='GLOB', help='与 --summary 一起使用：对 JSON 文件做同样的聚合并对比耗时')
+    args = parser.parse_args()
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("❌ 缺少依赖：pip install pyarrow")
+        sys.exit(1)
+
+    if args.summary:
+        started = time.perf_counter()
+        result = summary_columnar(args.summary)
+        columnar_seconds = time.perf_counter() - started
+        print_summary(result)
+        print(f"\n列式扫描: {columnar_seconds * 1000:.1f} ms")
+        if args.against:
+            started = time.perf_counter()
+            expected = summary_json(sorted(glob.glob(args.against)))
+            json_seconds = time.perf_counter() - started
+            print(f"JSON 解码: {json_seconds * 1000:.1f} ms（{json_seconds / columnar_seconds:.1f}x）")
+            if expected != result:
+                print("⚠️  两种方式的聚合结果不一致")
+                sys.exit(1)
+        return
+
+    if not args.pattern:
+        parser.error('需要输入文件 glob 或 --summary')
+    files = sorted(glob.glob(args.pattern))
+    if not files:
+        print(f"❌ 未找到匹配的文件: {args.pattern}")
+        sys.exit(1)
+    print(f"📁 找到 {len(files)} 个文件")
+    export(files, args.output, args.row_group_size, args.compression)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@
 EyeUC JSONL → MySQL 导入脚本
 
 功能：
-- 支持 JSONL 和 JSON 数组格式
+- 支持 JSONL、JSON 数组和 gzip / zstd 压缩的 JSONL 段（.jsonl.gz / .jsonl.zst，流式读取）
 - 支持目录 glob 批量导入
 - 幂等导入（ON DUPLICATE KEY UPDATE）
 - 批量提交（每 200 条）
@@ -15,10 +15,10 @@ EyeUC JSONL → MySQL 导入脚本
   python scripts/import_eyeuc_jsonl_to_mysql.py per_list_output/eyeuc_list193_merged_*.jsonl
   
   # 全量替换 - 删除所有旧数据，导入新数据（推荐用于定时任务）
-  FULL_REPLACE=true python scripts/import_eyeuc_jsonl_to_mysql.py "per_list_output/*.jsonl"
+  FULL_REPLACE=true python scripts/import_eyeuc_jsonl_to_mysql.py "per_list_output/*.jsonl*"
   
   # 全量替换 + 禁用清理（用于调试）
-  FULL_REPLACE=true CLEANUP=false python scripts/import_eyeuc_jsonl_to_mysql.py "per_list_output/*.jsonl"
+  FULL_REPLACE=true CLEANUP=false python scripts/import_eyeuc_jsonl_to_mysql.py "per_list_output/*.jsonl*"
 
 环境变量：
   MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE - 数据库连接
@@ -34,6 +34,9 @@ import time
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from eyeuc.segments import iter_jsonl  # noqa: E402
+
 try:
     import pymysql
 except ImportError:
@@ -311,26 +314,16 @@ def upsert_versions_and_downloads(conn, mod_id, versions):
 
 
 def iter_items_from_file(path):
-    """从文件中迭代 items（支持 JSONL 和 JSON 数组）"""
+    """从文件中迭代 items（支持 JSONL、JSON 数组和压缩段；JSONL 逐行流式读取，跳过段清单）"""
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-        
-        if not content:
-            return
-        
-        # 判断格式
-        if content.startswith('['):
+        if str(path).endswith('.json'):
             # JSON 数组
-            data = json.loads(content)
-            for item in data:
-                yield item
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+            if content:
+                yield from json.loads(content)
         else:
-            # JSONL
-            for line in content.split('\n'):
-                line = line.strip()
-                if line:
-                    yield json.loads(line)
+            yield from iter_jsonl(path)
     
     except Exception as e:
         print(f"  ❌ 读取文件失败: {e}")
@@ -505,7 +498,7 @@ def main():
         print(__doc__)
         print("\n❌ 缺少参数")
         print("\n用法: python scripts/import_eyeuc_jsonl_to_mysql.py <glob_pattern>")
-        print('\n示例: python scripts/import_eyeuc_jsonl_to_mysql.py "per_list_output/eyeuc_list193_*.jsonl"')
+        print('\n示例: python scripts/import_eyeuc_jsonl_to_mysql.py "per_list_output/eyeuc_list193_*.jsonl*"')
         sys.exit(1)
     
     glob_pattern = sys.argv[1]
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+本地模拟 EyeUC 站点（吞吐量基准测试用，不访问 bbs.eyeuc.com）
+
+提供 spider 访问的四类接口：
+- /down/list/{list_id}/{page}                        列表页（带分页条，超出页数时为空列表）
+- /down/view/{mid}                                   详情页
+- /down.php?mod=view&mid=..&show=toversion           分支列表片段
+- /down.php?mod=view&mid=..&vid=..&show=todownload   下载列表片段
+
+页面内容默认按 mid 确定性生成（列表数、页数、每页资源数、分支数、下载项数可配置），
+也可以用 --archive 指向响应归档（ARCHIVE_DIR），归档中有的请求返回录制的响应。
+
+可注入的故障：
+- 延迟分布（--latency，可按接口类别分别设置）：
+    fixed:0.05 / uniform:0.02,0.2 / normal:0.1,0.03 / lognormal:0.1,0.5（中位数, sigma）/ exp:0.1（均值）
+- 随机 5xx（--error-rate）
+- 周期性状态码突发（--burst 状态码:周期秒:持续秒[:比例]，如 429:30:5 表示每 30 秒的前 5 秒返回 429）
+- 登录跳转（--login-rate，302 到 member.php?mod=logging&action=login）
+
+GET /__stats 返回按接口类别的请求数、状态码分布和发送字节数（JSON）。
+
+用法：
+    python scripts/mock_eyeuc_server.py --port 8800
+    python scripts/mock_eyeuc_server.py --lists 182,193 --pages 20 --branches 1-4 \\
+        --latency lognormal:0.15,0.4 --latency todownload=uniform:0.02,0.08 \\
+        --error-rate 0.01 --burst 429:30:3 --login-rate 0.002
+    scrapy crawl eyeuc_mods -a list_ids=182 -s SITE_URL=http://127.0.0.1:8800
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from eyeuc.endpoints import ENDPOINT_CLASSES, endpoint_class
+
+SITE_URL = 'https://bbs.eyeuc.com'
+LOGIN_PATH = '/member.php?mod=logging&action=login'
+
+
+def chrome(blocks):
+    """论坛页头/页脚/侧栏（与提取无关的区域，控制页面大小）"""
+    links = ''.join(f'<li><a href="/forum-{i}.html" title="版块 {i}">版块 {i}</a></li>' for i in range(20))
+    return ''.join(f'<div class="nav nav-{b}"><ul>{links}</ul></div>' for b in range(blocks))
+
+
+class SyntheticSite:
+    """按 mid 确定性生成的站点内容"""
+
+    def __init__(self, lists, pages, per_page, branches, files, chrome_blocks):
+        self.lists = set(lists)
+        self.pages = pages
+        self.per_page = per_page
+        self.min_branches, self.max_branches = branches
+        self.files = files
+        self.chrome = chrome(chrome_blocks)
+
+    def mid(self, list_id, page, index):
+        return list_id * 100000 + (page - 1) * self.per_page + index
+
+    def branch_count(self, mid):
+        return self.min_branches + mid % (self.max_branches - self.min_branches + 1)
+
+    def list_page(self, list_id, page):
+        if list_id not in self.lists:
+            return None
+        cards = []
+        if page <= self.pages:
+            for i in range(self.per_page):
+                mid = self.mid(list_id, page, i)
+                cards.append(
+                    f'<li><div class="modpic"><a href="/down/view/{mid}"><img data-original="/data/cover/{mid}.jpg/fw_285"></a></div>'
+                    f'<h3><a href="/down/view/{mid}" title="Mod {mid}">Mod {mid}</a></h3>'
+                    f'<span title="2025-10-{1 + mid % 28:02d} 12:00">{mid % 30} 天前</span><em>{mid % 997}</em></li>'
+                )
+        pager = ''.join(f'<a href="/down/list/{list_id}/{p}">{p}</a>' for p in sorted({1, 2, 3, self.pages}))
+        return (
+            f'<html><head><title>NBA2K25 资源 - EYE资源中心</title></head><body><div id="hd">{self.chrome}</div>'
+            f'<div class="crumb"><a href="/">资源中心</a> &gt; <a href="/down/list/{list_id}">NBA 2K25</a></div>'
+            f'<h1>NBA 2K25</h1><div class="modlist"><ul>{"".join(cards)}</ul></div>'
+            f'<div class="pg">{pager}</div><div id="ft">{self.chrome}</div></body></html>'
+        )
+
+    def detail_page(self, mid):
+        images = ''.join(f'<img data-original="/data/img/{mid}_{i}.jpg/fh_140" src="/static/loading_blue.gif">' for i in range(6))
+        return (
+            f'<html><head><title>Mod {mid}_NBA2K25照片 - EYE资源中心</title>'
+            '<meta name="keywords" content="NBA2K25资源下载,NBA2K25照片,球衣"></head><body>'
+            f'<div id="hd">{self.chrome}</div>'
+            f'<h1 id="title">author / <span>Mod {mid}</span> / v1</h1>'
+            f'<div class="top-right-info"><span><a>查看</a><em>{mid % 5000}</em></span>'
+            f'<span><a>下载</a><em>{mid % 700}</em></span><span><a>喜欢</a><em>{mid % 50}</em></span></div>'
+            '<div class="uploadinfo"><ul>'
+            '<li><p class="custom-tt">当前版本最后更新</p><span title="2025-10-01 10:00">3 天前</span></li>'
+            '<li><p class="custom-tt">最后更新时间</p><p>2025-10-02 10:00</p></li>'
+            '<li><p class="custom-tt">资源创建时间</p><span>2025-01-01 10:00</span></li>'
+            '<li><p class="custom-tt">资源作者</p><a href="/u/1">author</a></li>'
+            '<li><p class="custom-tt">资源发布者</p><a href="/u/2">publisher</a></li>'
+            '</ul></div>'
+            f'<div id="imglist">{images}</div>'
+            f'<div class="view-message"><div class="markdown-body"><p>Intro <b>{mid}</b></p>'
+            f'<p>{"资源说明 description. " * 40}</p><img src="/data/b_{mid}.png"></div></div>'
+            f'<div id="ft">{self.chrome}</div>'
+            f'<script>var _data = {{"mid": "{mid}", "vid": "{mid}0", "formhash": "98e0550f"}};</script>'
+            '</body></html>'
+        )
+
+    def toversion(self, mid):
+        items = []
+        for b in range(self.branch_count(mid)):
+            default = '<i>默认分支</i>' if b == 0 else ''
+            items.append(
+                f'<div class="verlist"><h4><a href="/down/view/{mid}/{mid}{b}">V{b} 版本{default}</a></h4>'
+                f'<div class="verlist-note"> 分支说明 {b} </div><div class="verlist-info">'
+                f'<em><i class="iconfont">&#xe67d;</i><span title="2025-10-{1 + b:02d} 11:00">昨天 11:00</span></em>'
+                f'<em><i class="iconfont">&#xe636;</i><span>{b * 10}</span></em>'
+                f'<em><i class="iconfont">&#xe893;</i><span>{b * 3}</span></em></div></div>'
+            )
+        return f'<?xml version="1.0" encoding="utf-8"?><root><![CDATA[{"".join(items)}]]></root>'
+
+    def todownload(self, mid, vid):
+        items = ''.join(
+            f'<div class="veritem-download-item"><a href="javascript:;" '
+            f'onclick="showprotocol(\'down.php?mod=buy&amp;mid={mid}&amp;fileid={vid}{i}\')">'
+            f'<em class="bupload"><i class="iconfont"></i>&nbsp;file_{vid}_{i}.zip</em></a><span>{i + 1}.5 MB</span></div>'
+            for i in range(self.files)
+        )
+        return (
+            f'<?xml version="1.0" encoding="utf-8"?><root><![CDATA[<div class="veritem-name"><span>V{vid}</span></div>'
+            f'<div class="veritem-content"><p>{"分支更新说明. " * 20}</p></div><div class="veritem-footer"></div>'
+            f'{items}]]></root>'
+        )
+
+    def render(self, path, query):
+        """(状态码, content-type, body)"""
+        match = re.match(r'/down/list/(\d+)/(\d+)$', path)
+        if match:
+            html = self.list_page(int(match.group(1)), int(match.group(2)))
+            return (200, 'text/html', html) if html is not None else (404, 'text/html', '<html>404</html>')
+        match = re.match(r'/down/view/(\d+)$', path)
+        if match:
+            return 200, 'text/html', self.detail_page(int(match.group(1)))
+        if path == '/down.php' and query.get('mod') == ['view']:
+            mid = query.get('mid', ['0'])[0]
+            if query.get('show') == ['toversion']:
+                return 200, 'text/xml', self.toversion(int(mid))
+            if query.get('show') == ['todownload']:
+                return 200, 'text/xml', self.todownload(mid, query.get('vid', ['0'])[0])
+        if path == '/member.php':
+            return 200, 'text/html', '<html><head><title>登录 - EYE资源中心</title></head><body><form id="loginform"></form></body></html>'
+        return 404, 'text/html', '<html>404</html>'
+
+
+def parse_latency(spec):
+    """延迟分布描述 → 采样函数（秒）"""
+    kind, _, params = spec.partition(':')
+    values = [float(v) for v in params.split(',')] if params else []
+    samplers = {
+        'fixed': lambda rng: values[0],
+        'uniform': lambda rng: rng.uniform(values[0], values[1]),
+        'normal': lambda rng: max(0.0, rng.gauss(values[0], values[1])),
+        'lognormal': lambda rng: rng.lognormvariate(math.log(values[0]), values[1]),
+        'exp': lambda rng: rng.expovariate(1 / values[0]),
+    }
+    if kind not in samplers:
+        raise ValueError(f'未知的延迟分布: {spec}')
+    return samplers[kind]
+
+
+def parse_burst(spec):
+    parts = spec.split(':')
+    status, period, duration = int(parts[0]), float(parts[1]), float(parts[2])
+    ratio = float(parts[3]) if len(parts) > 3 else 1.0
+    return status, period, duration, ratio
+
+
+class FaultModel:
+    """延迟 / 错误 / 突发 / 登录跳转注入"""
+
+    def __init__(self, latency, error_rate, bursts, login_rate, seed):
+        self.latency = latency  # {接口类别或 'default': 采样函数}
+        self.error_rate = error_rate
+        self.bursts = bursts
+        self.login_rate = login_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+
+    def delay(self, endpoint):
+        sampler = self.latency.get(endpoint) or self.latency.get('default')
+        if sampler is None:
+            return 0.0
+        with self.lock:
+            return sampler(self.rng)
+
+    def fault(self, endpoint):
+        """要注入的状态码（None 为正常响应）"""
+        elapsed = time.monotonic() - self.started
+        with self.lock:
+            for status, period, duration, ratio in self.bursts:
+                if elapsed % period < duration and self.rng.random() < ratio:
+                    return status
+            if self.error_rate and self.rng.random() < self.error_rate:
+                return self.rng.choice((500, 502, 503))
+            if self.login_rate and endpoint != 'other' and self.rng.random() < self.login_rate:
+                return 302
+        return None
+
+
+class ServerStats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.statuses = defaultdict(Counter)
+        self.bytes_sent = 0
+        self.recorded = 0
+
+    def record(self, endpoint, status, size, recorded=False):
+        with self.lock:
+            self.requests[endpoint] += 1
+            self.statuses[endpoint][status] += 1
+            self.bytes_sent += size
+            self.recorded += recorded
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'requests': dict(self.requests),
+                'statuses': {k: {str(s): n for s, n in v.items()} for k, v in self.statuses.items()},
+                'bytes_sent': self.bytes_sent,
+                'recorded': self.recorded,
+            }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    site = None
+    faults = None
+    stats = None
+    archive = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/__stats':
+            self._send(200, 'application/json', json.dumps(self.stats.snapshot()).encode('utf-8'))
+            return
+
+        endpoint = endpoint_class(self.path)
+        delay = self.faults.delay(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+        fault = self.faults.fault(endpoint)
+        if fault == 302:
+            self._send(302, 'text/html', b'', {'Location': LOGIN_PATH}, endpoint=endpoint)
+            return
+        if fault is not None:
+            self._send(fault, 'text/html', f'<html>{fault}</html>'.encode('utf-8'), {'Retry-After': '1'},
+                       endpoint=endpoint)
+            return
+
+        if self.archive is not None:
+            record = self.archive.get(f'GET {SITE_URL}{self.path}')
+            if record is not None:
+                header, body = record
+                headers = {k: v[0] for k, v in header['headers'].items()
+                           if k.lower() not in ('content-length', 'transfer-encoding', 'connection')}
+                self._send(header['status'], None, body, headers, endpoint=endpoint, recorded=True)
+                return
+
+        url = urlsplit(self.path)
+        status, content_type, text = self.site.render(url.path, parse_qs(url.query))
+        self._send(status, content_type + '; charset=utf-8', text.encode('utf-8'), endpoint=endpoint)
+
+    def _send(self, status, content_type, body, headers=None, endpoint=None, recorded=False):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if endpoint is not None:
+            self.stats.record(endpoint, status, len(body), recorded)
+
+
+def build_server(args):
+    latency = {}
+    for spec in args.latency:
+        name, sep, dist = spec.partition('=')
+        if sep and name in ENDPOINT_CLASSES + ('default',):
+            latency[name] = parse_latency(dist)
+        else:
+            latency['default'] = parse_latency(spec)
+
+    low, _, high = args.branches.partition('-')
+    MockHandler.site = SyntheticSite(
+        lists=[int(x) for x in args.lists.split(',') if x.strip()],
+        pages=args.pages,
+        per_page=args.per_page,
+        branches=(int(low), int(high or low)),
+        files=args.files,
+        chrome_blocks=args.chrome,
+    )
+    MockHandler.faults = FaultModel(latency, args.error_rate, [parse_burst(b) for b in args.burst],
+                                    args.login_rate, args.seed)
+    MockHandler.stats = ServerStats()
+    if args.archive:
+        from eyeuc.archive import ArchiveReader
+        MockHandler.archive = ArchiveReader(args.archive)
+
+    server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+    server.daemon_threads = True
+    return server
+
+
+def add_arguments(parser):
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=8800, help='监听端口（默认 8800，0 为随机端口）')
+    parser.add_argument('--lists', default='182', help='列表 id（逗号分隔，默认 182）')
+    parser.add_argument('--pages', type=int, default=10, help='每个列表的页数（默认 10）')
+    parser.add_argument('--per-page', type=int, default=27, help='每页资源数（默认 27）')
+    parser.add_argument('--branches', default='1-3', help='每个资源的分支数范围（默认 1-3）')
+    parser.add_argument('--files', type=int, default=2, help='每个分支的下载项数（默认 2）')
+    parser.add_argument('--chrome', type=int, default=40, help='页头/页脚无关区块数（默认 40，控制页面大小）')
+    parser.add_argument('--latency', action='append', default=[], metavar='[接口=]分布',
+                        help='延迟分布（可重复，按接口类别覆盖，如 detail=lognormal:0.3,0.5）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机 5xx 比例（默认 0）')
+    parser.add_argument('--burst', action='append', default=[], metavar='状态码:周期:持续[:比例]',
+                        help='周期性状态码突发（可重复，如 429:30:5）')
+    parser.add_argument('--login-rate', type=float, default=0.0, help='登录跳转比例（默认 0）')
+    parser.add_argument('--archive', help='响应归档目录（有录制响应时优先返回）')
+    parser.add_argument('--seed', type=int, default=0, help='故障注入的随机种子（默认 0）')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 EyeUC 站点')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = build_server(args)
+    host, port = server.server_address[:2]
+    site = MockHandler.site
+    print(f"模拟站点已启动: http://{host}:{port}（列表 {sorted(site.lists)}，每个 {site.pages} 页 × {site.per_page} 个资源）",
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+从响应归档离线重新生成 per_list_output（不访问网络）
+
+抓取时设置 ARCHIVE_DIR 保存原始响应：
+    scrapy crawl eyeuc_mods -a list_ids=182 -s ARCHIVE_DIR=archive/list182
+
+修复解析 bug 后回放归档：按归档中出现的列表页把每个 list 切分为若干页数范围，
+每个范围启动一个 scrapy 进程（-a start_page / end_page，ARCHIVE_REPLAY_DIR 指向归档），
+最多 --workers 个进程同时运行。每个进程走完整的解析流程
+（parse_list → parse_detail → parse_versions → parse_download_ajax），响应全部来自归档。
+
+用法：
+    python scripts/reparse_archive.py archive/list182
+    python scripts/reparse_archive.py archive/list182 --output reparse_output --workers 8
+    python scripts/reparse_archive.py archive/all --list-ids 182,193 --set PARSER_BACKEND=parsel
+"""
+
+import argparse
+import math
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from eyeuc.archive import ArchiveReader
+from eyeuc.segments import iter_jsonl
+
+LIST_URL_RE = re.compile(r'/down/list/(\d+)/(\d+)')
+
+
+def archived_pages(reader):
+    """{list_id: [页码, ...]}（归档中状态码 200 的列表页）"""
+    pages = defaultdict(set)
+    for entry in reader.entries:
+        match = LIST_URL_RE.search(entry.get('url') or '')
+        if match and entry.get('status') == 200:
+            pages[int(match.group(1))].add(int(match.group(2)))
+    return {list_id: sorted(p) for list_id, p in pages.items()}
+
+
+def split_tasks(pages, workers):
+    """按页数切分为 (list_id, start_page, end_page) 任务，任务数约为 workers"""
+    total = sum(len(p) for p in pages.values())
+    chunk = max(1, math.ceil(total / workers))
+    tasks = []
+    for list_id, list_pages in sorted(pages.items()):
+        for i in range(0, len(list_pages), chunk):
+            group = list_pages[i:i + chunk]
+            tasks.append((list_id, group[0], group[-1]))
+    return tasks
+
+
+def run_task(task, archive, output, log_dir, extra_settings):
+    list_id, start_page, end_page = task
+    log_file = log_dir / f'list{list_id}_p{start_page}-{end_page}.log'
+    cmd = [
+        sys.executable, '-m', 'scrapy', 'crawl', 'eyeuc_mods',
+        '-a', f'list_ids={list_id}',
+        '-a', f'start_page={start_page}',
+        '-a', f'end_page={end_page}',
+        '-s', f'ARCHIVE_REPLAY_DIR={archive}',
+        '-s', 'ARCHIVE_DIR=',
+        '-s', 'HTTPCACHE_ENABLED=false',
+        '-s', f'PER_LIST_OUTPUT_DIR={output}',
+        '-s', 'DOWNLOAD_DELAY=0',
+        '-s', 'RANDOM_DELAY_MIN=0',
+        '-s', 'RANDOM_DELAY_MAX=0',
+        '-s', 'AUTOTHROTTLE_ENABLED=false',
+        '-s', 'CONCURRENT_REQUESTS=32',
+        '-s', 'TELNETCONSOLE_ENABLED=false',
+        '-s', f'LOG_FILE={log_file}',
+    ]
+    for setting in extra_settings:
+        cmd += ['-s', setting]
+    started = time.time()
+    result = subprocess.run(cmd, cwd=PROJECT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return task, result.returncode, time.time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='从响应归档离线重新生成 per_list_output')
+    parser.add_argument('archive', help='归档目录（抓取时的 ARCHIVE_DIR）')
+    parser.add_argument('--output', default='reparse_output', help='输出目录（默认 reparse_output）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='并行进程数（默认 CPU 核数）')
+    parser.add_argument('--list-ids', help='只回放指定列表（逗号分隔，默认归档中的全部列表）')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='额外的 scrapy 配置（可重复）')
+    args = parser.parse_args()
+
+    archive = Path(args.archive).resolve()
+    output = Path(args.output).resolve()
+    log_dir = output / 'logs'
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    reader = ArchiveReader(archive)
+    pages = archived_pages(reader)
+    if args.list_ids:
+        wanted = {int(x) for x in args.list_ids.split(',') if x.strip()}
+        pages = {list_id: p for list_id, p in pages.items() if list_id in wanted}
+    if not pages:
+        print(f"❌ 归档中没有列表页: {archive}")
+        sys.exit(1)
+
+    tasks = split_tasks(pages, args.workers)
+    print(f"归档: {len(reader)} 条记录，列表 {', '.join(f'{k}（{len(v)} 页）' for k, v in sorted(pages.items()))}")
+    print(f"任务: {len(tasks)} 个，{args.workers} 个进程并行，输出到 {output}")
+
+    started = time.time()
+    failures = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_task, task, archive, output, log_dir, args.set) for task in tasks]
+        for future in futures:
+            (list_id, start_page, end_page), returncode, elapsed = future.result()
+            status = '✅' if returncode == 0 else f'❌ 退出码 {returncode}'
+            print(f"  list {list_id} 第 {start_page}-{end_page} 页: {status}（{elapsed:.1f}s）")
+            failures += returncode != 0
+
+    items = sum(
+        sum(1 for _ in iter_jsonl(path))
+        for path in output.glob('*.jsonl*')
+    )
+    print(f"\n完成: {items} 个资源，耗时 {time.time() - started:.1f}s，日志在 {log_dir}")
+    if failures:
+        print(f"❌ {failures} 个任务失败")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
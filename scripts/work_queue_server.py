@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+分布式抓取任务队列服务器
+
+把本地 SQLite 任务队列通过 TCP 共享给多台机器上的 worker，
+worker 使用 -a queue=tcp://<host>:<port> 连接。
+
+用法：
+    python scripts/work_queue_server.py --db queue/eyeuc.db --port 7700
+    python scripts/work_queue_server.py --db queue/eyeuc.db --status   # 只查看队列状态
+
+worker：
+    scrapy crawl eyeuc_mods -a list_ids=182,193 -a queue=tcp://10.0.0.5:7700 -a worker=node1
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from eyeuc.workqueue import SQLiteWorkQueue, WorkQueueServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分布式抓取任务队列服务器')
+    parser.add_argument('--db', default='queue/eyeuc.db', help='SQLite 队列文件（默认 queue/eyeuc.db）')
+    parser.add_argument('--host', default='0.0.0.0', help='监听地址（默认 0.0.0.0）')
+    parser.add_argument('--port', type=int, default=7700, help='监听端口（默认 7700）')
+    parser.add_argument('--max-attempts', type=int, default=3, help='任务最多领取次数（默认 3）')
+    parser.add_argument('--status', action='store_true', help='输出队列状态后退出')
+    args = parser.parse_args()
+
+    queue = SQLiteWorkQueue(args.db, max_attempts=args.max_attempts)
+    if args.status:
+        print(queue.counts())
+        return
+
+    server = WorkQueueServer(queue, args.host, args.port)
+    print(f"任务队列服务器已启动: {args.host}:{args.port}（{args.db}），当前状态 {queue.counts()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        queue.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -74,9 +74,15 @@ fi
 
 # 创建日志目录
 TIMESTAMP=$(date +%Y%m%d_%H%M%S)
+
+# 所有分片共用一个 run_id：同一个 mid 只被一个分片抓取
+export EYEUC_RUN_ID=${EYEUC_RUN_ID:-"list${LIST_ID}_$(date +%Y%m%d_%H%M%S)"}
 LOG_DIR=${LOG_DIR_OVERRIDE:-"logs/list${LIST_ID}_${TIMESTAMP}"}
 mkdir -p "$LOG_DIR"
 
+# 每个分片把实时指标（Prometheus 文本格式）写到 ${LOG_DIR}/metrics/*.prom
+export EYEUC_METRICS_DIR=${EYEUC_METRICS_DIR:-"${LOG_DIR}/metrics"}
+
 # 显示欢迎界面
 if [ $AUTO_MODE -eq 0 ] && [ $IS_TTY -eq 1 ]; then
     clear
@@ -205,6 +211,17 @@ monitor_progress() {
         printf "${NC}%${empty}s" | tr ' ' '░'
         printf "${CYAN}] ${YELLOW}%d%%${NC} (${GREEN}%d${NC}/${total})" $percent $completed
         
+        # 汇总各分片的实时指标
+        if compgen -G "${EYEUC_METRICS_DIR}/*.prom" > /dev/null; then
+            local metrics
+            metrics=$(awk '/^eyeuc_items_scraped_total/ {items += $NF}
+                           /^eyeuc_items_per_second/ {rate += $NF}
+                           /^eyeuc_pending_items/ {pending += $NF}
+                           END {printf "%d %.1f %d", items, rate, pending}' "${EYEUC_METRICS_DIR}"/*.prom)
+            read -r items rate pending <<< "$metrics"
+            printf " ${CYAN}items: ${GREEN}%s${NC} (%s/s) 等待分支: %s   " "$items" "$rate" "$pending"
+        fi
+        
         sleep 5
     done
     